@@ -1,45 +1,16 @@
 import streamlit as st
 import pandas as pd
-import openai  # OpenAI API
-import matplotlib.pyplot as plt
-from io import BytesIO
+from functools import partial
+from fanalysis import llm
+from fanalysis.charts import WIDE_CHART
+from fanalysis.history import SearchHistory
+from fanalysis.ingest import describe_upload, load_upload
+from fanalysis.schema import FEATURE_REQUIRED_COLUMNS, VISUAL_ANALYSIS_OPTIONS
+from fanalysis.ui import answer_question, history_scope, render_country_summaries, render_search_history, render_trend_charts
 
-# OpenAI API Configuration
-openai.api_key = "14560021aaf84772835d76246b53397a"
-openai.api_base = "https://amrxgenai.openai.azure.com/"
-openai.api_type = 'azure'
-openai.api_version = '2024-02-15-preview'
-deployment_name = 'gpt'
+analyze_chatbot = partial(llm.analyze_chatbot, style="expert")
 
 
-
-# Function to analyze chatbot queries with OpenAI
-def analyze_chatbot(question, df):
-    prompt = f"""
-    Using the data provided below, analyze and respond to the following question:
-    {df.to_string(index=False)}
-    Question: {question}
-    """
-    response = openai.ChatCompletion.create(
-        engine='gpt',
-        messages=[{"role": "system", "content": "You are a data analyst expert."},
-                  {"role": "user", "content": prompt}],
-        temperature=0.7
-    )
-    return response["choices"][0]["message"]["content"].strip()
-
-# Function to plot trends
-def plot_trend(df, group_by_col, value_col, title):
-    trend_data = df.groupby(group_by_col)[value_col].sum().reset_index()
-    fig, ax = plt.subplots(figsize=(10, 5))
-    ax.bar(trend_data[group_by_col], trend_data[value_col], color="skyblue")
-    plt.xticks(rotation=90, ha='right', fontsize=8)
-    plt.title(title)
-    plt.xlabel(group_by_col)
-    plt.ylabel(value_col)
-    plt.tight_layout()
-    st.pyplot(fig)
-
 # Sidebar navigation
 st.sidebar.title("Navigation")
 app_mode = st.sidebar.radio("Choose an app", ["Feature Analysis", "Report Generator"])
@@ -50,26 +21,16 @@ if app_mode == "Feature Analysis":
     uploaded_file = st.file_uploader("Upload Excel File", type=["xlsx", "xls"])
     
     if uploaded_file:
-        df = pd.read_excel(uploaded_file)
+        df, upload_info = load_upload(uploaded_file)
+        st.caption(describe_upload(upload_info))
         st.dataframe(df.head())
         
-        required_columns = {"Feature", "Description"}
-        if required_columns.issubset(set(df.columns)):
+        if FEATURE_REQUIRED_COLUMNS.issubset(set(df.columns)):
             st.success("File successfully uploaded and validated!")
             tab1, tab2 = st.tabs(["Analysis", "Chatbot"])
             
             with tab1:
-                country_columns = [col for col in df.columns if col not in {"S.No", "Feature", "Description", "Common", "Remarks"}]
-                analysis_results = []
-                
-                for country in country_columns:
-                    country_features = df[["Feature", "Description", country]].dropna()
-                    country_features = country_features[country_features[country].astype(str).str.lower() == "yes"]
-                    
-                    if not country_features.empty:
-                        summary = analyze_chatbot(f"Summarize features for {country}", country_features)
-                        analysis_results.append({"Country": country, "Summary": summary})
-                        st.write(summary)
+                analysis_results = render_country_summaries(df, analyze_chatbot)
                 
                 if analysis_results:
                     results_df = pd.DataFrame(analysis_results)
@@ -79,8 +40,7 @@ if app_mode == "Feature Analysis":
             with tab2:
                 user_question = st.text_input("Ask a question about the analysis:", key="feature_chat_input")
                 if user_question:
-                    response = analyze_chatbot(user_question, df)
-                    st.write(response)
+                    st.write_stream(analyze_chatbot(user_question, df, stream=True, retrieve=True))
                     st.session_state.feature_chat_input = ""
         else:
             st.error("The uploaded file must contain 'Feature' and 'Description' columns.")
@@ -92,11 +52,12 @@ elif app_mode == "Report Generator":
 
     # Initialize search history
     if "search_history" not in st.session_state:
-        st.session_state.search_history = []
+        st.session_state.search_history = SearchHistory(history_scope("demofff"))
 
     if uploaded_file:
         try:
-            df = pd.read_csv(uploaded_file, encoding="latin1")
+            df, upload_info = load_upload(uploaded_file)
+            st.caption(describe_upload(upload_info))
             st.dataframe(df.head())
         except UnicodeDecodeError:
             st.error("The uploaded file has an unsupported encoding. Please save it as UTF-8.")
@@ -109,46 +70,33 @@ elif app_mode == "Report Generator":
             # Analysis tab
             with tab1:
                 st.subheader("Visual Analysis")
-                analysis_options = [
-                    ("Role-wise Gross Earnings", "Paid As Position", "Gross Earnings"),
-                    ("Gender-Based Earnings", "Gender", "Gross Earnings")
-                ]
-                for title, group_by, value in analysis_options:
-                    st.subheader(title)
-                    plot_trend(df, group_by, value, title)
+                render_trend_charts(df, VISUAL_ANALYSIS_OPTIONS, **WIDE_CHART)
 
             # Chatbot tab
             with tab2:
                 st.subheader("Chatbot Analysis")
 
-                # Ensure the input field is initialized
-                if "report_chat_input" in st.session_state:
-                    st.session_state.report_chat_input = ""
-
                 predefined_questions = [
                     "Overall Bonus Analysis",
                     "Top Performers analysis - Total (Gross earnings)"
                 ]
-                selected_question = st.selectbox("Choose a predefined question:", [""] + predefined_questions, key="predefined_question")
+                narrate = st.checkbox("Add AI commentary to computed answers", value=True, key="narrate_answers")
 
-                # Input field for user question
-                user_question = st.text_input("Or enter your own question:", key="report_chat_input")
+                # Answered and recorded on submit only; the form clears the question afterwards
+                with st.form("report_question", clear_on_submit=True):
+                    selected_question = st.selectbox("Choose a predefined question:", [""] + predefined_questions, key="predefined_question")
 
-                search_button = st.button("Search")
+                    # Input field for user question
+                    user_question = st.text_input("Or enter your own question:", key="report_chat_input")
 
-                if search_button or user_question:
+                    search_button = st.form_submit_button("Search")
+
+                if search_button:
                     if not user_question and selected_question:
                         user_question = selected_question
                     if user_question:
-                        response = analyze_chatbot(user_question, df)
-                        st.session_state.search_history.insert(0, (user_question, response))
-                        st.write("**Response:**", response)
-
-                        # Reset input field correctly
-                        st.session_state.report_chat_input = ""
+                        response = answer_question(user_question, df, analyze_chatbot, narrate)
+                        st.session_state.search_history.add(user_question, response)
 
                 # Display search history
-                st.subheader("Search History")
-                for question, answer in st.session_state.search_history:
-                    with st.expander(question):
-                        st.write(answer)
+                render_search_history(st.session_state.search_history)
@@ -1,8 +1,13 @@
 
 import streamlit as st
-import pandas as pd
-import openai
-import matplotlib.pyplot as plt
+from functools import partial
+from fanalysis import llm, ui
+from fanalysis.charts import CLASSIC_CHART
+from fanalysis.history import SearchHistory
+from fanalysis.ingest import describe_upload, load_upload
+from fanalysis.mapping import missing_columns
+from fanalysis.ranking import TOTAL_COMMISSIONS, commission_totals, top_n
+from fanalysis.schema import REQUIRED_BONUS_COLUMNS
 
 # Set Streamlit page background
 st.markdown(f"""
@@ -15,48 +20,20 @@ st.markdown(f"""
 </style>
 """, unsafe_allow_html=True)
 
-# OpenAI API Configuration
-openai.api_key = "14560021aaf84772835d76246b53397a"
-openai.api_base = "https://amrxgenai.openai.azure.com/"
-openai.api_type = 'azure'
-openai.api_version = '2024-02-15-preview'
-deployment_name = 'gpt'
-
-def analyze_chatbot(question, df):
-    prompt = f"""
-    Using the data provided below, analyze and respond to the following question:
-    {df.to_string(index=False)}
-    Question: {question}
-    """
-    response = openai.ChatCompletion.create(
-        engine=deployment_name,
-        messages=[{"role": "system", "content": "You are a data analyst expert."},
-                  {"role": "user", "content": prompt}],
-        temperature=0.7
-    )
-    return response["choices"][0]["message"]["content"].strip()
-
-def plot_trend(df, group_by_col, value_col, title):
-    trend_data = df.groupby(group_by_col)[value_col].sum().reset_index()
-    fig, ax = plt.subplots()
-    ax.bar(trend_data[group_by_col], trend_data[value_col], color="skyblue")
-    plt.xticks(rotation=45)
-    plt.title(title)
-    plt.xlabel(group_by_col)
-    plt.ylabel(value_col)
-    st.markdown("<br><br>", unsafe_allow_html=True)  # Fix overlapping
-    st.pyplot(fig)
+analyze_chatbot = partial(llm.analyze_chatbot, style="expert")
+plot_trend = partial(ui.plot_trend, **CLASSIC_CHART)
 
 st.title("Bonus Analysis with OpenAI")
 st.write("Upload and analyze CSV data containing bonus-related details.")
 
 uploaded_file = st.file_uploader("Upload CSV File", type=["csv"])
 if "search_history" not in st.session_state:
-    st.session_state.search_history = []
+    st.session_state.search_history = SearchHistory(ui.history_scope("demooo3"))
 
 if uploaded_file:
     try:
-        df = pd.read_csv(uploaded_file, encoding="latin1")
+        df, upload_info = load_upload(uploaded_file)
+        st.caption(describe_upload(upload_info))
         st.write("Uploaded Data Preview:")
         st.dataframe(df.head())
     except UnicodeDecodeError:
@@ -64,8 +41,8 @@ if uploaded_file:
     except Exception as e:
         st.error(f"Error processing the file: {e}")
     else:
-        required_columns = {"Partner Id", "Last Name", "Paid As Position", "Gender", "Date of Birth", "Manager Name", "Recruiter Name", "Paid As", "Personal Sales Unit(PSU)", "Team Units(TU)", "First Name", "Adhoc Payment(ADP)", "Recruitment Commission Bonus (RCB)", "Basic commission Bonus(BCB)", "Super Commission Bonus(SCB)", "Performance Bonus (PCB)", "Gross Earnings"}
-        if required_columns.issubset(set(df.columns)):
+        missing = missing_columns(df.columns, REQUIRED_BONUS_COLUMNS)
+        if not missing:
             st.success("File successfully uploaded and validated!")
             
             tab1, tab2 = st.tabs(["Analysis", "Chatbot"])
@@ -107,23 +84,23 @@ if uploaded_file:
                 
                 for question in predefined_questions:
                     if st.button(question):
-                        response = analyze_chatbot(question, df)
                         st.write(f"**Q: {question}**")
-                        st.write(f"**A:** {response}")
+                        st.write("**A:**")
+                        if "accuracy of total commissions" in question.lower():
+                            # Reconciled exactly at ingestion; no need to ask the LLM
+                            response = ui.render_reconciliation(df)
+                        else:
+                            response = st.write_stream(analyze_chatbot(question, df, stream=True, retrieve=True))
                         
-                        if "Top Earners" in question:
-                            df["Total Commissions"] = df[["Basic commission Bonus(BCB)", "Super Commission Bonus(SCB)", "Recruitment Commission Bonus (RCB)", "Performance Bonus (PCB)"]].sum(axis=1)
-                            top_earners = df.nlargest(10, "Total Commissions")[["First Name", "Last Name", "Total Commissions"]]
-                            top_earners.insert(0, "Serial Number", range(1, 11))
+                        if "top earners" in question.lower():
+                            commission_totals(df)
+                            top_earners = top_n(df, TOTAL_COMMISSIONS, 10)[["First Name", "Last Name", TOTAL_COMMISSIONS]]
+                            top_earners.insert(0, "Serial Number", range(1, len(top_earners) + 1))
                             st.write("**Top Earners:**")
                             st.dataframe(top_earners)
                         
-                        st.session_state.search_history.append({"question": question, "response": response})
+                        st.session_state.search_history.add(question, response)
                 
-                if st.session_state.search_history:
-                    st.subheader("Search History")
-                    for entry in st.session_state.search_history:
-                        st.write(f"**Q: {entry['question']}**")
-                        st.write(f"**A:** {entry['response']}")
+                ui.render_search_history(st.session_state.search_history, expanders=False)
         else:
-            st.error("Uploaded file is missing required columns.")
+            st.error(f"Uploaded file is missing required columns: {', '.join(missing)}")
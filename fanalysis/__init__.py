@@ -0,0 +1 @@
+"""Shared helpers for the fanalysis Streamlit apps."""
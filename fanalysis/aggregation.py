@@ -0,0 +1,32 @@
+"""
+Aggregation planning for the chart tabs.
+
+Charts are declared as ``(title, group_by, value)`` triples. Instead of one
+``groupby(...).sum()`` per chart, the requested value columns are collected per
+distinct group key and each key is aggregated once.
+"""
+from collections import OrderedDict
+
+
+def plan_aggregations(specs):
+    """Map each distinct group key to the (de-duplicated, ordered) value columns requested for it."""
+    plan = OrderedDict()
+    for _, group_by, value in specs:
+        values = plan.setdefault(group_by, [])
+        if value not in values:
+            values.append(value)
+    return plan
+
+
+def aggregate_trends(df, specs, how="sum"):
+    """
+    Run one grouped aggregation per distinct key and return ``{(group_by, value): frame}``.
+
+    Each frame has the same ``[group_by, value]`` shape ``plot_trend`` used to build itself.
+    """
+    results = {}
+    for group_by, values in plan_aggregations(specs).items():
+        table = df.groupby(group_by)[values].agg(how)
+        for value in values:
+            results[(group_by, value)] = table[value].reset_index()
+    return results
@@ -0,0 +1,171 @@
+"""
+Deterministic pandas answers for the predefined question catalogue.
+
+Each predefined question that is a plain aggregation over the bonus export is mapped to a
+vectorized computation returning an exact table, so it never needs an LLM round trip over
+the raw rows. An LLM may still be asked to narrate the (small) computed table. Each answer
+names the columns it needs; a file without them gets no computed answer, so the question
+goes to the LLM as before.
+"""
+import re
+
+import pandas as pd
+
+from fanalysis.mapping import missing_columns
+from fanalysis.ranking import leaderboards, top_n
+from fanalysis.schema import AGENT_COLUMNS, BONUS_COLUMNS, EARNINGS_COLUMN
+
+TOP_N = 10
+POSITION_COLUMN = "Paid As Position"
+GENDER_COLUMN = "Gender"
+
+_registry = {}
+
+
+def normalize_question(question):
+    """``question`` with whitespace collapsed and case folded, as used for registry lookups."""
+    return re.sub(r"\s+", " ", str(question)).strip().casefold()
+
+
+def answers(*questions, requires=(), requires_any=()):
+    """
+    Register the decorated ``func(df) -> DataFrame`` as the answer to ``questions``.
+
+    It is only used on frames with every column in ``requires`` and, if given, at least one
+    in ``requires_any``.
+    """
+    def register(func):
+        for question in questions:
+            _registry[normalize_question(question)] = (func, list(requires), list(requires_any))
+        return func
+    return register
+
+
+def has_answer(question):
+    return normalize_question(question) in _registry
+
+
+def compute_answer(question, df):
+    """Exact result table for a registered question, or None if it needs the LLM (or columns it lacks)."""
+    entry = _registry.get(normalize_question(question))
+    if entry is None:
+        return None
+    func, requires, requires_any = entry
+    if missing_columns(df.columns, requires) or (requires_any and not any(col in df.columns for col in requires_any)):
+        return None
+    return func(df)
+
+
+def _amounts(df, columns):
+    present = [col for col in columns if col in df.columns]
+    return df[present].apply(pd.to_numeric, errors="coerce").fillna(0)
+
+
+def _agents(df):
+    return df[[col for col in AGENT_COLUMNS if col in df.columns]]
+
+
+def _bonus_totals(df):
+    bonuses = _amounts(df, BONUS_COLUMNS)
+    totals = pd.DataFrame({
+        "Total": bonuses.sum(),
+        "Recipients": (bonuses > 0).sum(),
+        "Average": bonuses.mean().round(2),
+    })
+    earnings = _amounts(df, [EARNINGS_COLUMN])
+    if not earnings.empty and earnings.iloc[:, 0].sum():
+        totals["Share of Gross Earnings (%)"] = (totals["Total"] / earnings.iloc[:, 0].sum() * 100).round(2)
+    return totals.rename_axis("Bonus Type").sort_values("Total", ascending=False).reset_index()
+
+
+@answers("Overall Bonus Analysis", requires=[EARNINGS_COLUMN])
+def overall_bonus(df):
+    amounts = _amounts(df, BONUS_COLUMNS + [EARNINGS_COLUMN])
+    summary = amounts.agg(["sum", "mean", "min", "max"]).T.round(2)
+    summary["Recipients"] = (amounts > 0).sum()
+    return summary.rename_axis("Component").reset_index()
+
+
+@answers("Role wise bonus analysis with Total Bonus earned", requires=[POSITION_COLUMN, EARNINGS_COLUMN])
+def role_wise_bonus(df):
+    amounts = _amounts(df, BONUS_COLUMNS + [EARNINGS_COLUMN])
+    bonus_cols = [col for col in BONUS_COLUMNS if col in amounts.columns]
+    amounts["Total Bonus"] = amounts[bonus_cols].sum(axis=1)
+    grouped = amounts.groupby(df[POSITION_COLUMN])
+    table = grouped.sum().round(2)
+    table.insert(0, "Agents", grouped.size())
+    return table.sort_values("Total Bonus", ascending=False).reset_index()
+
+
+def _ranked_by_earnings(df, largest):
+    top = top_n(_amounts(df, [EARNINGS_COLUMN]), EARNINGS_COLUMN, TOP_N, largest)
+    table = _agents(df).loc[top.index].assign(**{EARNINGS_COLUMN: top[EARNINGS_COLUMN]})
+    table.insert(0, "Rank", range(1, len(table) + 1))
+    return table.reset_index(drop=True)
+
+
+def _ranked_by_bonus(df, largest):
+    bonuses = _amounts(df, BONUS_COLUMNS)
+    agents = _agents(df)
+    tables = []
+    for col, top in leaderboards(bonuses, bonuses.columns, TOP_N, largest).items():
+        table = agents.loc[top.index].assign(Amount=top[col])
+        table.insert(0, "Rank", range(1, len(table) + 1))
+        table.insert(0, "Bonus Type", col)
+        tables.append(table)
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+
+
+@answers("Top Performers analysis - Total (Gross earnings)", requires=[EARNINGS_COLUMN])
+def top_by_earnings(df):
+    return _ranked_by_earnings(df, largest=True)
+
+
+@answers("Bottom Performers analysis - Total (Gross earnings)", requires=[EARNINGS_COLUMN])
+def bottom_by_earnings(df):
+    return _ranked_by_earnings(df, largest=False)
+
+
+@answers("Top Performers analysis - Individual Bonuses", requires_any=BONUS_COLUMNS)
+def top_by_bonus(df):
+    return _ranked_by_bonus(df, largest=True)
+
+
+@answers("Bottom Performers analysis - Individual Bonuses", requires_any=BONUS_COLUMNS)
+def bottom_by_bonus(df):
+    return _ranked_by_bonus(df, largest=False)
+
+
+@answers("Gender Wise Analysis", requires=[GENDER_COLUMN, EARNINGS_COLUMN])
+def gender_wise(df):
+    amounts = _amounts(df, BONUS_COLUMNS + [EARNINGS_COLUMN])
+    grouped = amounts.groupby(df[GENDER_COLUMN])
+    table = grouped.sum().round(2)
+    table.insert(0, "Agents", grouped.size())
+    if EARNINGS_COLUMN in amounts.columns:
+        table["Average Gross Earnings"] = grouped[EARNINGS_COLUMN].mean().round(2)
+    return table.reset_index()
+
+
+@answers(
+    "How many types of bonuses are distributed?",
+    "Which bonus type contributes most to total earnings?",
+    requires_any=BONUS_COLUMNS,
+)
+def bonus_types(df):
+    totals = _bonus_totals(df)
+    return totals[totals["Total"] != 0].reset_index(drop=True)
+
+
+@answers("Top 3 bonus types based on total distribution.", requires_any=BONUS_COLUMNS)
+def top_bonus_types(df):
+    return _bonus_totals(df).head(3)
+
+
+def narrate_answer(question, table, ask):
+    """Have ``ask(question, df)`` (an analyze_chatbot) explain the computed table, not the raw rows."""
+    return ask(
+        f"The table is the exact, already computed answer to: {question}\n"
+        "Explain the key findings in a few bullet points without recomputing anything.",
+        table,
+    )
@@ -0,0 +1,117 @@
+"""
+Market-entry predictions for every country in one run, with a combined report.
+
+Each country is a background job (``fanalysis.jobs``), so the countries run concurrently
+on the job workers while the gateway keeps the requests and tokens per minute within the
+configured limits. Every finished country is checkpointed in the job table on disk: an
+interrupted run picks up where it stopped, re-using the countries already done and
+restarting the ones that were in flight, and the same file and template in the app shows
+the results of an overnight CLI run straight away::
+
+    python -m fanalysis.batch CDMAR25ESTM.xlsx
+    python -m fanalysis.batch bonus.csv --countries Japan India --template detailed -o report.md
+"""
+import argparse
+import sys
+import time
+
+from fanalysis.fanout import MAX_IN_FLIGHT
+from fanalysis.ingest import load_upload
+from fanalysis.jobs import ACTIVE, JobQueue, market_entry_job_id, submit_market_entry
+from fanalysis.market import (
+    BASIC_CHECKLIST,
+    BASIC_PROMPT,
+    DETAILED_CHECKLIST,
+    DETAILED_PROMPT,
+    EXTENDED_PROMPT,
+    NEW_COUNTRIES,
+    score_market_reports,
+)
+
+TEMPLATES = {"basic": BASIC_PROMPT, "detailed": DETAILED_PROMPT, "extended": EXTENDED_PROMPT}
+POLL_SECONDS = 2.0
+
+
+def batch_job_ids(fingerprint, countries=NEW_COUNTRIES, template=EXTENDED_PROMPT):
+    return [market_entry_job_id(fingerprint, country, template) for country in countries]
+
+
+def submit_batch(df, fingerprint, countries=NEW_COUNTRIES, template=EXTENDED_PROMPT, queue=None):
+    """Queue the prediction for every country (finished ones are kept as they are); returns the job rows."""
+    return [submit_market_entry(df, fingerprint, country, template, queue=queue) for country in countries]
+
+
+def combined_report(countries, jobs, source=None, checklist=DETAILED_CHECKLIST):
+    """One Markdown report: the checklist results of every country, then a section per country."""
+    done = {country: job["result"] for country, job in zip(countries, jobs) if job and job["status"] == "done"}
+    lines = ["# Market Entry Report", ""]
+    if source:
+        lines.append(f"Source file: {source}  ")
+    lines += [f"Generated: {time.strftime('%Y-%m-%d %H:%M')}  ", f"Countries: {len(done)} of {len(countries)} completed", ""]
+    if done:
+        lines += ["## Checklist Summary", "", "| Country | Passed | Missing |", "|---|---|---|"]
+        for country, row in score_market_reports(done, checklist).iterrows():
+            missing = ", ".join(area for area in checklist if not row[area]) or "-"
+            lines.append(f"| {country} | {row['Passed']} of {len(checklist)} | {missing} |")
+        lines.append("")
+    for country, job in zip(countries, jobs):
+        lines += [f"## {country}", ""]
+        if job and job["status"] == "done":
+            lines.append(job["result"])
+        elif job and job["status"] == "failed":
+            lines.append(f"_Not generated: {job['error']}_")
+        else:
+            lines.append("_Not generated yet._")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m fanalysis.batch", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("file", help="CSV or Excel export the predictions are based on")
+    parser.add_argument("--countries", nargs="+", default=NEW_COUNTRIES, help="countries to predict (default: all)")
+    parser.add_argument("--template", choices=TEMPLATES, default="extended", help="prediction prompt")
+    parser.add_argument("--workers", type=int, default=MAX_IN_FLIGHT, help="countries predicted at once")
+    parser.add_argument("-o", "--output", default="market_entry_report.md", help="where to write the combined report")
+    args = parser.parse_args(argv)
+
+    df, info = load_upload(args.file)
+    if df is None or df.empty:
+        print(f"No valid data found in {args.file}", file=sys.stderr)
+        return 1
+    countries = list(dict.fromkeys(args.countries))
+    queue = JobQueue(workers=args.workers)
+    jobs = submit_batch(df, info["fingerprint"], countries, TEMPLATES[args.template], queue=queue)
+    job_ids = [job["id"] for job in jobs]
+    reported = {country for country, job in zip(countries, jobs) if job["status"] == "done"}
+    if reported:
+        print(f"Resuming: {len(reported)} of {len(jobs)} countries already done")
+
+    try:
+        while True:
+            jobs = queue.wait(job_ids, timeout=POLL_SECONDS)
+            for country, job in zip(countries, jobs):
+                if job["status"] not in ACTIVE and country not in reported:
+                    reported.add(country)
+                    detail = f": {job['error']}" if job["status"] == "failed" else ""
+                    print(f"[{len(reported)}/{len(jobs)}] {country} {job['status']}{detail}")
+            if len(reported) == len(jobs):
+                break
+    except KeyboardInterrupt:
+        queue.close()
+        print(
+            "Interrupted: finishing the countries in progress. Finished countries are saved; "
+            "run the same command again to resume.",
+            file=sys.stderr,
+        )
+        return 130
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        checklist = BASIC_CHECKLIST if args.template == "basic" else DETAILED_CHECKLIST
+        f.write(combined_report(countries, jobs, source=args.file, checklist=checklist))
+    print(f"Report written to {args.output}")
+    return 1 if any(job["status"] == "failed" for job in jobs) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Bar chart rendering with PNG memoization and a client-side Vega-Lite backend.
+
+Charts are drawn with matplotlib's object-oriented API on an Agg canvas (no pyplot
+global figure registry, so nothing accumulates between reruns) and the resulting PNG
+bytes are cached in a bounded LRU keyed on (data fingerprint, chart spec).
+
+High-cardinality groupings (e.g. thousands of agents by ``First Name``) are instead
+emitted as a Vega-Lite spec over the top-N groups plus an "Other" bucket, so only the
+pre-aggregated points leave the server and the browser does the drawing.
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+MAX_CACHED_CHARTS = 256
+
+# "auto" switches to Vega-Lite above VEGA_LITE_THRESHOLD groups; "matplotlib"/"vega-lite" force one
+CHART_BACKEND = os.environ.get("FANALYSIS_CHART_BACKEND", "auto")
+VEGA_LITE_THRESHOLD = 40
+TOP_N = 30
+
+# render_bar_chart styles used by the pages
+CLASSIC_CHART = {"rotation": 45, "tight_layout": False}
+WIDE_CHART = {"figsize": (10, 5), "ha": "right", "fontsize": 8}
+COMPACT_CHART = {"figsize": (8, 3), "ha": "right", "fontsize": 8, "axis_labels": False}
+
+_png_cache = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def fingerprint(df):
+    """Content hash of a (small, already aggregated) dataframe, including column names."""
+    digest = hashlib.sha1(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    digest.update(repr(list(df.columns)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _draw_bar(trend_data, group_by_col, value_col, title, figsize, rotation, ha, fontsize,
+              axis_labels, tight_layout):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    ax.bar(trend_data[group_by_col].astype(str), trend_data[value_col], color="skyblue")
+    ax.tick_params(axis="x", labelrotation=rotation, labelsize=fontsize)
+    if ha:
+        for label in ax.get_xticklabels():
+            label.set_horizontalalignment(ha)
+    ax.set_title(title)
+    if axis_labels:
+        ax.set_xlabel(group_by_col)
+        ax.set_ylabel(value_col)
+    if tight_layout:
+        fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
+
+
+def render_bar_chart(trend_data, group_by_col, value_col, title, figsize=None, rotation=90, ha=None,
+                     fontsize=None, axis_labels=True, tight_layout=True):
+    """PNG bytes for a bar chart of ``trend_data[value_col]`` by ``trend_data[group_by_col]``."""
+    spec = (group_by_col, value_col, title, figsize, rotation, ha, fontsize, axis_labels, tight_layout)
+    key = (fingerprint(trend_data[[group_by_col, value_col]]), spec)
+    with _lock:
+        png = _png_cache.get(key)
+        if png is not None:
+            _png_cache.move_to_end(key)
+            _stats["hits"] += 1
+            return png
+        _stats["misses"] += 1
+    png = _draw_bar(trend_data, *spec)
+    with _lock:
+        _png_cache[key] = png
+        while len(_png_cache) > MAX_CACHED_CHARTS:
+            _png_cache.popitem(last=False)
+    return png
+
+
+def chart_cache_stats():
+    with _lock:
+        return dict(_stats, entries=len(_png_cache))
+
+
+def choose_backend(trend_data, backend=None):
+    """``"vega-lite"`` or ``"matplotlib"`` for a pre-aggregated chart frame."""
+    backend = backend or CHART_BACKEND
+    if backend == "auto":
+        return "vega-lite" if len(trend_data) > VEGA_LITE_THRESHOLD else "matplotlib"
+    return backend
+
+
+def top_n_with_other(trend_data, group_by_col, value_col, top_n=TOP_N):
+    """The ``top_n`` largest groups, with every remaining group summed into one "Other" row."""
+    if len(trend_data) <= top_n:
+        return trend_data
+    values = pd.to_numeric(trend_data[value_col], errors="coerce").fillna(0)
+    top_index = values.nlargest(top_n).index
+    rest = values.drop(top_index)
+    top = trend_data.loc[top_index, [group_by_col, value_col]]
+    other = pd.DataFrame({group_by_col: [f"Other ({len(rest)} more)"], value_col: [rest.sum()]})
+    return pd.concat([top, other], ignore_index=True)
+
+
+def vega_lite_bar(trend_data, group_by_col, value_col, title, top_n=TOP_N):
+    """
+    ``(data, spec)`` for ``st.vega_lite_chart``.
+
+    Fields are renamed to plain ``group``/``value`` because Vega-Lite treats dots and
+    brackets in field names as nested accessors; the original names become axis titles.
+    """
+    points = top_n_with_other(trend_data, group_by_col, value_col, top_n)
+    data = pd.DataFrame({"group": points[group_by_col].astype(str).values, "value": points[value_col].values})
+    spec = {
+        "title": title,
+        "width": "container",
+        "mark": {"type": "bar", "color": "skyblue", "tooltip": True},
+        "encoding": {
+            "x": {"field": "group", "type": "nominal", "sort": None, "title": group_by_col},
+            "y": {"field": "value", "type": "quantitative", "title": value_col},
+        },
+    }
+    return data, spec
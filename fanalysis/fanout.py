@@ -0,0 +1,67 @@
+"""
+Bounded-concurrency fan-out for independent LLM calls.
+
+Work is submitted to a thread pool with at most ``max_in_flight`` calls running at
+once. Requests per minute are limited by the gateway (``fanalysis.gateway``) on the
+requests it actually sends, so calls answered from the response cache are not slowed
+down; a limiter here is only for work that bypasses the gateway.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+MAX_IN_FLIGHT = int(os.environ.get("FANALYSIS_MAX_IN_FLIGHT", "8"))
+
+
+class RateLimiter:
+    """Sliding-window limiter: at most ``max_calls`` acquisitions per ``period`` seconds."""
+
+    def __init__(self, max_calls, period=60.0):
+        self.max_calls = max_calls
+        self.period = period
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.max_calls:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+                if len(self._calls) < self.max_calls:
+                    self._calls.append(now)
+                    return
+                wait = self.period - (now - self._calls[0])
+            time.sleep(wait)
+
+
+def run_concurrently(func, items, max_in_flight=None, requests_per_minute=None, limiter=None):
+    """
+    Call ``func(item)`` for every item and yield ``(index, result, error)`` as calls finish.
+
+    Results arrive in completion order; use ``index`` to place them back in input order.
+    A failing call yields its exception instead of aborting the remaining work.
+    Calls are not rate limited unless ``requests_per_minute`` or a shared ``limiter`` is given.
+    """
+    items = list(items)
+    if not items:
+        return
+    max_in_flight = max_in_flight or MAX_IN_FLIGHT
+    if limiter is None:
+        limiter = RateLimiter(requests_per_minute or 0)
+
+    def call(item):
+        limiter.acquire()
+        return func(item)
+
+    with ThreadPoolExecutor(max_workers=min(max_in_flight, len(items))) as pool:
+        futures = {pool.submit(call, item): index for index, item in enumerate(items)}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
@@ -0,0 +1,298 @@
+"""
+Async gateway to the Azure OpenAI chat completions REST API.
+
+One ``aiohttp`` session with a bounded connection pool is shared by every call. Each
+request has a timeout and waits on token buckets for the requests-per-minute and
+tokens-per-minute quotas. Throttling (429) and transient 5xx errors are retried with
+jittered exponential backoff, honouring ``Retry-After``/``retry-after-ms``, and a 429
+pauses every request on the gateway rather than just the one that hit it. Identical
+prompts already in flight share a single request.
+
+The pages are synchronous, so the gateway runs on its own event loop thread; ``run_sync``
+and ``iterate_sync`` bridge coroutines and async generators to the calling thread.
+Point ``api_base`` at a local stub server to exercise it without Azure.
+"""
+import asyncio
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from fanalysis.cache import make_key
+from fanalysis.prompting import estimate_tokens
+
+MAX_CONNECTIONS = int(os.environ.get("FANALYSIS_MAX_IN_FLIGHT", "8"))
+REQUESTS_PER_MINUTE = int(os.environ.get("FANALYSIS_REQUESTS_PER_MINUTE", "60"))
+TOKENS_PER_MINUTE = int(os.environ.get("FANALYSIS_TOKENS_PER_MINUTE", "0"))
+REQUEST_TIMEOUT = float(os.environ.get("FANALYSIS_REQUEST_TIMEOUT", "120"))
+MAX_RETRIES = int(os.environ.get("FANALYSIS_MAX_RETRIES", "5"))
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+# Counted against the TPM quota when a request doesn't set max_tokens
+DEFAULT_COMPLETION_TOKENS = 1000
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class GatewayError(RuntimeError):
+    """A request that failed for good (non-retryable status, or retries exhausted)."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at ``per_minute`` / 60 per second; 0 disables it."""
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        if not self.capacity:
+            return
+        # A single request larger than the quota waits for a full bucket rather than forever
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return
+                await asyncio.sleep((amount - self.level) * 60.0 / self.capacity)
+
+    def refund(self, amount):
+        """Return (or, if negative, charge) tokens once the real usage is known."""
+        if self.capacity:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+
+def retry_after_seconds(headers):
+    """Delay requested by the server, from ``retry-after-ms`` or ``Retry-After`` (seconds or HTTP date)."""
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff, or the server's Retry-After plus up to a second of jitter."""
+    if retry_after is not None:
+        return retry_after + random.uniform(0, BACKOFF_BASE)
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+class LLMGateway:
+    """Pooled, rate-limited, retrying chat completions client for one Azure OpenAI resource."""
+
+    def __init__(self, api_base, api_key, api_version, max_connections=MAX_CONNECTIONS,
+                 requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                 timeout=REQUEST_TIMEOUT, max_retries=MAX_RETRIES):
+        self.api_base = api_base.rstrip("/")
+        self.api_key = api_key
+        self.api_version = api_version
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.stats = {"requests": 0, "retries": 0, "coalesced": 0, "throttled": 0}
+        self._session = None
+        self._inflight = {}
+        self._paused_until = 0.0
+
+    def _url(self, deployment):
+        return f"{self.api_base}/openai/deployments/{deployment}/chat/completions?api-version={self.api_version}"
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            import aiohttp
+
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                headers={"api-key": self.api_key},
+            )
+            atexit.register(self._close_at_exit, asyncio.get_running_loop())
+        return self._session
+
+    def _close_at_exit(self, loop):
+        # Only the background loop is still running at exit; a loop from asyncio.run() is gone
+        if self._session is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.close(), loop).result(timeout=5)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _body(self, messages, engine=None, model=None, **params):
+        # Azure routes on the deployment name; a plain model name is treated as one
+        deployment = engine or model
+        if not deployment:
+            raise GatewayError("An engine (deployment) or model name is required")
+        return deployment, dict(params, messages=messages)
+
+    async def _throttle(self, body):
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        cost = sum(estimate_tokens(m["content"]) for m in body["messages"])
+        cost += body.get("max_tokens") or DEFAULT_COMPLETION_TOKENS
+        await self.requests.acquire()
+        await self.tokens.acquire(cost)
+        return cost
+
+    async def _post(self, deployment, body, timeout):
+        """POST with retries; returns the open response of the first successful attempt."""
+        import aiohttp
+
+        session = await self._get_session()
+        for attempt in range(self.max_retries + 1):
+            cost = await self._throttle(body)
+            self.stats["requests"] += 1
+            retry_after, error = None, None
+            try:
+                response = await session.post(self._url(deployment), json=body, timeout=timeout)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = GatewayError(f"Request failed: {e!r}")
+            else:
+                if response.status < 400:
+                    return response, cost
+                text = await response.text()
+                response.release()
+                error = GatewayError(f"HTTP {response.status}: {text[:500]}", status=response.status)
+                if response.status not in RETRYABLE_STATUS:
+                    raise error
+                retry_after = retry_after_seconds(response.headers)
+                if response.status == 429:
+                    self.stats["throttled"] += 1
+                    # The quota is shared, so everyone backs off, not just this request
+                    self._paused_until = max(self._paused_until, time.monotonic() + (retry_after or 0))
+            if attempt == self.max_retries:
+                raise error
+            self.stats["retries"] += 1
+            await asyncio.sleep(backoff_delay(attempt, retry_after))
+
+    async def _complete(self, messages, params):
+        import aiohttp
+
+        deployment, body = self._body(messages, **params)
+        response, cost = await self._post(deployment, body, aiohttp.ClientTimeout(total=self.timeout))
+        async with response:
+            data = await response.json()
+        usage = data.get("usage") or {}
+        if usage.get("total_tokens"):
+            self.tokens.refund(cost - usage["total_tokens"])
+        return data["choices"][0]["message"]["content"]
+
+    async def complete(self, messages, **params):
+        """Completion text for ``messages``; identical in-flight requests share one call."""
+        key = make_key(messages, **params)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._complete(messages, params))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+        # Shielded so one caller giving up doesn't cancel the request for the others
+        return await asyncio.shield(task)
+
+    async def stream(self, messages, **params):
+        """
+        Async generator of completion text fragments (server-sent events).
+
+        Retries happen before the first fragment only; the read timeout applies between
+        chunks, so long answers are not cut off by a total deadline.
+        """
+        import aiohttp
+
+        deployment, body = self._body(messages, stream=True, **params)
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=self.timeout)
+        response, _ = await self._post(deployment, body, timeout)
+        async with response:
+            async for line in response.content:
+                line = line.strip()
+                if not line.startswith(b"data:"):
+                    continue
+                payload = line[len(b"data:"):].strip()
+                if payload == b"[DONE]":
+                    break
+                chunk = json.loads(payload)
+                # Azure sends an initial chunk with no choices (content-filter results)
+                if not chunk.get("choices"):
+                    continue
+                text = chunk["choices"][0].get("delta", {}).get("content")
+                if text:
+                    yield text
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop():
+    """The gateway's event loop, running on a daemon thread started on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="fanalysis-gateway", daemon=True).start()
+    return _loop
+
+
+def run_sync(coro):
+    """Run ``coro`` on the gateway loop and block until it finishes."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+
+def iterate_sync(agen):
+    """Iterate an async generator from synchronous code, one item at a time."""
+    items = queue.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for item in agen:
+                items.put(item)
+        except Exception as e:
+            items.put(e)
+        finally:
+            items.put(done)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), _get_loop())
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Stop reading (and free the connection) if the consumer stopped early
+        future.cancel()
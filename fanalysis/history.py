@@ -0,0 +1,156 @@
+"""
+Durable, bounded search history for the chatbot pages.
+
+Pages used to keep every question and answer in a ``st.session_state`` list and re-render
+all of it on every rerun. ``SearchHistory`` writes each entry to a local SQLite file
+instead (one scope per page and user, see ``ui.history_scope``) and reads back one page
+of entries at a time, so nothing but the page on screen is held in memory and a rerun
+costs the same after 5 questions or 5,000. Past questions and answers are searchable through an FTS5 index (a ``LIKE`` scan
+where SQLite lacks FTS5) and can be exported in bulk as CSV. Only the latest
+``MAX_HISTORY_ENTRIES`` of a scope are kept.
+"""
+import csv
+import io
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from fanalysis.cache import DEFAULT_CACHE_DIR
+
+HISTORY_PAGE_SIZE = int(os.environ.get("FANALYSIS_HISTORY_PAGE_SIZE", "10"))
+MAX_HISTORY_ENTRIES = int(os.environ.get("FANALYSIS_HISTORY_MAX_ENTRIES", "10000"))
+
+
+def _encode(answer):
+    # Computed answers are DataFrames; everything else is stored as text
+    if hasattr(answer, "to_json"):
+        return "table", answer.to_json(orient="split", date_format="iso")
+    return "text", "" if answer is None else str(answer)
+
+
+def _decode(kind, answer):
+    if kind == "table":
+        import pandas as pd
+
+        return pd.read_json(io.StringIO(answer), orient="split")
+    return answer
+
+
+def _match_query(query):
+    # Every word must match (as a prefix); quoting keeps FTS5 syntax characters literal
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", query))
+
+
+class SearchHistory:
+    """
+    Question/answer history of one page (``scope``), newest first.
+
+    Keep one instance per session in ``st.session_state``; entries outlive the session in
+    the SQLite file, so a signed-in user sees the page's earlier questions after a reload.
+    """
+
+    def __init__(self, scope, path=None, max_entries=MAX_HISTORY_ENTRIES):
+        self.scope = scope
+        self.path = path or os.path.join(DEFAULT_CACHE_DIR, "history.sqlite")
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS history ("
+                "id INTEGER PRIMARY KEY, scope TEXT NOT NULL, question TEXT NOT NULL, "
+                "kind TEXT NOT NULL, answer TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS history_scope ON history (scope, id)")
+            try:
+                conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5("
+                    "question, answer, content='history', content_rowid='id')"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN "
+                    "INSERT INTO history_fts (rowid, question, answer) VALUES (new.id, new.question, new.answer); END"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN "
+                    "INSERT INTO history_fts (history_fts, rowid, question, answer) "
+                    "VALUES ('delete', old.id, old.question, old.answer); END"
+                )
+                self.full_text = True
+            except sqlite3.OperationalError:
+                self.full_text = False
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _where(self, query):
+        if not query or not _match_query(query):
+            return "WHERE scope = ?", (self.scope,)
+        if self.full_text:
+            return (
+                "WHERE scope = ? AND id IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ?)",
+                (self.scope, _match_query(query)),
+            )
+        pattern = f"%{query}%"
+        return "WHERE scope = ? AND (question LIKE ? OR answer LIKE ?)", (self.scope, pattern, pattern)
+
+    def add(self, question, answer):
+        kind, text = _encode(answer)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO history (scope, question, kind, answer, created) VALUES (?, ?, ?, ?, ?)",
+                (self.scope, str(question), kind, text, time.time()),
+            )
+            if self.max_entries:
+                conn.execute(
+                    "DELETE FROM history WHERE scope = ? AND id <= ("
+                    "SELECT id FROM history WHERE scope = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (self.scope, self.scope, self.max_entries),
+                )
+
+    def count(self, query=None):
+        where, params = self._where(query)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM history {where}", params).fetchone()[0]
+
+    def page(self, number=0, size=HISTORY_PAGE_SIZE, query=None):
+        """``(question, answer)`` pairs on page ``number`` (0-based), newest first, optionally matching ``query``."""
+        where, params = self._where(query)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT question, kind, answer FROM history {where} ORDER BY id DESC LIMIT ? OFFSET ?",
+                params + (size, number * size),
+            ).fetchall()
+        return [(question, _decode(kind, answer)) for question, kind, answer in rows]
+
+    def export(self):
+        """Every entry of the scope as CSV bytes (question, answer, asked at), oldest first."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["question", "answer", "asked_at"])
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT question, kind, answer, created FROM history WHERE scope = ? ORDER BY id", (self.scope,)
+            )
+            for question, kind, answer, created in rows:
+                if kind == "table":
+                    # Tables as a list of row records, readable in a spreadsheet cell
+                    table = json.loads(answer)
+                    answer = json.dumps([dict(zip(table["columns"], row)) for row in table["data"]], ensure_ascii=False)
+                writer.writerow([question, answer, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created))])
+        return buffer.getvalue().encode("utf-8")
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM history WHERE scope = ?", (self.scope,))
@@ -0,0 +1,210 @@
+"""
+Upload ingestion: sniff encoding and delimiter once, then parse exactly once.
+
+Parsed uploads are additionally cached on local disk as uncompressed Arrow IPC (Feather)
+files keyed on a hash of the file bytes, so a Streamlit rerun memory-maps the columnar
+copy instead of re-parsing the CSV or spreadsheet. Before caching, headers are mapped onto
+the canonical schema with compact dtypes (``fanalysis.mapping``) and bonus exports are
+reconciled against Gross Earnings (``fanalysis.reconcile``), so that work is cached too.
+
+The old helpers tried ``pd.read_csv`` with utf-8, then ISO-8859-1, then latin1, re-parsing
+the (sometimes already consumed) buffer after every failure; others forced latin1 and
+mangled accented agent names. Here the bytes are read once, validated as UTF-8 chunk by
+chunk without parsing, and handed to a single ``read_csv`` call (pyarrow engine if installed).
+"""
+import codecs
+import csv
+import hashlib
+import io
+import json
+import os
+
+import pandas as pd
+
+from fanalysis.cache import DEFAULT_CACHE_DIR
+from fanalysis.mapping import conform
+from fanalysis.reconcile import can_reconcile, describe_reconciliation, is_reconciled, reconcile, reconciliation_summary
+
+UPLOAD_CACHE_DIR = os.path.join(DEFAULT_CACHE_DIR, "uploads")
+MAX_CACHED_UPLOADS = 50
+SNIFF_BYTES = 64 * 1024
+_DECODE_CHUNK = 1024 * 1024
+_DELIMITERS = ",;\t|"
+
+_has_pyarrow = None
+
+
+def _pyarrow_available():
+    global _has_pyarrow
+    if _has_pyarrow is None:
+        try:
+            import pyarrow  # noqa: F401
+
+            _has_pyarrow = True
+        except ImportError:
+            _has_pyarrow = False
+    return _has_pyarrow
+
+
+def read_bytes(file):
+    """All bytes of an uploaded file / path / file-like object, without disturbing its position."""
+    if isinstance(file, (bytes, bytearray)):
+        return bytes(file)
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    if hasattr(file, "read"):
+        pos = file.tell() if hasattr(file, "tell") else None
+        if pos is not None:
+            file.seek(0)
+        data = file.read()
+        if pos is not None:
+            file.seek(pos)
+        return data
+    with open(file, "rb") as f:
+        return f.read()
+
+
+def detect_encoding(data):
+    """
+    ``utf-8-sig``/``utf-8`` if the bytes decode cleanly, else ``cp1252`` (Windows exports), else ``latin1``.
+
+    Validation is incremental, so a multi-byte character split at a chunk boundary is fine.
+    """
+    if data.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    for encoding in ("utf-8", "cp1252"):
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            for start in range(0, len(data), _DECODE_CHUNK):
+                decoder.decode(data[start:start + _DECODE_CHUNK])
+            decoder.decode(b"", final=True)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return "latin1"
+
+
+def sniff_delimiter(text):
+    """Field delimiter guessed from the first lines of ``text`` (defaults to a comma)."""
+    lines = text.splitlines()[:20]
+    if not lines:
+        return ","
+    try:
+        delimiter = csv.Sniffer().sniff("\n".join(lines), delimiters=_DELIMITERS).delimiter
+    except csv.Error:
+        return ","
+    return delimiter if delimiter in lines[0] else ","
+
+
+def read_csv_bytes(data, **kwargs):
+    """Parse CSV bytes once, returning ``(df, info)`` with the detected encoding and delimiter."""
+    encoding = detect_encoding(data)
+    delimiter = sniff_delimiter(data[:SNIFF_BYTES].decode(encoding, errors="ignore"))
+    engine = "pyarrow" if _pyarrow_available() else "c"
+    try:
+        df = pd.read_csv(io.BytesIO(data), encoding=encoding, sep=delimiter, engine=engine, **kwargs)
+    except (ValueError, TypeError, ImportError):
+        if engine == "c":
+            raise
+        # pyarrow rejects some layouts/options the C parser accepts
+        engine = "c"
+        df = pd.read_csv(io.BytesIO(data), encoding=encoding, sep=delimiter, engine=engine, **kwargs)
+    return df, {"format": "csv", "encoding": encoding, "delimiter": delimiter, "engine": engine}
+
+
+def read_upload(file, name=None):
+    """
+    Read an uploaded CSV or Excel file into ``(df, info)``.
+
+    Returns ``(None, {})`` for unsupported extensions, like the old ``read_file`` helpers.
+    """
+    name = (name or getattr(file, "name", None) or str(file)).lower()
+    if name.endswith(".csv"):
+        return read_csv_bytes(read_bytes(file))
+    if name.endswith((".xls", ".xlsx")):
+        return pd.read_excel(io.BytesIO(read_bytes(file))), {"format": "excel"}
+    return None, {}
+
+
+def describe_upload(info):
+    """Short human-readable note about how a file was parsed."""
+    source = " (served from upload cache)" if info.get("cached") else ""
+    checked = f". {describe_reconciliation(info['reconciliation'])}" if info.get("reconciliation") else ""
+    if info.get("renamed"):
+        checked += ". Mapped headers: " + ", ".join(f"{old} → {new}" for old, new in info["renamed"].items())
+    if info.get("format") != "csv":
+        return f"Parsed as {info.get('format', 'unknown')}{source}{checked}"
+    delimiter = {"\t": "tab", ",": "comma", ";": "semicolon", "|": "pipe"}.get(info["delimiter"], info["delimiter"])
+    return f"Detected encoding: {info['encoding']}, delimiter: {delimiter} ({info['engine']} parser){source}{checked}"
+
+
+def fingerprint_bytes(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _prune_upload_cache():
+    entries = sorted(
+        (entry for entry in os.scandir(UPLOAD_CACHE_DIR) if entry.name.endswith(".arrow")),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in entries[:-MAX_CACHED_UPLOADS]:
+        for path in (entry.path, entry.path[:-len(".arrow")] + ".json"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _derive(df, info):
+    # Entries cached before these steps existed get them on load instead
+    if "renamed" not in info:
+        df, renamed = conform(df)
+        info["renamed"] = {str(old): str(new) for old, new in renamed.items()}
+    if can_reconcile(df) and not is_reconciled(df):
+        reconcile(df)
+    if is_reconciled(df):
+        info["reconciliation"] = reconciliation_summary(df)
+    return df, info
+
+
+def load_upload(file, name=None):
+    """
+    Like ``read_upload``, but served from the on-disk columnar cache when the same bytes were seen before.
+
+    ``info`` gains ``fingerprint`` (hash of the file bytes), ``cached``, ``renamed`` (headers
+    mapped onto the canonical schema) and, for bonus exports, ``reconciliation``. Frames
+    Arrow cannot store (e.g. mixed-type spreadsheet columns) are returned uncached.
+    """
+    name = name or getattr(file, "name", None) or str(file)
+    data = read_bytes(file)
+    key = fingerprint_bytes(data)
+    arrow_path = os.path.join(UPLOAD_CACHE_DIR, key + ".arrow")
+    info_path = os.path.join(UPLOAD_CACHE_DIR, key + ".json")
+    if _pyarrow_available() and os.path.exists(arrow_path) and os.path.exists(info_path):
+        try:
+            with open(info_path, encoding="utf-8") as f:
+                info = json.load(f)
+            from pyarrow import feather
+
+            df, info = _derive(feather.read_table(arrow_path, memory_map=True).to_pandas(), info)
+            os.utime(arrow_path)
+            return df, dict(info, fingerprint=key, cached=True)
+        except Exception:
+            pass  # unreadable cache entry: fall through and rebuild it
+
+    df, info = read_upload(data, name=name)
+    if df is None:
+        return df, info
+    df, info = _derive(df, info)
+    if _pyarrow_available():
+        try:
+            os.makedirs(UPLOAD_CACHE_DIR, exist_ok=True)
+            tmp_path = arrow_path + ".tmp"
+            df.to_feather(tmp_path, compression="uncompressed")
+            os.replace(tmp_path, arrow_path)
+            with open(info_path, "w", encoding="utf-8") as f:
+                json.dump(info, f)
+            _prune_upload_cache()
+        except Exception:
+            pass  # not representable in Arrow; caching is best-effort
+    return df, dict(info, fingerprint=key, cached=False)
@@ -0,0 +1,283 @@
+"""
+Background jobs for long LLM calls, with a persistent job table.
+
+A market-entry prediction takes minutes, and running it inside the Streamlit script meant
+any widget click during the wait cancelled it and threw the work away. Here the work is
+submitted as a job instead: a row in a local SQLite table (status, progress, partial and
+final output) run by a small thread pool that lives for the whole server process, so the
+job survives reruns and the page only polls the row. Job ids are derived from what the
+job computes (e.g. file fingerprint + country + prompt), so submitting the same prediction
+twice reuses the existing job. A job's parameters are stored with it; jobs left queued or
+running by a process that has since exited are picked up again by a live one.
+
+Each queue claims jobs under a random owner token and records a heartbeat for it, so an
+orphaned job is one whose owner stopped beating, not one whose pid is free (pids are
+reused after a restart). Every queue looks for orphans when it starts and on each beat.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from fanalysis.cache import DEFAULT_CACHE_DIR, make_key
+
+JOB_WORKERS = int(os.environ.get("FANALYSIS_JOB_WORKERS", "2"))
+# Partial output is written back at most this often (seconds)
+PROGRESS_INTERVAL = 1.0
+ACTIVE = ("queued", "running")
+# Owners record a heartbeat this often (seconds); jobs of an owner silent for STALE_BEATS beats are resumed
+HEARTBEAT_SECONDS = float(os.environ.get("FANALYSIS_JOB_HEARTBEAT_SECONDS", "10"))
+STALE_BEATS = 3
+
+_handlers = {}
+
+
+def job_handler(kind):
+    """
+    Register the decorated ``func(params, report) -> str`` as the runner for ``kind`` jobs.
+
+    ``report(progress, message="", partial=None)`` is throttled to one write per
+    ``PROGRESS_INTERVAL``; ``message`` and ``partial`` may be zero-argument callables, which
+    are only called for the reports actually written.
+    """
+    def register(func):
+        _handlers[kind] = func
+        return func
+    return register
+
+
+_ANY_OWNER = object()
+
+
+class JobQueue:
+    """
+    SQLite job table plus the worker threads that run its jobs.
+
+    A new connection is opened per operation so workers and page scripts can share it.
+    """
+
+    def __init__(self, path=None, workers=JOB_WORKERS):
+        self.path = path or os.path.join(DEFAULT_CACHE_DIR, "jobs.sqlite")
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fanalysis-job")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, label TEXT NOT NULL, params TEXT NOT NULL, "
+                "status TEXT NOT NULL, progress REAL NOT NULL DEFAULT 0, message TEXT NOT NULL DEFAULT '', "
+                "result TEXT, error TEXT, owner TEXT, created REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated)")
+            conn.execute("CREATE TABLE IF NOT EXISTS owners (token TEXT PRIMARY KEY, pid INTEGER, seen REAL NOT NULL)")
+        self._beat()
+        self._resume()
+        threading.Thread(target=self._heartbeat, name="fanalysis-job-heartbeat", daemon=True).start()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _beat(self):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO owners (token, pid, seen) VALUES (?, ?, ?)", (self.owner, os.getpid(), now)
+            )
+            conn.execute("DELETE FROM owners WHERE seen < ?", (now - 100 * HEARTBEAT_SECONDS,))
+
+    def _heartbeat(self):
+        while not self._stopped.wait(HEARTBEAT_SECONDS):
+            self._beat()
+            self._resume()
+
+    def _resume(self):
+        # Jobs whose owner stopped beating (server restart, killed CLI run) start over here
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT id, owner FROM jobs WHERE status IN {ACTIVE} AND (owner IS NULL OR owner NOT IN "
+                "(SELECT token FROM owners WHERE seen >= ?))",
+                (time.time() - STALE_BEATS * HEARTBEAT_SECONDS,),
+            ).fetchall()
+        for row in rows:
+            self._start(row["id"], "Resumed after a restart", owner=row["owner"])
+
+    def _start(self, job_id, message="Queued", owner=_ANY_OWNER):
+        # Claim the row first: with ``owner``, only if no other queue has claimed it meanwhile
+        claim = " AND owner IS ?" if owner is not _ANY_OWNER else ""
+        with self._lock, self._connect() as conn:
+            claimed = conn.execute(
+                "UPDATE jobs SET status = 'queued', progress = 0, message = ?, result = NULL, error = NULL, "
+                f"owner = ?, updated = ? WHERE id = ?{claim}",
+                (message, self.owner, time.time(), job_id) + ((owner,) if claim else ()),
+            ).rowcount
+        if claimed:
+            self._pool.submit(self._run, job_id)
+
+    def _update(self, job_id, **fields):
+        fields["updated"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _run(self, job_id):
+        job = self.get(job_id)
+        if job is None or job["status"] != "queued":
+            return
+        self._update(job_id, status="running", message="Running")
+        last = 0.0
+
+        def report(progress, message="", partial=None):
+            nonlocal last
+            now = time.monotonic()
+            if now - last >= PROGRESS_INTERVAL:
+                last = now
+                self._update(
+                    job_id, progress=min(max(progress, 0.0), 1.0),
+                    message=message() if callable(message) else message,
+                    result=partial() if callable(partial) else partial,
+                )
+
+        try:
+            result = _handlers[job["kind"]](job["params"], report)
+        except Exception as exc:
+            self._update(job_id, status="failed", error=f"{type(exc).__name__}: {exc}", message="Failed")
+        else:
+            self._update(job_id, status="done", progress=1.0, result=result, message="Done")
+
+    def submit(self, job_id, kind, params, label=""):
+        """
+        Queue a ``kind`` job under ``job_id`` and return its row.
+
+        An existing job with the same id is returned as it is (queued, running or done), so
+        duplicate submissions cost nothing; a failed one is run again with the new ``params``.
+        """
+        if kind not in _handlers:
+            raise KeyError(f"No job handler for {kind!r}")
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO jobs (id, kind, label, params, status, owner, created, updated) "
+                "VALUES (?, ?, ?, ?, 'new', ?, ?, ?)",
+                (job_id, kind, label, json.dumps(params, ensure_ascii=False), self.owner, now, now),
+            )
+            status = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()["status"]
+            if status == "failed":
+                conn.execute(
+                    "UPDATE jobs SET params = ?, label = ? WHERE id = ?",
+                    (json.dumps(params, ensure_ascii=False), label, job_id),
+                )
+        job = self.get(job_id)
+        if status in ("new", "failed"):
+            self._start(job_id)
+            job = self.get(job_id)
+        return job
+
+    def get(self, job_id):
+        """The job row as a dict (``params`` decoded), or None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        return job
+
+    def wait(self, job_ids, timeout=None, poll=0.5):
+        """Block until none of ``job_ids`` is queued or running; returns their rows in order."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            jobs = [self.get(job_id) for job_id in job_ids]
+            if all(job is None or job["status"] not in ACTIVE for job in jobs):
+                return jobs
+            if deadline is not None and time.monotonic() >= deadline:
+                return jobs
+            time.sleep(poll)
+
+    def forget(self, job_id):
+        """Delete a finished job's row, so the next submission computes it afresh."""
+        with self._lock, self._connect() as conn:
+            conn.execute(f"DELETE FROM jobs WHERE id = ? AND status NOT IN {ACTIVE}", (job_id,))
+
+    def close(self):
+        """
+        Stop starting queued jobs and stop the heartbeat; the queued jobs stay in the table and
+        are resumed by another queue once this one's heartbeat is stale.
+        """
+        self._stopped.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+_default_queue = None
+_default_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Process-wide queue shared by all the app pages (and sessions)."""
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue()
+    return _default_queue
+
+
+@job_handler("chat")
+def _chat_job(params, report):
+    # A prepared chat request (see llm.chat_request), streamed so the page can show it grow
+    from fanalysis.gateway import DEFAULT_COMPLETION_TOKENS
+    from fanalysis.llm import stream_chat_completion
+    from fanalysis.prompting import estimate_tokens
+
+    expected = params["params"].get("max_tokens") or DEFAULT_COMPLETION_TOKENS
+    # Counted per fragment, and the text only joined for the reports written, so a long
+    # answer costs linear time rather than re-reading everything so far for every fragment
+    fragments, tokens = [], 0
+
+    def text():
+        return "".join(fragments)
+
+    for fragment in stream_chat_completion(params["system"], params["prompt"], **params["params"]):
+        fragments.append(fragment)
+        tokens += estimate_tokens(fragment)
+        report(min(tokens / expected, 0.95), lambda: f"{len(text().split())} words written", text)
+    return text().strip()
+
+
+def market_entry_job_id(fingerprint, country, template):
+    """One prediction per (uploaded file, country, prompt template)."""
+    return make_key("market-entry", fingerprint, country, template)
+
+
+def submit_market_entry(df, fingerprint, country, template, style="structured", rows=50, queue=None):
+    """Queue the market-entry prediction for ``country`` on the first ``rows`` of ``df``; returns the job row."""
+    from fanalysis.llm import chat_request
+    from fanalysis.market import market_entry_prompt
+
+    queue = queue or get_job_queue()
+    job_id = market_entry_job_id(fingerprint, country, template)
+    job = queue.get(job_id)
+    if job is not None and job["status"] != "failed":
+        return job
+    system, prompt, params = chat_request(market_entry_prompt(country, template), df.head(rows), style)
+    return queue.submit(
+        job_id, "chat", {"system": system, "prompt": prompt, "params": params},
+        label=f"Market entry: {country}",
+    )
@@ -0,0 +1,188 @@
+"""
+Azure OpenAI access for the apps.
+
+Chat completions go through the shared response cache and then the async gateway
+(``fanalysis.gateway``: pooled connections, timeouts, retries, rate limits). The gateway
+and its HTTP session are created on first use, so pages that never call the LLM (or
+haven't yet) don't pay for them at startup. ``analyze_chatbot`` renders a token-budgeted
+prompt in one of the prompt styles the pages use, and can answer rephrased repeats of a
+question from the semantic answer cache (``fanalysis.semantic``).
+"""
+import os
+
+from fanalysis.cache import get_cache, make_key
+from fanalysis.charts import fingerprint
+from fanalysis.gateway import LLMGateway, iterate_sync, run_sync
+from fanalysis.prompting import PROMPT_TOKEN_BUDGET, build_data_context, render_prompt
+from fanalysis.retrieval import build_retrieval_context
+from fanalysis.semantic import cached_marker, get_semantic_cache
+
+# OpenAI API Configuration (Azure)
+AZURE_SETTINGS = {
+    "api_key": os.environ.get("AZURE_OPENAI_API_KEY", "14560021aaf84772835d76246b53397a"),
+    "api_base": os.environ.get("AZURE_OPENAI_ENDPOINT", "https://amrxgenai.openai.azure.com/"),
+    "api_type": "azure",
+    "api_version": os.environ.get("AZURE_OPENAI_API_VERSION", "2024-02-15-preview"),
+}
+DEPLOYMENT_NAME = os.environ.get("AZURE_OPENAI_DEPLOYMENT", "gpt")
+
+PROMPT_STYLES = {
+    # demo3-3 / demof / demooo3 family
+    "expert": {
+        "system": "You are a data analyst expert.",
+        "template": """
+    Using the data provided below, analyze and respond to the following question:
+    {data}
+    Question: {question}
+    """,
+        "params": {"engine": DEPLOYMENT_NAME, "temperature": 0.7},
+    },
+    # Per-file agent performance pages
+    "structured": {
+        "system": "You are a data analyst. Provide structured, easy-to-understand answers using bullet points and summaries.",
+        "template": """
+    Analyze the following data and answer the question concisely but informatively.
+    Data:
+    {data}
+    
+    Question: {question}
+    """,
+        "params": {"engine": DEPLOYMENT_NAME, "temperature": 0.5},
+    },
+    # fffdemo
+    "snapshot": {
+        "system": "You are a helpful data analyst AI assistant.",
+        "template": """
+    You are an AI analyst. Given the structured dataset below, answer the user's question as clearly and accurately as possible.
+
+    Data Snapshot:
+    {data}
+
+    Question:
+    {question}
+    """,
+        "params": {"model": "gpt-4-0125-preview", "temperature": 0.5, "max_tokens": 1000},
+    },
+}
+
+_client = None
+_gateway = None
+
+
+def get_client():
+    """The configured ``openai`` module, imported on first use (embeddings only)."""
+    global _client
+    if _client is None:
+        import openai
+
+        for name, value in AZURE_SETTINGS.items():
+            setattr(openai, name, value)
+        _client = openai
+    return _client
+
+
+def get_gateway():
+    """The shared ``LLMGateway`` for the configured Azure resource, created on first use."""
+    global _gateway
+    if _gateway is None:
+        _gateway = LLMGateway(AZURE_SETTINGS["api_base"], AZURE_SETTINGS["api_key"], AZURE_SETTINGS["api_version"])
+    return _gateway
+
+
+def _messages(system_prompt, prompt):
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def _cache_key(system_prompt, prompt, engine=None, temperature=0.7, **kwargs):
+    return make_key(system_prompt, prompt, engine=engine, temperature=temperature, **kwargs)
+
+
+def chat_completion(system_prompt, prompt, engine=None, temperature=0.7, cache=None, **kwargs):
+    """
+    Cached chat completion for a system + user message pair, sent through the gateway.
+
+    Pass ``engine`` for Azure deployments, or ``model=...`` in kwargs for plain model names.
+    """
+    cache = cache or get_cache()
+    key = _cache_key(system_prompt, prompt, engine=engine, temperature=temperature, **kwargs)
+
+    def compute():
+        completion = get_gateway().complete(_messages(system_prompt, prompt), engine=engine, temperature=temperature, **kwargs)
+        return run_sync(completion).strip()
+
+    return cache.get_or_compute(key, compute)
+
+
+def stream_chat_completion(system_prompt, prompt, engine=None, temperature=0.7, cache=None, **kwargs):
+    """
+    Streaming variant of ``chat_completion``: a generator of text fragments.
+
+    A cache hit yields the stored answer in one piece. Otherwise fragments are yielded as the
+    API produces them, and the assembled answer is cached once the stream completes, under
+    the same key ``chat_completion`` uses.
+    """
+    cache = cache or get_cache()
+    key = _cache_key(system_prompt, prompt, engine=engine, temperature=temperature, **kwargs)
+    cached = cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    fragments = get_gateway().stream(_messages(system_prompt, prompt), engine=engine, temperature=temperature, **kwargs)
+    for text in iterate_sync(fragments):
+        parts.append(text)
+        yield text
+    cache.set(key, "".join(parts).strip())
+
+
+def _remember(fragments, scope, question):
+    parts = []
+    for text in fragments:
+        parts.append(text)
+        yield text
+    get_semantic_cache().add(scope, question, "".join(parts).strip())
+
+
+def chat_request(question, df, style="expert", max_tokens=PROMPT_TOKEN_BUDGET, retrieve=False):
+    """
+    ``(system prompt, prompt, params)`` that ``analyze_chatbot`` sends for ``question``.
+
+    Pass them to ``chat_completion`` / ``stream_chat_completion`` later (e.g. from a
+    background job, see ``fanalysis.jobs``) without keeping the frame around.
+    """
+    spec = PROMPT_STYLES[style]
+    context = build_retrieval_context if retrieve else build_data_context
+    return spec["system"], render_prompt(spec["template"], df, question, max_tokens, context), dict(spec["params"])
+
+
+def analyze_chatbot(question, df, style="expert", stream=False, max_tokens=PROMPT_TOKEN_BUDGET, retrieve=False,
+                    similar=False):
+    """
+    Answer ``question`` about ``df`` with the LLM.
+
+    With ``retrieve`` the prompt carries the rows and column profiles most relevant to the
+    question (see ``fanalysis.retrieval``) rather than a generic profile of the file.
+    With ``similar``, a question close enough to one already answered about the same data
+    in the same style gets the stored answer, marked as cached, instead of an LLM call;
+    an exact repeat is still served by the response cache as before.
+    Returns the answer text, or a generator of text fragments when ``stream`` is true.
+    """
+    system, prompt, params = chat_request(question, df, style, max_tokens, retrieve)
+    complete = stream_chat_completion if stream else chat_completion
+    if not similar or _cache_key(system, prompt, **params) in get_cache():
+        return complete(system, prompt, **params)
+
+    scope = make_key(fingerprint(df), style, retrieve)
+    hit = get_semantic_cache().lookup(scope, question)
+    if hit is not None:
+        text = cached_marker(hit[0], hit[2]) + hit[1]
+        return iter([text]) if stream else text
+    if stream:
+        return _remember(complete(system, prompt, **params), scope, question)
+    answer = complete(system, prompt, **params)
+    get_semantic_cache().add(scope, question, answer)
+    return answer
@@ -0,0 +1,114 @@
+"""
+Map uploaded headers onto the canonical schema and compact the column dtypes.
+
+Exports don't always use the exact headers the pages expect (``PSU`` for
+``Personal Sales Unit(PSU)``, ``BCB`` or ``Basic Commission Bonus`` for
+``Basic commission Bonus(BCB)``, different case or spacing). ``resolve_columns`` renames
+them by exact name, then alias (``schema.COLUMN_ALIASES``), then fuzzy match, and is
+memoized per header set. ``conform`` applies it and downcasts repetitive strings to
+categoricals and wide integers to int32; ``load_upload`` runs it once per file, before
+the frame is cached, so reruns get the mapped, compact frame straight from the cache.
+"""
+import difflib
+import functools
+import re
+
+import pandas as pd
+
+from fanalysis.schema import CANONICAL_SCHEMA, COLUMN_ALIASES
+
+# Minimum difflib ratio for a fuzzy header match, and the shortest header tried fuzzily
+FUZZY_CUTOFF = 0.88
+FUZZY_MIN_LENGTH = 6
+# A string column becomes categorical when it has at most this many distinct values per row
+CATEGORY_MAX_RATIO = 0.5
+_INT32 = (-2**31, 2**31 - 1)
+
+
+def header_key(name):
+    return re.sub(r"[^0-9a-z]+", "", str(name).casefold())
+
+
+def _alias_table():
+    table = {}
+    for canonical in CANONICAL_SCHEMA:
+        names = [canonical] + COLUMN_ALIASES.get(canonical, [])
+        abbreviated = re.fullmatch(r"(.*?)\s*\(([^)]+)\)\s*", canonical)
+        if abbreviated:
+            names += [abbreviated.group(1), abbreviated.group(2)]
+        for name in names:
+            table.setdefault(header_key(name), canonical)
+    return table
+
+
+_ALIASES = _alias_table()
+
+
+@functools.lru_cache(maxsize=256)
+def resolve_columns(headers):
+    """
+    ``{header: canonical}`` renames for a tuple of headers.
+
+    Headers already canonical are kept, and a canonical name is never given to two columns:
+    a file with both ``PSU`` and ``Personal Sales Unit(PSU)`` keeps both as they are.
+    """
+    taken = {header for header in headers if header in CANONICAL_SCHEMA}
+    renames, unmatched = {}, []
+    for header in headers:
+        if header in CANONICAL_SCHEMA:
+            continue
+        canonical = _ALIASES.get(header_key(header))
+        if canonical is None:
+            unmatched.append(header)
+        elif canonical not in taken:
+            renames[header] = canonical
+            taken.add(canonical)
+    for header in unmatched:
+        key = header_key(header)
+        if len(key) < FUZZY_MIN_LENGTH:
+            continue
+        for match in difflib.get_close_matches(key, _ALIASES, n=3, cutoff=FUZZY_CUTOFF):
+            if _ALIASES[match] not in taken:
+                renames[header] = _ALIASES[match]
+                taken.add(_ALIASES[match])
+                break
+    return renames
+
+
+def missing_columns(columns, required):
+    """Required canonical columns not in ``columns``, sorted."""
+    present = set(columns)
+    return sorted(col for col in required if col not in present)
+
+
+def _compact(series, kind):
+    if series.dtype.kind == "i":
+        # Not below int32: row-wise sums of narrower ints would overflow
+        if len(series) and _INT32[0] <= series.min() and series.max() <= _INT32[1]:
+            return series.astype("int32")
+        return series
+    if series.dtype.kind != "O" and not pd.api.types.is_string_dtype(series):
+        return series
+    if kind == "number":
+        numeric = pd.to_numeric(series, errors="coerce")
+        # Only when nothing is lost, e.g. numbers stored as text
+        if numeric.notna().sum() == series.notna().sum():
+            return _compact(numeric, kind)
+        return series
+    if kind in ("key", "text", "date"):
+        return series
+    if len(series) and series.nunique(dropna=True) <= CATEGORY_MAX_RATIO * len(series):
+        return series.astype("category")
+    return series
+
+
+def conform(df):
+    """``(df, renames)``: ``df`` with canonical headers and compact dtypes (a new frame)."""
+    renames = resolve_columns(tuple(df.columns))
+    if renames:
+        df = df.rename(columns=renames)
+    df = df.copy(deep=False)
+    # Positional, so duplicate headers are handled too
+    for position, col in enumerate(df.columns):
+        df.isetitem(position, _compact(df.iloc[:, position], CANONICAL_SCHEMA.get(col)))
+    return df, renames
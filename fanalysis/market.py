@@ -0,0 +1,546 @@
+"""
+Market-entry analysis for new countries: the prediction prompts and checklist scoring.
+
+The prompt variants are the ones the per-file pages have used over time; each takes a
+``{country}`` placeholder via ``market_entry_prompt``. Responses are scored against the
+checklists by ``evaluate_market_checklist`` with a compiled matcher (``ChecklistMatcher``)
+that finds every focus phrase, synonym and sub-point in a single pass over the text.
+"""
+import functools
+import re
+
+NEW_COUNTRIES = ["Germany", "France", "Italy", "India", "USA", "Japan", "Brazil", "Singapore"]
+
+BASIC_CHECKLIST = {
+    "🥣 Eating Habits": "Typical food prep methods",
+    "👥 Demographics": "Age distribution",
+    "🏷️ Competition": "top 3 local competitors",
+    "💸 Pricing": "average income",
+    "🛍️ Distribution": "Online vs retail",
+    "📢 Marketing": "Influencer culture",
+    "📚 Education": "product demos",
+    "🍛 Recipe Localization": "Popular regional cuisines",
+    "🔧 After-sales": "service centers",
+    "🌿 Sustainability": "Eco-awareness",
+    "⚖️ Regulatory": "appliance safety laws",
+    "📈 Sales Forecast": "6-month and 1-year prediction"
+}
+DETAILED_CHECKLIST = dict(BASIC_CHECKLIST, **{"🏷️ Competition": "top 5 local competitors"})
+
+CHECKLIST_COLUMNS = ["Area", "Focus", "Evaluation (Pass/Fail)", "Reason"]
+
+# Other wordings that count as covering a focus phrase
+CHECKLIST_SYNONYMS = {
+    "Typical food prep methods": ["food preparation methods", "food prep methods"],
+    "Age distribution": ["age groups", "age structure", "median age"],
+    "top 3 local competitors": ["top 3 competitors", "top three local competitors", "top three competitors"],
+    "top 5 local competitors": [
+        "top 5 competitors", "top 5 Thermomix competitors", "top five local competitors", "top five competitors",
+    ],
+    "average income": ["median income", "disposable income", "income levels", "average salary"],
+    "Online vs retail": ["online versus retail", "online and retail", "e-commerce vs retail"],
+    "Influencer culture": ["influencer marketing", "food influencers", "cooking influencers"],
+    "product demos": ["product demonstrations", "cooking demos", "live demos"],
+    "Popular regional cuisines": ["regional cuisines", "popular local recipes", "regional dishes"],
+    "service centers": ["service centres", "service network", "repair centers"],
+    "Eco-awareness": ["environmental awareness", "eco-conscious"],
+    "appliance safety laws": ["appliance safety regulations", "product safety laws"],
+    "6-month and 1-year prediction": ["6-month forecast", "6-month prediction", "1-year forecast", "12-month forecast"],
+}
+# The other sub-points the prompts ask for in each area; reported as coverage, not needed to pass
+CHECKLIST_SUBPOINTS = {
+    "🥣 Eating Habits": ["meal frequency", "kitchen appliance use", "cultural food preferences", "cooking styles"],
+    "👥 Demographics": ["urban/rural split", "household size", "gender roles in cooking", "tech-savvy"],
+    "🏷️ Competition": ["market share", "price comparison", "feature comparison"],
+    "💸 Pricing": ["affordability", "financing options", "EMI", "price positioning", "price range"],
+    "🛍️ Distribution": ["market penetration", "buying channels", "e-commerce platforms"],
+    "📢 Marketing": ["language preferences", "localized marketing", "brand positioning"],
+    "📚 Education": ["tutorials", "cooking content"],
+    "🍛 Recipe Localization": ["Thermomix adaptability", "recipe websites"],
+    "🔧 After-sales": ["warranty", "support partners"],
+    "🌿 Sustainability": ["energy consumption", "recyclability", "repair regulations", "power rating"],
+    "⚖️ Regulatory": ["certifications", "food contact material", "local regulations"],
+    "📈 Sales Forecast": ["1-year prediction", "market share capture"],
+}
+
+
+# Short brief: the 12 checklist areas with their core sub-points.
+BASIC_PROMPT = """
+You are a market analyst. Given the uploaded sales agent data and general market insights, analyze the opportunity for launching Thermomix by Vorwerk in the country: **{country}**.
+
+Please include the following sections with bullet points and concise insights:
+
+### 1. **Product Overview**
+- Key features and USPs of Thermomix
+- Target consumer profile
+
+### 2. **Country Market Evaluation: {country}**
+Analyze the following **12 key evaluation areas** in-depth. For each area:
+- Provide detailed, country-specific insights covering all sub-points listed below.
+- Explicitly **mention each of the following focus areas verbatim** in your response so the system can validate them.
+- Structure your response such that it includes the **exact phrasing** like "Typical food prep methods", "average income", etc., directly in the bullet points.
+- Ensure every evaluation area gets a **"Pass"** by addressing risks with mitigation strategies where needed.
+
+
+**Checklist Areas:**
+
+1. 🥣 **Eating Habits**
+   - Typical food prep methods
+   - Meal frequency and kitchen appliance use
+
+2. 👥 **Demographics**
+   - Age distribution, urban/rural split
+   - Gender roles in cooking
+   - Tech-savvy population segments
+
+3. 🏷️ **Competition**
+   - List top 3 local competitors (brands/products)
+   - Compare their features, price, and market share
+
+4. 💸 **Pricing**
+   - Local affordability, average income
+   - Financing options, EMIs, price positioning
+
+5. 🛍️ **Distribution**
+   - Online vs retail appliance market penetration
+   - Preferred consumer buying channels
+
+6. 📢 **Marketing**
+   - Influencer culture, language preferences
+   - Suitable localized marketing strategies
+
+7. 📚 **Education & Onboarding**
+   - Acceptance of product demos, tutorials
+   - Existing cooking content formats and platforms
+
+8. 🍛 **Recipe Localization**
+   - Popular regional cuisines
+   - Thermomix adaptability for those dishes
+
+9. 🔧 **After-sales**
+   - Need for service centers, typical warranty expectations
+   - Local support partners if any
+
+10. 🌿 **Sustainability**
+    - Eco-awareness, energy consumption attitudes
+    - Recyclability and repair regulations
+
+11. ⚖️ **Regulatory Compliance**
+    - Local appliance safety laws
+    - Import/export certifications, food contact material rules
+
+12. 📈 **Sales Forecast**
+    - 6-month and 1-year prediction
+    - Market share capture estimate
+
+---
+
+### 3. **Checklist Table Summary**
+Finally, provide a table with the following format:
+| Area | Focus | Evaluation (Pass/Fail) | Reason |
+|------|-------|-------------------------|--------|
+| Eating Habits | [key points] | Pass | [reason] |
+| ... | ... | ... | ... |
+
+✅ Ensure that **each row** provides sufficient evidence to **justify a "Pass"** where applicable.
+
+If there are risks, suggest **mitigation strategies** to turn a Fail into a Pass.
+
+Base all reasoning on real market trends and local context. Be detailed but concise.
+"""
+
+
+# Adds real-world examples, links and extra sub-points per area.
+DETAILED_PROMPT = """
+You are a market analyst. Given the uploaded sales agent data and general market insights, analyze the opportunity for launching Thermomix by Vorwerk in the country: **{country}**.
+
+Please include the following sections with bullet points and concise insights:
+
+### 1. **Product Overview**
+- Key features and USPs of Thermomix
+- Target consumer profile
+
+### 2. **Country Market Evaluation: {country}**
+Analyze the following **12 key evaluation areas** in-depth. For each area:
+- Provide detailed, country-specific insights covering all sub-points listed below.
+- Explicitly **mention each of the following focus areas verbatim** in your response so the system can validate them.
+- Structure your response such that it includes the **exact phrasing** like "Typical food prep methods", "average income", etc., directly in the bullet points.
+- Ensure every evaluation area gets a **"Pass"** by addressing risks with mitigation strategies where needed.
+- **Include real-time examples**, such as:
+  - Names of popular local recipes
+  - Notable influencers in the culinary space
+  - Relevant websites or platforms (with URLs)
+  - Local appliance retailers or e-commerce platforms
+
+🔍 Focus: **High-detail, bullet-based analysis covering the full market readiness checklist with real-world examples, web links, brand names, product comparisons, influencers, laws, pricing, sustainability data, and more.**
+
+📌 **Your output should contain all 12 checklist areas below. Use the exact phrases like 'Typical food prep methods', 'average income', etc., as written so the validation system can parse them.**
+
+🎯 **For each topic:**
+- Use dynamic **country-specific data** (assume access to the internet).
+- Provide **web links** to real sources (e.g. local cooking websites, influencer profiles, appliance stores, regulations).
+- Include **local product names**, **prices**, **examples**, and **facts** where possible,, **supported by links**.
+- **Echo the exact sub-phrases** in bullet points (to ensure checklist scoring works).
+- Include **risks with mitigation strategies** if something is missing.
+**Checklist Areas:**
+
+1. 🥣 **Eating Habits**
+   - Typical food prep methods
+   - Meal frequency and kitchen appliance use
+   - Cultural food preferences
+   - Cooking styles and techniques
+   - Popular local recipes with examples that can be added in Thermomix
+
+
+2. 👥 **Demographics**
+   - Age distribution, urban/rural split
+   - urban population city names
+   - Household size and structure
+   - Gender roles in cooking
+   - Tech-savvy population segments
+
+3. 🏷️ **Competition**
+   - List top 5 Thermomix competitors in {country}
+   - Market share of competitors {country}
+   - Compare their features, price, and market share
+
+4. 💸 **Pricing**
+   - Local affordability, average income
+   - average income with respect to age groups {country}
+   - average income in {country}
+   - Affordability of Thermomix vs. alternatives
+   - Financing options, EMIs, price positioning,estimate price range for product
+
+5. 🛍️ **Distribution**
+   - Online vs retail appliance market penetration
+   - Preferred consumer buying channels
+   - Local appliance retailers or e-commerce platforms (with URLs)
+
+6. 📢 **Marketing**
+   - Influencer culture,Top influencer names, language preferences
+   - Suitable localized marketing strategies with examples
+   - Thermomix brand positioning
+   - Local cooking content formats and platforms with examples
+
+7. 📚 **Education & Onboarding**
+   - Acceptance of product demos, tutorials
+   - Existing cooking content formats and platforms with examples
+
+8. 🍛 **Recipe Localization**
+   - Popular regional cuisines with examples
+   - Local recipe websites or platforms (with URLs)
+   - Thermomix adaptability for those dishes
+
+9. 🔧 **After-sales**
+   - Need for service centers, typical warranty expectations 
+   - Local support partners if any with examples
+   - Local appliance retailers or e-commerce platforms (with URLs)
+
+10. 🌿 **Sustainability**
+    - Eco-awareness, energy consumption attitudes with examples
+    - Recyclability and repair regulations
+    - I am trying to sell product in selected country. Will the power ratign support this appliances
+    - Local sustainability initiatives or certifications
+    - Thermomix's eco-friendly features
+
+11. ⚖️ **Regulatory Compliance**
+    - Local appliance safety laws with real-time examples
+    - Appliance safety laws in {country}
+    - Laws,certifications, food contact material rules with examples
+    - Thermomix's compliance with local regulations
+    - Local certifications or standards
+
+12. 📈 **Sales Forecast**
+    - 6-month and 1-year prediction
+    - Market share capture estimate
+
+---
+
+### 3. **Checklist Table Summary**
+Finally, provide a table with the following format:
+| Area | Focus | Evaluation (Pass/Fail) | Reason |
+|------|-------|-------------------------|--------|
+| Eating Habits | [key points] | Pass | [reason] |
+| ... | ... | ... | ... |
+
+✅ Ensure that **each row** provides sufficient evidence to **justify a "Pass"** where applicable.
+
+If there are risks, suggest **mitigation strategies** to turn a Fail into a Pass.
+
+Base all reasoning on real market trends and local context. Be detailed but concise.
+"""
+
+
+# DETAILED_PROMPT plus product feature ideas and numeric sales forecasts.
+EXTENDED_PROMPT = """
+You are a market analyst. Given the uploaded sales agent data and general market insights, analyze the opportunity for launching Thermomix by Vorwerk in the country: **{country}**.
+
+Please include the following sections with bullet points and concise insights:
+
+### 1. **Product Overview**
+- Key features and USPs of Thermomix
+- Target consumer profile
+- Features that can be added in Thermomix
+
+### 2. **Country Market Evaluation: {country}**
+Analyze the following **12 key evaluation areas** in-depth. For each area:
+- Provide detailed, country-specific insights covering all sub-points listed below.
+- Explicitly **mention each of the following focus areas verbatim** in your response so the system can validate them.
+- Structure your response such that it includes the **exact phrasing** like "Typical food prep methods", "average income", etc., directly in the bullet points.
+- Ensure every evaluation area gets a **"Pass"** by addressing risks with mitigation strategies where needed.
+- **Include real-time examples**, such as:
+  - Names of popular local recipes
+  - Notable influencers in the culinary space
+  - Relevant websites or platforms (with URLs)
+  - Local appliance retailers or e-commerce platforms
+
+🔍 Focus: **High-detail, bullet-based analysis covering the full market readiness checklist with real-world examples, web links, brand names, product comparisons, influencers, laws, pricing, sustainability data, and more.**
+
+📌 **Your output should contain all 12 checklist areas below. Use the exact phrases like 'Typical food prep methods', 'average income', etc., as written so the validation system can parse them.**
+
+🎯 **For each topic:**
+- Use dynamic **country-specific data** (assume access to the internet).
+- Provide **web links** to real sources (e.g. local cooking websites, influencer profiles, appliance stores, regulations).
+- Include **local product names**, **prices**, **examples**, and **facts** where possible,, **supported by links**.
+- **Echo the exact sub-phrases** in bullet points (to ensure checklist scoring works).
+- Include **risks with mitigation strategies** if something is missing.
+**Checklist Areas:**
+
+1. 🥣 **Eating Habits**
+   - Typical food prep methods
+   - Meal frequency and kitchen appliance use
+   - Cultural food preferences
+   - Cooking styles and techniques
+   - Popular local recipes with examples that can be added in Thermomix
+
+
+2. 👥 **Demographics**
+   - Age distribution, urban/rural split
+   - Urban Population City Names
+   - Total population
+   - Household size and structure
+   - Gender roles in cooking
+   - Tech-savvy population segments
+
+3. 🏷️ **Competition**
+   - List top 5 Thermomix competitors in {country}
+   - Market share of competitors {country}
+   - Compare their features, price, and market share
+
+4. 💸 **Pricing**
+   - Local affordability, average income
+   - average income with respect to age groups {country}
+   - average income in {country}
+   - Affordability of Thermomix vs. alternatives
+   - Financing options, EMIs, price positioning,estimate price range for product
+
+5. 🛍️ **Distribution**
+   - Online vs retail appliance market penetration
+   - Preferred consumer buying channels
+   - Local appliance retailers or e-commerce platforms (with URLs)
+
+6. 📢 **Marketing**
+   - Influencer culture,Top influencer names, language preferences
+   - Suitable localized marketing strategies with examples
+   - Thermomix brand positioning
+   - Local cooking content formats and platforms with examples
+
+7. 📚 **Education & Onboarding**
+   - Acceptance of product demos, tutorials
+   - Existing cooking content formats and platforms with examples
+
+8. 🍛 **Recipe Localization**
+   - Popular regional cuisines with examples
+   - Local recipe websites or platforms (with URLs)
+   - Thermomix adaptability for those dishes
+
+9. 🔧 **After-sales**
+   - Need for service centers, typical warranty expectations 
+   - Local support partners if any with examples
+   - Local appliance retailers or e-commerce platforms (with URLs)
+
+10. 🌿 **Sustainability**
+    - Eco-awareness, energy consumption attitudes with examples
+    - Recyclability and repair regulations
+    - I am trying to sell product in selected country. Will the power ratign support this appliances
+    - Local sustainability initiatives or certifications
+    - Thermomix's eco-friendly features
+
+11. ⚖️ **Regulatory Compliance**
+    - Local appliance safety laws with real-time examples
+    - Appliance safety laws in {country}
+    - Laws,certifications, food contact material rules with examples
+    - Thermomix's compliance with local regulations
+    - Local certifications or standards
+
+12. 📈 **Sales Forecast**
+    - Thermomix's market current sales monthly with exact numbers
+    - Thermomix's market sales for 6 months and 1 year with exact numbers
+    - Competitor sales forecast for 6 months and 1 year with exact numbers
+    - Local sales trends and forecasts with exact numbers
+    - Market Positioning and growth potential of thermomix and competitors with exact numbers
+    - Comparative analysis of Thermomix vs. competitors
+    - Market Positiioning and growth potential of thermomix and competitors
+    - Competetive Edge of thermomix over competitors
+    - Challenges and opportunities in the market
+
+---
+
+### 3. **Checklist Table Summary**
+Finally, provide a table with the following format:
+| Area | Focus | Evaluation (Pass/Fail) | Reason |
+|------|-------|-------------------------|--------|
+| Eating Habits | [key points] | Pass | [reason] |
+| ... | ... | ... | ... |
+
+✅ Ensure that **each row** provides sufficient evidence to **justify a "Pass"** where applicable.
+
+If there are risks, suggest **mitigation strategies** to turn a Fail into a Pass.
+
+Base all reasoning on real market trends and local context. Be detailed but concise.
+"""
+
+
+def market_entry_prompt(country, template=EXTENDED_PROMPT):
+    return template.format(country=country)
+
+
+_WORD = re.compile(r"\w+")
+
+
+@functools.lru_cache(maxsize=8192)
+def _normalize(word):
+    # Case and a plural "s" don't matter: "EMIs" matches "EMI", "Laws" matches "laws"
+    word = word.casefold()
+    return word[:-1] if len(word) > 3 and word.endswith("s") else word
+
+
+def phrase_words(phrase):
+    """Normalized words of ``phrase``; spacing, hyphens and punctuation between them are ignored."""
+    return tuple(_normalize(word) for word in _WORD.findall(phrase))
+
+
+class ChecklistMatcher:
+    """
+    Every focus phrase, synonym and sub-point of a checklist compiled into one automaton.
+
+    The phrases are compiled word by word into an Aho-Corasick automaton, so one pass over
+    the words of a response finds every occurrence of every phrase, overlapping ones
+    included (``market share`` inside ``market share capture``), with its character span.
+    Use ``compile_checklist`` to get a cached instance.
+    """
+
+    def __init__(self, checklist, synonyms=CHECKLIST_SYNONYMS, subpoints=CHECKLIST_SUBPOINTS):
+        self.checklist = dict(checklist)
+        self.subpoints = {area: subpoints.get(area, []) for area in self.checklist}
+        self.phrases, self.targets, index = [], [], {}
+        for area, focus in self.checklist.items():
+            phrases = [(focus, "focus")] + [(synonym, "synonym") for synonym in synonyms.get(focus, [])]
+            phrases += [(subpoint, "subpoint") for subpoint in self.subpoints[area]]
+            for phrase, kind in phrases:
+                words = phrase_words(phrase)
+                if words not in index:
+                    index[words] = len(self.phrases)
+                    self.phrases.append(phrase)
+                    self.targets.append([])
+                self.targets[index[words]].append((area, kind))
+        self._lengths = [len(words) for words in index]
+
+        # Trie of the phrases' words, then failure links breadth-first
+        self._goto, self._output = [{}], [[]]
+        for words, i in index.items():
+            state = 0
+            for word in words:
+                if word not in self._goto[state]:
+                    self._goto.append({})
+                    self._output.append([])
+                    self._goto[state][word] = len(self._goto) - 1
+                state = self._goto[state][word]
+            self._output[state].append(i)
+        self._fail = [0] * len(self._goto)
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for word, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(word, 0) if state else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+                queue.append(child)
+
+    def matches(self, text):
+        """``(start, end, area, kind, phrase)`` for every checklist phrase in ``text``, by end position."""
+        goto, fail, output, lengths = self._goto, self._fail, self._output, self._lengths
+        found, starts, state = [], [], 0
+        for position, match in enumerate(_WORD.finditer(text)):
+            starts.append(match.start())
+            word = _normalize(match.group())
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            for i in output[state]:
+                start = starts[position - lengths[i] + 1]
+                for area, kind in self.targets[i]:
+                    found.append((start, match.end(), area, kind, self.phrases[i]))
+        return found
+
+    def _coverage(self, found):
+        passed, subpoints = {}, {area: set() for area in self.checklist}
+        for _, _, area, kind, phrase in found:
+            if kind == "subpoint":
+                subpoints[area].add(phrase_words(phrase))
+            elif area not in passed or kind == "focus":
+                passed[area] = phrase
+        return passed, subpoints
+
+    def evaluate(self, text, found=None):
+        """``(area, focus, "Pass"/"Fail", reason)`` per area, like ``evaluate_market_checklist``."""
+        passed, subpoints = self._coverage(self.matches(text) if found is None else found)
+        results = []
+        for area, focus in self.checklist.items():
+            reason = f"Includes: {passed[area]}" if area in passed else f"Missing: {focus}"
+            if self.subpoints[area]:
+                reason += f" ({len(subpoints[area])} of {len(self.subpoints[area])} sub-points)"
+            results.append((area, focus, "Pass" if area in passed else "Fail", reason))
+        return results
+
+    def score_many(self, responses):
+        """
+        Checklist scores for many responses at once (e.g. an archive of country reports).
+
+        ``responses`` is a mapping or Series of label -> text, or a list of texts. One row
+        per response: a Pass flag per area, the number of areas passed and the share of
+        sub-points covered.
+        """
+        import pandas as pd
+
+        responses = pd.Series(responses, dtype=object)
+        total = sum(len(points) for points in self.subpoints.values())
+        rows = []
+        for text in responses.fillna(""):
+            passed, subpoints = self._coverage(self.matches(str(text)))
+            row = {area: area in passed for area in self.checklist}
+            row["Passed"] = len(passed)
+            row["Sub-points"] = round(sum(map(len, subpoints.values())) / total, 3) if total else 0.0
+            rows.append(row)
+        return pd.DataFrame(rows, index=responses.index, columns=list(self.checklist) + ["Passed", "Sub-points"])
+
+
+@functools.lru_cache(maxsize=16)
+def _compiled(items):
+    return ChecklistMatcher(dict(items))
+
+
+def compile_checklist(checklist=DETAILED_CHECKLIST):
+    """The ``ChecklistMatcher`` for ``checklist``, compiled once per distinct checklist."""
+    return _compiled(tuple(checklist.items()))
+
+
+def evaluate_market_checklist(response_text, checklist=DETAILED_CHECKLIST):
+    """``(area, focus, "Pass"/"Fail", reason)`` per checklist area, from one scan of the response."""
+    return compile_checklist(checklist).evaluate(response_text)
+
+
+def score_market_reports(responses, checklist=DETAILED_CHECKLIST):
+    """``ChecklistMatcher.score_many`` for ``checklist``."""
+    return compile_checklist(checklist).score_many(responses)
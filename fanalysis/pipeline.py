@@ -0,0 +1,96 @@
+"""
+Incremental, staged processing for pages that take several uploaded files.
+
+Each file runs through an ordered list of stages (e.g. parse -> profile -> summary). Stages
+of different files run concurrently on a thread pool, and every finished stage is reported
+back to the calling thread straight away, so a page can render a file's preview while its
+LLM summary is still being written. Completed files are remembered by content
+fingerprint: on the next rerun an unchanged file is served from memory and only new or
+changed files are processed.
+"""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from fanalysis.fanout import MAX_IN_FLIGHT
+from fanalysis.ingest import fingerprint_bytes, read_bytes
+
+
+def run_stages(items, stages, max_workers=None):
+    """
+    Run ``stages`` (``(name, func)`` pairs) over every item, yielding ``(index, name, value, error)``.
+
+    ``func(item, outputs)`` gets the outputs of the item's earlier stages by name. An item's
+    next stage is submitted as soon as its previous one finishes, independently of the
+    other items; a failing stage yields its exception and ends that item's chain. Results
+    are yielded in completion order, in the calling thread.
+    """
+    items = list(items)
+    if not items or not stages:
+        return
+    outputs = [{} for _ in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers or MAX_IN_FLIGHT, len(items))) as pool:
+        def submit(index, step):
+            name, func = stages[step]
+            return pool.submit(func, items[index], outputs[index])
+
+        running = {submit(index, 0): (index, 0) for index in range(len(items))}
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, step = running.pop(future)
+                name = stages[step][0]
+                try:
+                    value = future.result()
+                except Exception as e:
+                    yield index, name, None, e
+                    continue
+                outputs[index][name] = value
+                if step + 1 < len(stages):
+                    running[submit(index, step + 1)] = (index, step + 1)
+                yield index, name, value, None
+
+
+class FilePipeline:
+    """
+    ``run_stages`` over uploaded files, memoized per file content.
+
+    Keep one instance per session (e.g. in ``st.session_state``). Only files whose every
+    stage succeeded are remembered, so a failed file is retried on the next run.
+    """
+
+    def __init__(self, stages, max_workers=None):
+        self.stages = stages
+        self.max_workers = max_workers
+        self.results = {}
+
+    def run(self, files):
+        """
+        Yield ``(index, name, value, error)`` for the stages of ``files``.
+
+        Remembered files yield all their stage outputs first, without recomputing anything;
+        the rest follow as their stages complete. Results for files that are no longer in
+        ``files`` are dropped.
+        """
+        keys = [fingerprint_bytes(read_bytes(file)) for file in files]
+        for key in set(self.results) - set(keys):
+            del self.results[key]
+
+        pending = []
+        for index, key in enumerate(keys):
+            if key in self.results:
+                for name, _ in self.stages:
+                    yield index, name, self.results[key][name], None
+            elif key not in (keys[i] for i in pending):
+                pending.append(index)
+
+        completed = {}
+        for position, name, value, error in run_stages([files[i] for i in pending], self.stages, self.max_workers):
+            index = pending[position]
+            if error is None:
+                completed.setdefault(index, {})[name] = value
+                if len(completed[index]) == len(self.stages):
+                    self.results[keys[index]] = completed[index]
+            yield index, name, value, error
+            # The same bytes uploaded twice are processed once and reported for both
+            for twin, key in enumerate(keys):
+                if twin != index and key == keys[index] and twin not in pending:
+                    yield twin, name, value, error
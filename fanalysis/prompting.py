@@ -0,0 +1,178 @@
+"""
+Token-budgeted prompt context for dataframe questions.
+
+Instead of dumping ``df.to_string()`` into the prompt, the context is assembled from the
+most informative pieces first (shape, schema, numeric summary stats, group aggregates for
+columns the question mentions, then a deterministic row sample) and stops adding
+content as soon as the token budget is used up.
+"""
+import math
+import os
+import re
+
+PROMPT_TOKEN_BUDGET = int(os.environ.get("FANALYSIS_PROMPT_TOKENS", "6000"))
+MAX_GROUPS = 25
+MAX_GROUP_COLUMNS = 4
+
+_encoding = None
+# The pieces cl100k_base splits text into before BPE; each is at least one token. Digit runs
+# are split into groups of 1-3 digits that are a single token each.
+_PIECES = re.compile(
+    r"(?P<digits>\d{1,3})"
+    r"|(?P<word>'(?:[sdmt]|ll|ve|re)|[^\r\n\w]?[^\W\d_]+)"
+    r"|(?P<symbols> ?(?:[^\s\w]|_)+[\r\n]*)"
+    r"|(?P<space>\s+)",
+    re.IGNORECASE,
+)
+
+
+def _upper_estimate(text):
+    # Per piece: 1 token for a digit group, one per 3 bytes of a word, one per byte of
+    # punctuation and one per 4 whitespace characters. That is at least the real count for
+    # numbers and symbols, and for all but unusually fragmented words.
+    count = 0
+    for piece in _PIECES.finditer(text):
+        kind, value = piece.lastgroup, piece.group()
+        if kind == "digits":
+            count += 1
+        elif kind == "word":
+            count += math.ceil(len(value.encode("utf-8")) / 3)
+        elif kind == "symbols":
+            count += max(1, len(value.lstrip(" ").encode("utf-8")))
+        else:
+            count += math.ceil(len(value) / 4)
+    return count
+
+
+def estimate_tokens(text):
+    """
+    Token count for ``text``.
+
+    Uses tiktoken's cl100k_base encoding when it is installed (and its encoding file is
+    cached or downloadable). Otherwise it makes a conservative estimate from the same
+    pre-tokenization, so the real count stays under the budget even for numeric data.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return _upper_estimate(text)
+
+
+def _take_lines(lines, budget):
+    """Longest prefix of ``lines`` (joined by newlines) that fits in ``budget`` tokens."""
+    taken, used = [], 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        taken.append(line)
+        used += cost
+    return taken
+
+
+def _words(text):
+    return set(re.findall(r"[a-z0-9]+", str(text).lower()))
+
+
+def _group_columns(df, question):
+    """Low-cardinality categorical columns, the ones named in the question first."""
+    asked = _words(question)
+    candidates = []
+    for col in df.columns:
+        if df[col].dtype.kind in "iufcb":
+            continue
+        nunique = df[col].nunique(dropna=True)
+        if 1 < nunique <= MAX_GROUPS * 4:
+            mentioned = bool(_words(col) & asked)
+            candidates.append((not mentioned, nunique, col))
+    candidates.sort(key=lambda c: (c[0], c[1]))
+    return [col for _, _, col in candidates[:MAX_GROUP_COLUMNS]]
+
+
+def _schema_lines(df):
+    lines = ["Columns (name: dtype, non-null, unique):"]
+    for col in df.columns:
+        series = df[col]
+        lines.append(f"- {col}: {series.dtype}, {series.notna().sum()}, {series.nunique(dropna=True)}")
+    return lines
+
+
+def _stats_lines(numeric):
+    if numeric.empty:
+        return []
+    stats = numeric.agg(["sum", "mean", "min", "max"]).T.round(2)
+    return ["Numeric column statistics:"] + stats.to_csv().splitlines()
+
+
+def _group_lines(df, numeric_cols, col):
+    grouped = df.groupby(col, observed=True)
+    table = grouped[numeric_cols].sum().round(2) if numeric_cols else grouped.size().to_frame("rows")
+    if numeric_cols:
+        table.insert(0, "rows", grouped.size())
+    table = table.sort_values("rows", ascending=False).head(MAX_GROUPS)
+    return [f"Totals by {col}:"] + table.to_csv().splitlines()
+
+
+def _sample_lines(df, budget):
+    """Deterministic random row sample sized to the remaining budget (CSV is denser than to_string)."""
+    header = "Sample rows:" if len(df) > 1 else "Rows:"
+    probe = df.head(20).to_csv(index=False).splitlines()
+    if len(probe) < 2:
+        return []
+    per_row = max(estimate_tokens(line) + 1 for line in probe[1:])
+    fixed = estimate_tokens(header) + estimate_tokens(probe[0]) + 2
+    n = min(len(df), max(0, (budget - fixed) // per_row))
+    if n <= 0:
+        return []
+    rows = df if n >= len(df) else df.sample(n=n, random_state=0).sort_index()
+    if n < len(df):
+        header = f"Sample of {n} of {len(df)} rows:"
+    return _take_lines([header] + rows.to_csv(index=False).splitlines(), budget)
+
+
+def build_data_context(df, question="", max_tokens=PROMPT_TOKEN_BUDGET):
+    """Render ``df`` as prompt text of at most ``max_tokens`` tokens."""
+    numeric = df.select_dtypes("number")
+    numeric = numeric[[col for col in numeric.columns if "id" not in _words(col)]]
+    budget = max_tokens
+    parts = []
+
+    def add(lines):
+        nonlocal budget
+        lines = _take_lines(lines, budget)
+        if lines:
+            parts.append("\n".join(lines))
+            budget -= sum(estimate_tokens(line) + 1 for line in lines) + 1
+
+    add([f"Dataset: {len(df)} rows x {len(df.columns)} columns."])
+    rows = df.to_csv(index=False).splitlines() if len(df) <= 50 else []
+    if rows and sum(estimate_tokens(line) + 1 for line in rows) <= budget:
+        # Small frames (filtered slices, head() previews) are cheapest to send whole
+        add(rows)
+        return "\n\n".join(parts)
+    add(_schema_lines(df))
+    add(_stats_lines(numeric))
+    for col in _group_columns(df, question):
+        add(_group_lines(df, list(numeric.columns), col))
+    add(_sample_lines(df, budget))
+    return "\n\n".join(parts)
+
+
+def render_prompt(template, df, question, max_tokens=PROMPT_TOKEN_BUDGET, context=build_data_context):
+    """
+    Fill ``template``'s ``{data}`` and ``{question}`` fields, keeping the whole prompt under ``max_tokens``.
+
+    ``context(df, question, budget)`` renders the data; ``build_data_context`` by default.
+    """
+    skeleton = template.format(data="", question=question)
+    budget = max_tokens - estimate_tokens(skeleton)
+    if budget <= 0:
+        raise ValueError(f"Question alone exceeds the {max_tokens}-token prompt budget")
+    return template.format(data=context(df, question, budget), question=question)
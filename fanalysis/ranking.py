@@ -0,0 +1,82 @@
+"""
+Top-N / bottom-N selection without sorting whole frames.
+
+``top_n`` finds the N best rows with ``numpy.argpartition`` (linear time) and only sorts
+those N; ties are broken by row order, the same as ``DataFrame.nlargest(keep="first")``.
+``group_top_n`` builds per-group leaderboards (per manager, per position) for every group
+with one lexsort of the metric, instead of a groupby-apply per group. Missing or
+non-numeric metric values are never ranked.
+"""
+import numpy as np
+import pandas as pd
+
+from fanalysis.schema import COMMISSION_COLUMNS, TOTAL_COMMISSIONS
+
+TOP_N = 10
+
+
+def _keys(df, metric, largest):
+    values = pd.to_numeric(df[metric], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    # Smallest key first either way
+    return -values if largest else values
+
+
+def select_positions(keys, n):
+    """Positions of the ``n`` smallest non-NaN ``keys``, smallest first, earlier rows first on ties."""
+    valid = np.flatnonzero(~np.isnan(keys))
+    if n <= 0 or not len(valid):
+        return valid[:0]
+    if n < len(valid):
+        threshold = np.partition(keys[valid], n - 1)[n - 1]
+        below = valid[keys[valid] < threshold]
+        ties = valid[keys[valid] == threshold][: n - len(below)]
+        valid = np.concatenate([below, ties])
+    return valid[np.lexsort((valid, keys[valid]))]
+
+
+def top_n(df, metric, n=TOP_N, largest=True):
+    """The ``n`` rows with the largest (or smallest) ``metric``, best first, original index kept."""
+    return df.iloc[select_positions(_keys(df, metric, largest), n)]
+
+
+def group_top_n(df, metric, by, n=TOP_N, largest=True):
+    """
+    Leaderboard of the best ``n`` rows by ``metric`` within each ``by`` group.
+
+    Groups come out in sorted order with a ``Rank`` column (1 = best) after the group column.
+    """
+    keys = _keys(df, metric, largest)
+    codes, _ = pd.factorize(df[by], sort=True)
+    rows = np.flatnonzero(~np.isnan(keys) & (codes >= 0))
+    rows = rows[np.lexsort((rows, keys[rows], codes[rows]))]
+    groups = codes[rows]
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    sizes = np.diff(np.r_[starts, len(rows)])
+    ranks = np.arange(len(rows)) - np.repeat(starts, sizes) + 1
+    keep = ranks <= n
+    table = df.iloc[rows[keep]]
+    columns = [by] + [col for col in table.columns if col != by]
+    return table[columns].assign(Rank=ranks[keep])[[by, "Rank"] + columns[1:]]
+
+
+def leaderboards(df, metrics, n=TOP_N, largest=True, by=None):
+    """``{metric: table}`` of ``top_n`` (or, with ``by``, ``group_top_n``) for each metric."""
+    if by is None:
+        return {metric: top_n(df, metric, n, largest) for metric in metrics if metric in df.columns}
+    return {metric: group_top_n(df, metric, by, n, largest) for metric in metrics if metric in df.columns}
+
+
+def commission_totals(df, columns=COMMISSION_COLUMNS):
+    """
+    BCB + SCB + RCB + PCB per row as the ``Total Commissions`` column, computed once per frame.
+
+    The column is added by plain column additions (no row-wise ``sum(axis=1)``) and reused on
+    later calls with the same frame; uploads already carry it from ``fanalysis.reconcile``.
+    """
+    if TOTAL_COMMISSIONS not in df.columns:
+        total = np.zeros(len(df))
+        for col in columns:
+            if col in df.columns:
+                total += pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy(dtype=float)
+        df[TOTAL_COMMISSIONS] = total
+    return df[TOTAL_COMMISSIONS]
@@ -0,0 +1,91 @@
+"""
+Commission reconciliation of bonus exports, run once at ingestion.
+
+Every row's Gross Earnings should equal its bonus components: the four commissions (BCB,
+SCB, RCB, PCB, summed as Total Commissions) plus any adhoc payment (ADP). ``reconcile``
+adds the totals, the difference from Gross Earnings and a mismatch flag as columns with
+vectorized column arithmetic; ``load_upload`` runs it before caching, so the derived
+columns come back with the cached frame and an accuracy check is a column lookup rather
+than an LLM reading a text dump of the rows.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from fanalysis.schema import (
+    AGENT_COLUMNS,
+    BONUS_COLUMNS,
+    COMMISSION_COLUMNS,
+    COMPONENT_TOTAL,
+    EARNINGS_COLUMN,
+    EARNINGS_DIFFERENCE,
+    EARNINGS_MISMATCH,
+    RECONCILIATION_COLUMNS,
+    TOTAL_COMMISSIONS,
+)
+
+# Largest |Gross Earnings - components| still counted as a match (currency units)
+RECONCILE_TOLERANCE = float(os.environ.get("FANALYSIS_RECONCILE_TOLERANCE", "0.01"))
+
+
+def _amounts(df, columns):
+    # Missing or non-numeric amounts count as 0, like everywhere else in the apps
+    total = np.zeros(len(df))
+    for col in columns:
+        if col in df.columns:
+            total += pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy(dtype=float)
+    return total
+
+
+def can_reconcile(df):
+    return EARNINGS_COLUMN in df.columns and any(col in df.columns for col in COMMISSION_COLUMNS)
+
+
+def is_reconciled(df):
+    return all(col in df.columns for col in RECONCILIATION_COLUMNS)
+
+
+def reconcile(df, tolerance=RECONCILE_TOLERANCE):
+    """Add the reconciliation columns to ``df`` in place and return it."""
+    commissions = _amounts(df, COMMISSION_COLUMNS)
+    components = commissions + _amounts(df, BONUS_COLUMNS[len(COMMISSION_COLUMNS):])
+    difference = _amounts(df, [EARNINGS_COLUMN]) - components
+    df[TOTAL_COMMISSIONS] = commissions
+    df[COMPONENT_TOTAL] = components
+    df[EARNINGS_DIFFERENCE] = difference.round(2)
+    df[EARNINGS_MISMATCH] = np.abs(difference) > tolerance
+    return df
+
+
+def reconciliation_summary(df, tolerance=RECONCILE_TOLERANCE):
+    """JSON-friendly counts for a reconciled frame (kept in the upload info)."""
+    mismatched = df[EARNINGS_MISMATCH].to_numpy()
+    difference = df[EARNINGS_DIFFERENCE].to_numpy()
+    return {
+        "rows": int(len(df)),
+        "mismatched": int(mismatched.sum()),
+        "tolerance": tolerance,
+        "max_difference": float(np.abs(difference).max()) if len(df) else 0.0,
+        "net_difference": round(float(difference.sum()), 2),
+    }
+
+
+def mismatched_rows(df):
+    """Rows whose components don't add up to Gross Earnings, largest discrepancy first."""
+    rows = df[df[EARNINGS_MISMATCH]]
+    columns = [col for col in AGENT_COLUMNS + BONUS_COLUMNS if col in df.columns]
+    columns += [TOTAL_COMMISSIONS, COMPONENT_TOTAL, EARNINGS_COLUMN, EARNINGS_DIFFERENCE]
+    order = np.argsort(-np.abs(rows[EARNINGS_DIFFERENCE].to_numpy()), kind="stable")
+    return rows.iloc[order][columns]
+
+
+def describe_reconciliation(summary):
+    """One line for the upload caption / search history."""
+    if not summary["mismatched"]:
+        return f"All {summary['rows']} rows reconcile: bonus components add up to {EARNINGS_COLUMN}."
+    return (
+        f"{summary['mismatched']} of {summary['rows']} rows differ from {EARNINGS_COLUMN} by more than "
+        f"{summary['tolerance']:g} (largest difference {summary['max_difference']:,.2f}, "
+        f"net {summary['net_difference']:,.2f})."
+    )
@@ -0,0 +1,233 @@
+"""
+Question-specific prompt context from a per-file vector index.
+
+Every row of an uploaded frame and a short profile of every column (stats for numeric
+columns, group totals for categorical ones) are embedded once and kept in a brute-force
+NumPy index, cached per frame fingerprint. A question's prompt then carries the column
+profiles and rows most similar to it instead of the same generic dump for every question.
+
+Embeddings come from a pluggable ``embed(texts) -> array`` function. Offline (the
+default) texts are instead feature-hashed into sparse TF-IDF vectors; setting
+``AZURE_OPENAI_EMBEDDING_DEPLOYMENT`` switches to an Azure embedding deployment.
+"""
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from fanalysis.charts import fingerprint
+from fanalysis.prompting import (
+    MAX_GROUPS,
+    PROMPT_TOKEN_BUDGET,
+    _group_lines,
+    _schema_lines,
+    _take_lines,
+    _words,
+    build_data_context,
+    estimate_tokens,
+)
+
+HASH_DIM = 1 << 20
+EMBEDDING_DEPLOYMENT = os.environ.get("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+TOP_K_ROWS = int(os.environ.get("FANALYSIS_TOP_K_ROWS", "20"))
+TOP_K_PROFILES = 6
+MAX_CACHED_INDEXES = 4
+EMBED_BATCH = 16
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+_indexes = OrderedDict()
+_lock = threading.Lock()
+
+
+def hash_tokens(texts, dim=HASH_DIM):
+    """``(text position, hashed token)`` pairs for every token of every text."""
+    positions, buckets = [], []
+    for i, text in enumerate(texts):
+        for token in _TOKEN.findall(str(text).lower()):
+            positions.append(i)
+            buckets.append(zlib.crc32(token.encode("utf-8")) % dim)
+    return np.asarray(positions, dtype=np.int64), np.asarray(buckets, dtype=np.int64)
+
+
+def openai_embedder(texts):
+    """Embeddings from the Azure deployment named by ``AZURE_OPENAI_EMBEDDING_DEPLOYMENT``."""
+    from fanalysis.llm import get_client
+
+    client = get_client()
+    vectors = []
+    for start in range(0, len(texts), EMBED_BATCH):
+        batch = [str(text) for text in texts[start:start + EMBED_BATCH]]
+        response = client.Embedding.create(input=batch, engine=EMBEDDING_DEPLOYMENT)
+        vectors.extend(item["embedding"] for item in response["data"])
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def get_embedder():
+    """The configured embedding function, or None for the offline hashing + TF-IDF default."""
+    return openai_embedder if EMBEDDING_DEPLOYMENT else None
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def _tfidf(positions, buckets, idf, n):
+    """Unit-length sparse TF-IDF vectors as parallel (position, bucket, weight) arrays."""
+    keys, tf = np.unique(positions * HASH_DIM + buckets, return_counts=True)
+    positions, buckets = keys // HASH_DIM, keys % HASH_DIM
+    weights = np.log1p(tf) * idf[buckets]
+    norms = np.sqrt(np.bincount(positions, weights=weights ** 2, minlength=n))
+    return positions, buckets, weights / norms[positions]
+
+
+class VectorIndex:
+    """
+    Brute-force cosine-similarity index over ``texts``.
+
+    With an ``embed`` function the texts are embedded into a dense matrix and scored with one
+    matrix-vector product. Without one, texts become sparse hashed TF-IDF vectors stored
+    bucket-major, so a query only touches the rows that share a term with it and rare terms
+    (an agent's name) outweigh ones that appear in every row.
+    """
+
+    def __init__(self, texts, embed=None):
+        self.embed = embed
+        self.size = len(texts)
+        if embed is not None:
+            self.vectors = _normalize(np.asarray(embed(list(texts)), dtype=np.float32))
+            return
+        positions, buckets = hash_tokens(texts)
+        doc_freq = np.bincount(np.unique(positions * HASH_DIM + buckets) % HASH_DIM, minlength=HASH_DIM)
+        self.idf = (np.log((1 + self.size) / (1 + doc_freq)) + 1).astype(np.float32)
+        positions, buckets, weights = _tfidf(positions, buckets, self.idf, self.size)
+        order = np.argsort(buckets, kind="stable")
+        self.buckets, self.positions, self.weights = buckets[order], positions[order], weights[order]
+
+    def __len__(self):
+        return self.size
+
+    def _scores(self, query):
+        if self.embed is not None:
+            return self.vectors @ _normalize(np.asarray(self.embed([query]), dtype=np.float32)[0])
+        scores = np.zeros(self.size)
+        positions, buckets = hash_tokens([query])
+        if not len(buckets):
+            return scores
+        _, query_buckets, query_weights = _tfidf(positions, buckets, self.idf, 1)
+        starts = np.searchsorted(self.buckets, query_buckets, side="left")
+        ends = np.searchsorted(self.buckets, query_buckets, side="right")
+        for start, end, weight in zip(starts, ends, query_weights):
+            # A row appears at most once per bucket, so plain fancy-index accumulation is safe
+            scores[self.positions[start:end]] += self.weights[start:end] * weight
+        return scores
+
+    def search(self, query, k):
+        """Up to ``k`` ``(position, score)`` pairs with a positive score, best first."""
+        if not self.size or k <= 0:
+            return []
+        scores = self._scores(query)
+        k = min(k, self.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
+
+def row_texts(df):
+    """One ``value | value | ...`` line per row."""
+    columns = [df[col].astype(str) for col in df.columns]
+    text = columns[0]
+    for col in columns[1:]:
+        text = text + " | " + col
+    return text.tolist()
+
+
+def column_profiles(df):
+    """``(column, lines)`` pairs describing each column, ready to drop into a prompt."""
+    numeric_cols = [col for col in df.select_dtypes("number").columns if "id" not in _words(col)]
+    profiles = []
+    for col in df.columns:
+        series = df[col]
+        if col in numeric_cols:
+            stats = series.agg(["sum", "mean", "min", "max"]).round(2)
+            lines = [f"{col} (numeric): " + ", ".join(f"{name} {value}" for name, value in stats.items())]
+        elif 1 < series.nunique(dropna=True) <= MAX_GROUPS * 4:
+            lines = _group_lines(df, numeric_cols, col)
+        else:
+            examples = ", ".join(map(str, series.dropna().unique()[:5]))
+            lines = [f"{col}: {series.nunique(dropna=True)} distinct values, e.g. {examples}"]
+        profiles.append((col, lines))
+    return profiles
+
+
+class FrameIndex:
+    """Row and column-profile indexes for one dataframe."""
+
+    def __init__(self, df, embed=None):
+        self.df = df
+        self.profiles = column_profiles(df)
+        # The column name is repeated so a question naming a column finds its profile
+        self.profile_index = VectorIndex(
+            [f"{col} {col} " + " ".join(lines) for col, lines in self.profiles], embed
+        )
+        self.row_index = VectorIndex(row_texts(df), embed)
+
+    def relevant_profiles(self, question, k=TOP_K_PROFILES):
+        return [self.profiles[i] for i, _ in self.profile_index.search(question, k)]
+
+    def relevant_rows(self, question, k=TOP_K_ROWS):
+        return self.df.iloc[[i for i, _ in self.row_index.search(question, k)]]
+
+
+def get_frame_index(df, embed=None):
+    """The index for ``df``, built on first use and cached by content fingerprint."""
+    embed = embed if embed is not None else get_embedder()
+    key = (fingerprint(df), embed)
+    with _lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+    index = FrameIndex(df, embed)
+    with _lock:
+        _indexes[key] = index
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def build_retrieval_context(df, question="", max_tokens=PROMPT_TOKEN_BUDGET):
+    """
+    Like ``build_data_context``, but with the column profiles and rows most relevant to ``question``.
+
+    Frames small enough to send whole are sent whole. If no row matches the question, a
+    deterministic sample of the same size stands in for the retrieved rows.
+    """
+    if len(df) <= 50:
+        return build_data_context(df, question, max_tokens)
+    index = get_frame_index(df)
+    budget = max_tokens
+    parts = []
+
+    def add(lines):
+        nonlocal budget
+        lines = _take_lines(lines, budget)
+        if lines:
+            parts.append("\n".join(lines))
+            budget -= sum(estimate_tokens(line) + 1 for line in lines) + 1
+
+    add([f"Dataset: {len(df)} rows x {len(df.columns)} columns."])
+    add(_schema_lines(df))
+    for _, lines in index.relevant_profiles(question):
+        add(lines)
+    rows = index.relevant_rows(question)
+    if rows.empty:
+        rows = df.sample(n=min(TOP_K_ROWS, len(df)), random_state=0).sort_index()
+        add([f"Sample of {len(rows)} of {len(df)} rows:"] + rows.to_csv(index=False).splitlines())
+    else:
+        add([f"Rows most relevant to the question ({len(rows)} of {len(df)}):"] + rows.to_csv(index=False).splitlines())
+    return "\n\n".join(parts)
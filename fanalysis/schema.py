@@ -0,0 +1,84 @@
+"""Column names and chart catalogues shared by the apps."""
+
+# Bonus export (Report Generator / Bonus Analysis pages)
+REQUIRED_BONUS_COLUMNS = {"Partner Id", "Last Name", "Paid As Position", "Gender", "Date of Birth", "Manager Name", "Recruiter Name", "Paid As", "Personal Sales Unit(PSU)", "Team Units(TU)", "First Name", "Adhoc Payment(ADP)", "Recruitment Commission Bonus (RCB)", "Basic commission Bonus(BCB)", "Super Commission Bonus(SCB)", "Performance Bonus (PCB)", "Gross Earnings"}
+
+BONUS_COLUMNS = [
+    "Basic commission Bonus(BCB)",
+    "Super Commission Bonus(SCB)",
+    "Recruitment Commission Bonus (RCB)",
+    "Performance Bonus (PCB)",
+    "Adhoc Payment(ADP)",
+]
+COMMISSION_COLUMNS = BONUS_COLUMNS[:4]
+EARNINGS_COLUMN = "Gross Earnings"
+PSU_COLUMN = "Personal Sales Unit(PSU)"
+# Derived at ingestion by fanalysis.reconcile and cached with the upload
+TOTAL_COMMISSIONS = "Total Commissions"
+COMPONENT_TOTAL = "Component Total"
+EARNINGS_DIFFERENCE = "Earnings Difference"
+EARNINGS_MISMATCH = "Earnings Mismatch"
+RECONCILIATION_COLUMNS = [TOTAL_COMMISSIONS, COMPONENT_TOTAL, EARNINGS_DIFFERENCE, EARNINGS_MISMATCH]
+AGENT_COLUMNS = ["Partner Id", "First Name", "Last Name", "Paid As Position"]
+
+# (title, group_by, value) chart specs
+BONUS_ANALYSIS_OPTIONS = [
+    ("Role-wise Gross Earnings", "Paid As Position", "Gross Earnings"),
+    ("Total Bonus Distribution", "Paid As Position", "Basic commission Bonus(BCB)"),
+    ("Performance Bonus by Position", "Paid As Position", "Performance Bonus (PCB)"),
+    ("Recruitment Commission Analysis", "Recruiter Name", "Recruitment Commission Bonus (RCB)"),
+    ("Manager-wise Bonus Distribution", "Manager Name", "Gross Earnings"),
+    ("Personal Sales Contribution", "First Name", "Personal Sales Unit(PSU)"),
+    ("Team Units Contribution", "First Name", "Team Units(TU)"),
+    ("Adhoc Payments Analysis", "First Name", "Adhoc Payment(ADP)"),
+    ("Gender-Based Earnings", "Gender", "Gross Earnings"),
+    ("Bonus Comparison by Gender", "Gender", "Basic commission Bonus(BCB)")
+]
+VISUAL_ANALYSIS_OPTIONS = [
+    ("Role-wise Gross Earnings", "Paid As Position", "Gross Earnings"),
+    ("Gender-Based Earnings", "Gender", "Gross Earnings")
+]
+
+# Canonical agent/bonus schema, column -> kind; uploads are mapped onto these names at ingestion.
+# "key" and "text" columns stay strings, "category" ones become categoricals, "number" ones numeric.
+CANONICAL_SCHEMA = {
+    "Partner Id": "key",
+    "First Name": "text",
+    "Last Name": "text",
+    "Paid As Position": "category",
+    "Paid As": "category",
+    "Gender": "category",
+    "Date of Birth": "date",
+    "Manager Name": "category",
+    "Recruiter Name": "category",
+    PSU_COLUMN: "number",
+    "Team Units(TU)": "number",
+    **{col: "number" for col in BONUS_COLUMNS},
+    EARNINGS_COLUMN: "number",
+    "Feature": "text",
+    "Description": "text",
+}
+# Other headers seen for the same columns. Case, spacing and punctuation are ignored, and a
+# "(ABBR)" suffix makes both the abbreviation and the bare name aliases, so those aren't listed.
+COLUMN_ALIASES = {
+    "Partner Id": ["Agent Id", "Partner Code", "Agent Code"],
+    "Paid As Position": ["Position", "Role"],
+    "Date of Birth": ["DOB", "Birth Date"],
+    "Manager Name": ["Manager"],
+    "Recruiter Name": ["Recruiter"],
+    PSU_COLUMN: ["Personal Sales Units", "Personal Sales"],
+    "Team Units(TU)": ["Team Unit", "Team Sales Units"],
+    EARNINGS_COLUMN: ["Gross Earning", "Gross Pay", "Total Earnings"],
+    "Feature": ["Feature Name"],
+}
+
+# Feature matrix workbook (Feature Analysis pages)
+FEATURE_REQUIRED_COLUMNS = {"Feature", "Description"}
+FEATURE_META_COLUMNS = {"S.No", "Feature", "Description", "Common", "Remarks"}
+
+# Consolidated multi-period store
+PERIOD_COLUMN = "Period"
+PERIOD_SOURCE_COLUMNS = ["Period", "Month", "Pay Period"]
+AGENT_KEY = "Partner Id"
+# First one present is the branch; the agent exports have none, so teams fall back to their manager
+BRANCH_COLUMNS = ["Branch", "Branch Name", "Manager Name"]
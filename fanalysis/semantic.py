@@ -0,0 +1,212 @@
+"""
+Answer cache for near-duplicate questions about the same dataset.
+
+The response cache only helps when the rendered prompt is byte-for-byte identical, but
+people ask the same thing in different words ("top earners", "who earned the most?").
+Here each answered question is normalized (case, stop words, a few synonyms, plural and
+tense endings), feature-hashed into a small local vector and stored in SQLite with its
+answer, scoped to the dataset fingerprint and prompt style. A new question whose vector
+is close enough to a stored one in the same scope gets that answer back without an LLM
+call, but only if both name the same people, codes, numbers and comparisons (``Smith``
+and ``Jones``, ``above`` and ``below`` average are different questions however similar the
+rest is). Entries expire by age and the least recently used are evicted beyond a size cap.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from fanalysis.cache import DEFAULT_CACHE_DIR
+from fanalysis.retrieval import hash_tokens
+
+SIMILARITY_THRESHOLD = float(os.environ.get("FANALYSIS_SEMANTIC_THRESHOLD", "0.97"))
+QUESTION_DIM = 4096
+
+_STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "by", "with", "and", "or", "from", "at",
+    "is", "are", "was", "were", "be", "been", "do", "does", "did", "has", "have", "had",
+    "who", "what", "which", "whom", "whose", "how", "me", "my", "our", "us", "we", "i", "you",
+    "can", "could", "would", "should", "please", "show", "list", "give", "tell", "find",
+    "get", "display", "this", "that", "these", "those", "data", "file", "there", "their", "it",
+    "per", "each", "every", "all", "t", "s",
+}
+_NEGATIONS = {"not", "no", "never", "without", "except", "excluding", "didn", "doesn", "don", "isn", "aren"}
+# A negated question must not match its positive twin, so "not" outweighs a shared term
+NEGATION_WEIGHT = 3
+_SYNONYMS = {
+    "most": "top", "highest": "top", "best": "top", "largest": "top", "biggest": "top",
+    "maximum": "top", "max": "top", "leading": "top",
+    "least": "bottom", "lowest": "bottom", "worst": "bottom", "smallest": "bottom",
+    "minimum": "bottom", "min": "bottom",
+    "agent": "partner", "people": "partner", "person": "partner", "employee": "partner",
+    "salary": "earn", "pay": "earn", "income": "earn", "gross": "earn",
+    "role": "position", "sex": "gender", "average": "mean", "avg": "mean", "count": "number",
+}
+_SUFFIXES = ("ings", "ing", "ers", "er", "ed", "es", "s")
+# Comparison words; two questions must agree on these exactly (with top/bottom from _SYNONYMS)
+_DIRECTIONS = {
+    "above": "above", "over": "above", "more": "above", "greater": "above", "higher": "above",
+    "exceeding": "above", "exceeds": "above",
+    "below": "below", "under": "below", "less": "below", "fewer": "below", "lower": "below",
+}
+_COMPARISONS = {"above", "below", "top", "bottom"}
+
+
+def _stem(word):
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def question_terms(question):
+    """The normalized terms of ``question``, in order."""
+    terms = []
+    for word in re.findall(r"[a-z0-9]+", str(question).lower()):
+        if word in _STOPWORDS:
+            continue
+        if word in _NEGATIONS:
+            terms.append("not")
+            continue
+        word = _SYNONYMS.get(word, word)
+        terms.append(_SYNONYMS.get(_stem(word), _stem(word)))
+    return terms
+
+
+def question_keys(question):
+    """
+    Tokens two questions must share exactly to be the same question: capitalized words
+    (names; the first word of the question is not counted), codes and numbers, and
+    comparison words.
+    """
+    keys = set()
+    for position, match in enumerate(re.finditer(r"[^\W_]+", str(question))):
+        word = match.group()
+        lower = word.lower()
+        if any(ch.isdigit() for ch in word) or (len(word) > 1 and word.isupper()):
+            keys.add(lower)
+        elif position and word[0].isupper() and lower not in _STOPWORDS:
+            keys.add(lower)
+        direction = _DIRECTIONS.get(lower) or _SYNONYMS.get(lower, lower)
+        if direction in _COMPARISONS:
+            keys.add(direction)
+    return frozenset(keys)
+
+
+def embed_question(question):
+    """Unit-length hashed bag-of-terms vector for ``question`` (all zeros if it has no terms)."""
+    terms = question_terms(question)
+    terms += ["not"] * (NEGATION_WEIGHT - 1) * terms.count("not")
+    _, buckets = hash_tokens([" ".join(terms)], dim=QUESTION_DIM)
+    vector = np.bincount(buckets, minlength=QUESTION_DIM).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """
+    SQLite store of ``(scope, question, vector, answer)`` with TTL expiry and LRU eviction.
+
+    ``scope`` is any string identifying what the answers are about (e.g. dataset
+    fingerprint and prompt style); lookups never cross scopes.
+    """
+
+    def __init__(self, path=None, threshold=SIMILARITY_THRESHOLD, max_entries=2000, ttl_seconds=7 * 24 * 3600):
+        self.path = path or os.path.join(DEFAULT_CACHE_DIR, "questions.sqlite")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS questions ("
+                "id INTEGER PRIMARY KEY, scope TEXT NOT NULL, question TEXT NOT NULL, "
+                "vector BLOB NOT NULL, answer TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS questions_scope ON questions (scope)")
+            conn.execute("CREATE INDEX IF NOT EXISTS questions_accessed ON questions (accessed)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def lookup(self, scope, question):
+        """``(stored question, answer, similarity)`` of the closest match above the threshold, or None."""
+        vector = embed_question(question)
+        if not vector.any():
+            return None
+        now = time.time()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, question, vector, answer FROM questions WHERE scope = ? AND created >= ?",
+                (scope, now - self.ttl_seconds if self.ttl_seconds else 0),
+            ).fetchall()
+            if not rows:
+                return None
+            scores = np.stack([np.frombuffer(row[2], dtype=np.float32) for row in rows]) @ vector
+            keys = question_keys(question)
+            best = next(
+                (int(i) for i in np.argsort(-scores, kind="stable")
+                 if scores[i] >= self.threshold and question_keys(rows[i][1]) == keys),
+                None,
+            )
+            if best is None:
+                return None
+            conn.execute("UPDATE questions SET accessed = ?, hits = hits + 1 WHERE id = ?", (now, rows[best][0]))
+        return rows[best][1], rows[best][3], float(scores[best])
+
+    def add(self, scope, question, answer):
+        vector = embed_question(question)
+        if not vector.any() or not answer:
+            return
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO questions (scope, question, vector, answer, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (scope, question, vector.tobytes(), answer, now, now),
+            )
+            if self.ttl_seconds:
+                conn.execute("DELETE FROM questions WHERE created < ?", (now - self.ttl_seconds,))
+            if self.max_entries:
+                conn.execute(
+                    "DELETE FROM questions WHERE id IN ("
+                    "SELECT id FROM questions ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def stats(self):
+        with self._connect() as conn:
+            entries, hits = conn.execute("SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM questions").fetchone()
+        return {"entries": entries, "hits": hits}
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM questions")
+
+
+_default_cache = None
+
+
+def get_semantic_cache():
+    """Process-wide instance shared by all the app pages."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SemanticCache()
+    return _default_cache
+
+
+def cached_marker(question, similarity):
+    """Line shown above an answer served from this cache."""
+    return f"_♻️ Cached answer to a similar question (“{question}”, {similarity:.0%} match)_\n\n"
@@ -0,0 +1,142 @@
+"""
+Cold-start profiling for the app pages.
+
+Runs a page's top-level imports in a fresh interpreter under ``-X importtime`` and
+reports the slowest modules, flags optional subsystems (openai, aiohttp, matplotlib,
+pyarrow, docx, tiktoken) that were pulled in eagerly, and can fail when the import time
+of a page grows past a budget::
+
+    python -m fanalysis.startup demooo3.py
+    python -m fanalysis.startup --check --budget 3.0 *.py
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+COLD_START_BUDGET = float(os.environ.get("FANALYSIS_COLD_START_BUDGET", "5.0"))
+DEFERRED_MODULES = ("openai", "aiohttp", "matplotlib", "pyarrow", "docx", "tiktoken")
+TOP_N = 15
+REPEAT = 3
+
+
+def page_imports(path):
+    """Source of the top-level import statements of a page script."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    statements = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(node) for node in statements)
+
+
+def parse_importtime(text):
+    """
+    Parse ``-X importtime`` output into ``(module, self_us, cumulative_us, depth)`` rows.
+
+    Lines that are not import-time records (warnings, the header) are skipped.
+    """
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        self_us, cumulative_us, name = fields
+        try:
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue  # the "self [us] | cumulative | imported package" header
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append((name.strip(), self_us, cumulative_us, depth))
+    return rows
+
+
+def profile_imports(code, cwd=None, python=None):
+    """Run ``code`` in a fresh interpreter with ``-X importtime`` and return the parsed rows."""
+    env = dict(os.environ)
+    # Make the package importable the same way ``streamlit run`` does for the pages
+    root = cwd or os.getcwd()
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+    result = subprocess.run(
+        [python or sys.executable, "-X", "importtime", "-c", code],
+        cwd=root, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+    return parse_importtime(result.stderr)
+
+
+def total_seconds(rows):
+    """Wall import time of the top-level modules in ``rows``."""
+    return sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1e6
+
+
+def eager_modules(rows, deferred=DEFERRED_MODULES, own=("fanalysis",)):
+    """
+    Optional subsystems that the page or the ``fanalysis`` package imported at startup.
+
+    ``-X importtime`` prints children before their parent, so walking the rows backwards
+    tells which module imported each one. Deferred modules that only arrive as a
+    dependency of a third-party import (pandas pulls in pyarrow) are not ours to defer.
+    """
+    eager = set()
+    importers = {}
+    for name, _, _, depth in reversed(rows):
+        top = name.split(".")[0]
+        importers[depth] = top
+        importer = importers.get(depth - 1) if depth else None
+        if top in deferred and (importer is None or importer in own):
+            eager.add(top)
+    return [name for name in deferred if name in eager]
+
+
+def measure(path, repeat=REPEAT):
+    """Profile a page ``repeat`` times and keep the fastest run (the least noisy one)."""
+    code = page_imports(path)
+    cwd = os.path.dirname(os.path.abspath(path))
+    runs = [profile_imports(code, cwd=cwd) for _ in range(max(repeat, 1))]
+    return min(runs, key=total_seconds)
+
+
+def format_report(path, rows, top_n=TOP_N):
+    lines = [f"{path}: {total_seconds(rows):.3f}s cold import, {len(rows)} modules"]
+    top_level = sorted((row for row in rows if row[3] == 0), key=lambda row: row[2], reverse=True)
+    for name, _, cumulative, _ in top_level[:top_n]:
+        lines.append(f"  {cumulative / 1e3:9.1f} ms  {name}")
+    slowest = sorted(rows, key=lambda row: row[1], reverse=True)[:top_n]
+    lines.append("  slowest modules by self time:")
+    for name, self_us, _, _ in slowest:
+        lines.append(f"  {self_us / 1e3:9.1f} ms  {name}")
+    eager = eager_modules(rows)
+    if eager:
+        lines.append("  imported eagerly (should be deferred): " + ", ".join(eager))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m fanalysis.startup", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pages", nargs="+", help="page scripts to profile")
+    parser.add_argument("--top", type=int, default=TOP_N, help="modules to list per page")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="runs per page; the fastest one is reported")
+    parser.add_argument("--budget", type=float, default=COLD_START_BUDGET, help="seconds allowed per page with --check")
+    parser.add_argument("--check", action="store_true", help="exit non-zero if a page exceeds the budget or imports a deferred module eagerly")
+    args = parser.parse_args(argv)
+
+    failures = []
+    for path in args.pages:
+        rows = measure(path, repeat=args.repeat)
+        print(format_report(path, rows, top_n=args.top))
+        seconds = total_seconds(rows)
+        if seconds > args.budget:
+            failures.append(f"{path}: {seconds:.3f}s exceeds the {args.budget:.3f}s budget")
+        if eager_modules(rows):
+            failures.append(f"{path}: imports {', '.join(eager_modules(rows))} at startup")
+    if args.check and failures:
+        print("\n".join(["", "Cold-start check failed:"] + failures), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
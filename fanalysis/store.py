@@ -0,0 +1,373 @@
+"""
+Consolidated multi-period store for monthly agent exports.
+
+Each uploaded file is appended as a partition tagged with its period, taken from a
+``Period``/``Month`` column when the file has one (one partition per value) or from the
+file name (``CDMAR25ESTM.xlsx`` is March 2025). Column values are read strictly, and one
+that names no month (``March`` without a year) keeps its own label instead of being
+merged into another period. When a partition is added its per-agent and per-branch
+totals are computed once. The wide entity x period series that the month-over-month and
+consistency questions need are then assembled from those small aggregates, not by
+regrouping every row of every month.
+
+Partitions are aligned on the union of their columns. A column that is numeric in any
+partition is coerced to numbers in all of them.
+"""
+import datetime
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from fanalysis.answers import TOP_N, normalize_question
+from fanalysis.answers import compute_answer as compute_row_answer
+from fanalysis.schema import (
+    AGENT_COLUMNS,
+    AGENT_KEY,
+    BONUS_COLUMNS,
+    BRANCH_COLUMNS,
+    EARNINGS_COLUMN,
+    PERIOD_COLUMN,
+    PERIOD_SOURCE_COLUMNS,
+)
+
+TOTAL_BONUS = "Total Bonus"
+SERIES_COLUMNS = [EARNINGS_COLUMN, TOTAL_BONUS] + BONUS_COLUMNS
+
+_MONTHS = "jan feb mar apr may jun jul aug sep oct nov dec".split()
+_ISO_PERIOD = re.compile(r"(?<!\d)(20\d{2})[-_ .]?(0[1-9]|1[0-2])(?!\d)")
+_NAMED_PERIOD = re.compile(r"(" + "|".join(_MONTHS) + r")[a-z]*[-_ .]?((?:20)?\d{2})(?!\d)", re.IGNORECASE)
+# Whole values of a Period/Month column: ``2025-03``, ``202503``, ``2025-03-15 00:00:00``, ``Mar-25``, ``March 2025``
+_ISO_VALUE = re.compile(r"(20\d{2})[-_ ./]?(0[1-9]|1[0-2])(?:[-./](?:0[1-9]|[12]\d|3[01])(?:[ T][\d:.]+)?)?")
+_NAMED_VALUE = re.compile(
+    r"(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sept?(?:ember)?|oct(?:ober)?"
+    r"|nov(?:ember)?|dec(?:ember)?)[-_ .']?((?:20)?\d{2})",
+    re.IGNORECASE,
+)
+
+_registry = {}
+_questions = []
+
+
+def period_answers(*questions):
+    """Register the decorated ``func(store) -> DataFrame`` as the cross-period answer to ``questions``."""
+    def register(func):
+        for question in questions:
+            _registry[normalize_question(question)] = func
+            _questions.append(question)
+        return func
+    return register
+
+
+def period_questions():
+    """The questions answered exactly from the store, in registration order."""
+    return list(_questions)
+
+
+def infer_period(name):
+    """Month named in a file name (``2025-03``, ``202503``, ``Mar 2025``, ``MAR25``) as a Period, or None."""
+    stem = str(name).rsplit(".", 1)[0]
+    match = _ISO_PERIOD.search(stem)
+    if match:
+        return pd.Period(year=int(match.group(1)), month=int(match.group(2)), freq="M")
+    match = _NAMED_PERIOD.search(stem)
+    if match:
+        year = int(match.group(2))
+        return pd.Period(year=year + 2000 if year < 100 else year, month=_MONTHS.index(match.group(1)[:3].lower()) + 1, freq="M")
+    return None
+
+
+def period_label(value):
+    """
+    ``YYYY-MM`` label for one value of a Period/Month column, or None if it doesn't name a month.
+
+    Dates, ``2025-03``, ``202503``, ``2025-03-15``, ``Mar-25`` and ``March 2025`` are read;
+    a month without a year (``March``) or a bare year is not guessed at.
+    """
+    if isinstance(value, pd.Period):
+        return str(value.asfreq("M"))
+    if isinstance(value, (pd.Timestamp, datetime.date)) and not pd.isna(value):
+        return str(pd.Period(value, freq="M"))
+    if isinstance(value, (int, np.integer)) or (isinstance(value, (float, np.floating)) and float(value).is_integer()):
+        value = int(value)
+    text = str(value).strip()
+    match = _ISO_VALUE.fullmatch(text)
+    if match:
+        return f"{match.group(1)}-{match.group(2)}"
+    match = _NAMED_VALUE.fullmatch(text)
+    if match:
+        year = int(match.group(2))
+        return f"{year + 2000 if year < 100 else year}-{_MONTHS.index(match.group(1)[:3].lower()) + 1:02d}"
+    return None
+
+
+def _as_periods(values):
+    # Parsed per distinct value; a value that names no month keeps its own text as its label
+    # (sorted after the dated periods) instead of being merged into another period
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    labels = [period_label(value) or str(value) for value in uniques]
+    return pd.Series(np.array(labels, dtype=object)[codes], index=values.index, name=values.name)
+
+
+def _branch_column(columns):
+    return next((col for col in BRANCH_COLUMNS if col in columns), None)
+
+
+class ConsolidatedStore:
+    """Period-tagged partitions of one or more uploads, plus precomputed per-period aggregates."""
+
+    def __init__(self):
+        self._partitions = OrderedDict()  # (source key, period label) -> partition
+        self._lock = threading.Lock()
+        self._frame = None
+        self._series = {}
+
+    def __len__(self):
+        return len(self._partitions)
+
+    def __contains__(self, key):
+        return any(source == key for source, _ in self._partitions)
+
+    @property
+    def periods(self):
+        """Period labels in chronological order (unrecognised labels last, in upload order)."""
+        labels = list(dict.fromkeys(period for _, period in self._partitions))
+        dated = sorted(label for label in labels if re.fullmatch(r"\d{4}-\d{2}", label))
+        return dated + [label for label in labels if label not in dated]
+
+    @property
+    def undated(self):
+        """Period labels that name no month (e.g. ``March`` without a year), in upload order."""
+        return [label for label in self.periods if not re.fullmatch(r"\d{4}-\d{2}", label)]
+
+    def add(self, df, name, key=None):
+        """
+        Append ``df`` (one upload) under ``key`` (its content fingerprint), replacing any previous
+        partitions with the same key. Returns the period labels it was stored under.
+        """
+        key = key or name
+        source = next((col for col in PERIOD_SOURCE_COLUMNS if col in df.columns), None)
+        if source is not None:
+            labels = _as_periods(df[source])
+            parts = {label: part.drop(columns=[source]) for label, part in df.groupby(labels, sort=False)}
+        else:
+            period = infer_period(name)
+            parts = {str(period) if period is not None else str(name): df}
+        with self._lock:
+            for existing in [k for k in self._partitions if k[0] == key]:
+                del self._partitions[existing]
+            for label, part in parts.items():
+                self._partitions[(key, label)] = self._prepare(part)
+            self._frame = None
+            self._series.clear()
+        return list(parts)
+
+    def retain(self, keys):
+        """Drop partitions of uploads whose key is not in ``keys``."""
+        keys = set(keys)
+        with self._lock:
+            stale = [k for k in self._partitions if k[0] not in keys]
+            for k in stale:
+                del self._partitions[k]
+            if stale:
+                self._frame = None
+                self._series.clear()
+
+    @staticmethod
+    def _prepare(df):
+        df = df.copy()
+        for col in SERIES_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors="coerce")
+        bonus_cols = [col for col in BONUS_COLUMNS if col in df.columns]
+        if bonus_cols:
+            df[TOTAL_BONUS] = df[bonus_cols].fillna(0).sum(axis=1)
+        values = [col for col in SERIES_COLUMNS if col in df.columns]
+        aggregates = {"totals": df[values].sum()}
+        branch = _branch_column(df.columns)
+        if AGENT_KEY in df.columns:
+            aggregates["agent"] = df.groupby(AGENT_KEY)[values].sum()
+        if branch:
+            aggregates["branch"] = df.groupby(branch)[values].sum()
+        return {"df": df, "aggregates": aggregates}
+
+    def frame(self):
+        """All partitions aligned into one frame with a ``Period`` column."""
+        with self._lock:
+            if self._frame is None:
+                parts = [part["df"].assign(**{PERIOD_COLUMN: period}) for (_, period), part in self._partitions.items()]
+                frame = pd.concat(parts, ignore_index=True, sort=False) if parts else pd.DataFrame()
+                if parts:
+                    numeric = {col for part in parts for col in part.select_dtypes("number").columns}
+                    for col in numeric:
+                        frame[col] = pd.to_numeric(frame[col], errors="coerce")
+                    frame[PERIOD_COLUMN] = pd.Categorical(frame[PERIOD_COLUMN], categories=self.periods, ordered=True)
+                self._frame = frame
+            return self._frame
+
+    def series(self, level, value=EARNINGS_COLUMN):
+        """
+        Wide ``entity x period`` table of ``value`` totals; ``level`` is ``"agent"``, ``"branch"``
+        or ``"totals"`` (a single row of per-period totals).
+        """
+        cache_key = (level, value)
+        with self._lock:
+            wide = self._series.get(cache_key)
+            if wide is None:
+                columns = {}
+                for (_, period), part in self._partitions.items():
+                    aggregate = part["aggregates"].get(level)
+                    if aggregate is None or value not in (aggregate.index if level == "totals" else aggregate.columns):
+                        continue
+                    values = pd.Series({"All": aggregate[value]}) if level == "totals" else aggregate[value]
+                    columns[period] = columns[period].add(values, fill_value=0) if period in columns else values
+                wide = pd.DataFrame(columns)
+                wide = wide[[period for period in self.periods if period in wide.columns]]
+                self._series[cache_key] = wide
+            return wide
+
+    def agent_names(self):
+        frame = self.frame()
+        columns = [col for col in AGENT_COLUMNS if col in frame.columns and col != AGENT_KEY]
+        if AGENT_KEY not in frame.columns:
+            return pd.DataFrame()
+        return frame.drop_duplicates(AGENT_KEY, keep="last").set_index(AGENT_KEY)[columns]
+
+    def compute_answer(self, question, df=None):
+        """
+        Exact table for ``question``: a cross-period answer if one is registered and there are at
+        least two periods, otherwise the single-frame answer over the consolidated rows (or
+        ``df``). None if the LLM has to answer.
+        """
+        func = _registry.get(normalize_question(question))
+        if func is not None and len(self.periods) > 1:
+            return func(self)
+        return compute_row_answer(question, self.frame() if df is None else df)
+
+
+def _with_names(store, table):
+    names = store.agent_names()
+    if names.empty:
+        return table.reset_index()
+    return names.reindex(table.index).join(table).rename_axis(AGENT_KEY).reset_index()
+
+
+def _totals(store, value=EARNINGS_COLUMN):
+    wide = store.series("totals", value)
+    return None if wide.empty else wide.iloc[0]
+
+
+@period_answers("Show month-wise total bonus distribution.", "Month-wise trend of each bonus type.")
+def month_wise_bonus(store):
+    totals = {value: _totals(store, value) for value in BONUS_COLUMNS + [TOTAL_BONUS]}
+    totals = {value: series for value, series in totals.items() if series is not None}
+    if not totals:
+        return None
+    return pd.DataFrame(totals).round(2).rename_axis(PERIOD_COLUMN).reset_index()
+
+
+@period_answers("Compare earnings Month-on-Month for all branches.")
+def branch_month_on_month(store):
+    wide = store.series("branch")
+    if wide.empty:
+        return None
+    change = wide.pct_change(axis="columns", fill_method=None).iloc[:, 1:] * 100
+    table = wide.round(2).join(change.round(1).add_suffix(" vs previous (%)"))
+    return table.sort_values(wide.columns[-1], ascending=False).rename_axis("Branch").reset_index()
+
+
+@period_answers("What was the highest grossing month and why?")
+def highest_grossing_month(store):
+    earnings = _totals(store)
+    if earnings is None:
+        return None
+    table = pd.DataFrame({
+        EARNINGS_COLUMN: earnings,
+        "Change vs previous (%)": (earnings.pct_change(fill_method=None) * 100).round(1),
+    })
+    bonuses = _totals(store, TOTAL_BONUS)
+    if bonuses is not None:
+        table[TOTAL_BONUS] = bonuses
+    branches = store.series("branch")
+    if not branches.empty:
+        # The "why": which branch contributed most in each month
+        table["Top Branch"] = branches.idxmax()
+        table["Top Branch Earnings"] = branches.max()
+    return table.round(2).sort_values(EARNINGS_COLUMN, ascending=False).rename_axis(PERIOD_COLUMN).reset_index()
+
+
+@period_answers("Which months showed consistent increase in bonuses?")
+def months_with_bonus_increase(store):
+    bonuses = _totals(store, TOTAL_BONUS)
+    if bonuses is None:
+        return None
+    table = pd.DataFrame({
+        TOTAL_BONUS: bonuses.round(2),
+        "Change vs previous": bonuses.diff().round(2),
+        "Increased": bonuses.diff() > 0,
+    })
+    return table.rename_axis(PERIOD_COLUMN).reset_index()
+
+
+@period_answers("Who are the consistent top earners across all months?")
+def consistent_top_earners(store):
+    wide = store.series("agent")
+    if wide.empty:
+        return None
+    ranks = wide.rank(ascending=False, method="min")
+    months_in_top = f"Months in Top {TOP_N}"
+    table = pd.DataFrame({
+        months_in_top: (ranks <= TOP_N).sum(axis=1),
+        "Average Rank": ranks.mean(axis=1).round(1),
+        f"Average {EARNINGS_COLUMN}": wide.mean(axis=1).round(2),
+    })
+    table = table.sort_values([months_in_top, "Average Rank"], ascending=[False, True]).head(TOP_N)
+    return _with_names(store, table)
+
+
+@period_answers("List participants who received bonuses every month.")
+def bonus_every_month(store):
+    wide = store.series("agent", TOTAL_BONUS)
+    if wide.empty:
+        return None
+    every = wide[(wide.fillna(0) > 0).all(axis=1)]
+    table = pd.DataFrame({
+        f"Average {TOTAL_BONUS}": every.mean(axis=1).round(2),
+        TOTAL_BONUS: every.sum(axis=1).round(2),
+    })
+    return _with_names(store, table.sort_values(TOTAL_BONUS, ascending=False))
+
+
+@period_answers("Who had the highest average earnings over time?")
+def highest_average_earnings(store):
+    wide = store.series("agent")
+    if wide.empty:
+        return None
+    average = f"Average {EARNINGS_COLUMN}"
+    table = pd.DataFrame({average: wide.mean(axis=1).round(2), "Months Present": wide.notna().sum(axis=1)})
+    return _with_names(store, table.nlargest(TOP_N, average))
+
+
+@period_answers("Which branches had top consistent performance month-over-month?")
+def consistent_branches(store):
+    wide = store.series("branch")
+    if wide.empty:
+        return None
+    ranks = wide.rank(ascending=False, method="min")
+    table = pd.DataFrame({
+        "Average Rank": ranks.mean(axis=1).round(1),
+        "Worst Rank": ranks.max(axis=1),
+        f"Average {EARNINGS_COLUMN}": wide.mean(axis=1).round(2),
+    })
+    return table.sort_values(["Average Rank", "Worst Rank"]).head(TOP_N).rename_axis("Branch").reset_index()
+
+
+@period_answers("Which branches saw a steady rise in bonuses?")
+def steadily_rising_branches(store):
+    wide = store.series("branch", TOTAL_BONUS)
+    if wide.shape[1] < 2:
+        return None
+    rising = wide[(wide.diff(axis="columns").iloc[:, 1:] > 0).all(axis=1)]
+    return rising.round(2).rename_axis("Branch").reset_index()
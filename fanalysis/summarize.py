@@ -0,0 +1,192 @@
+"""
+Map-reduce summarization for files too large for one prompt.
+
+The frame is split into chunks that each fit ``CHUNK_TOKENS`` (whole groups of a column
+such as ``Manager Name`` when asked to, otherwise runs of rows). Every chunk is summarized
+concurrently, and the partial summaries are combined ``REDUCE_FANIN`` at a time until one
+final answer remains. Each call goes through the response cache keyed on its prompt, so
+re-asking a question about an edited file only re-sends the chunks that changed.
+
+Row chunks are filled close to the token budget, but each one ends on a content-defined
+row (the smallest row hash in a short window before the limit) rather than exactly every
+N rows, so inserting or deleting a row usually moves one boundary instead of all the ones
+after it.
+"""
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from fanalysis.fanout import run_concurrently
+from fanalysis.llm import PROMPT_STYLES, chat_completion, stream_chat_completion
+from fanalysis.prompting import estimate_tokens
+
+CHUNK_TOKENS = int(os.environ.get("FANALYSIS_CHUNK_TOKENS", "3000"))
+REDUCE_FANIN = 8
+SAMPLE_ROWS = 200
+# Share of a chunk's row limit in which its end is chosen by content
+CUT_WINDOW = 0.125
+
+MAP_TEMPLATE = """
+    The data below is one part ({part}) of a larger file. Summarize what this part shows that is relevant to the question.
+    Keep exact figures (row counts, totals, averages, top and bottom records) so that the parts can be combined later.
+    Data:
+    {data}
+
+    Question: {question}
+    """
+
+REDUCE_TEMPLATE = """
+    Below are summaries of {count} parts of the same file. Merge them into one summary of those parts:
+    add up counts and totals across parts, recompute averages from them, and keep only the most notable records.
+    {summaries}
+
+    Question: {question}
+    """
+
+WHOLE_TEMPLATE = """
+    The data below is every row of the uploaded file, {rows} rows in total. Answer the question from all of them.
+    Data:
+    {data}
+
+    Question: {question}
+    """
+
+FINAL_TEMPLATE = """
+    Below are summaries covering every row of the uploaded file, {rows} rows in total, split into {count} parts.
+    Combine them and answer the question for the whole file, adding up counts and totals across parts.
+    {summaries}
+
+    Question: {question}
+    """
+
+
+def _rows_per_chunk(df, question, max_tokens):
+    sample = df.head(SAMPLE_ROWS)
+    per_row = estimate_tokens(sample.to_csv(index=False, header=False)) / max(len(sample), 1)
+    overhead = estimate_tokens(MAP_TEMPLATE + question + ",".join(map(str, df.columns))) + 50
+    if overhead >= max_tokens:
+        raise ValueError("The question is too long to fit the chunk token budget.")
+    return max(1, int((max_tokens - overhead) // max(per_row, 1)))
+
+
+def _cut_points(hashes, max_rows):
+    # Each chunk ends in the last ``CUT_WINDOW`` of the limit, after the row with the smallest
+    # hash there: chunks stay close to the limit, and a row inserted or deleted earlier
+    # usually leaves the cut on the same row, so the chunks after it are sent unchanged
+    window = max(1, int(max_rows * CUT_WINDOW))
+    cuts, start = [], 0
+    while len(hashes) - start > max_rows:
+        low = start + max_rows - window
+        start = low + int(np.argmin(hashes[low:low + window])) + 1
+        cuts.append(start)
+    return cuts
+
+
+def _row_chunks(df, max_rows):
+    if len(df) <= max_rows:
+        return [df]
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    bounds = [0] + _cut_points(hashes, max_rows) + [len(df)]
+    return [df.iloc[a:b] for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def split_frame(df, question="", group_by=None, max_tokens=CHUNK_TOKENS):
+    """
+    Split ``df`` into ``(label, chunk)`` pairs whose map prompts fit ``max_tokens``.
+
+    With ``group_by``, consecutive groups are packed together and a group is only split
+    when it is too large on its own.
+    """
+    max_rows = _rows_per_chunk(df, question, max_tokens)
+    if not group_by or group_by not in df.columns:
+        return [(f"{len(chunk)} rows", chunk) for chunk in _row_chunks(df, max_rows)]
+
+    chunks, pending, pending_rows = [], [], 0
+
+    def flush():
+        if pending:
+            first, last = pending[0][0], pending[-1][0]
+            keys = str(first) if len(pending) == 1 else f"{first} to {last}"
+            chunks.append((f"{group_by}: {keys}", pd.concat([part for _, part in pending])))
+        pending.clear()
+
+    for key, group in df.groupby(group_by, sort=True, dropna=False):
+        if len(group) > max_rows:
+            flush()
+            pending_rows = 0
+            for chunk in _row_chunks(group, max_rows):
+                chunks.append((f"{group_by}: {key}, {len(chunk)} rows", chunk))
+            continue
+        if pending_rows + len(group) > max_rows:
+            flush()
+            pending_rows = 0
+        pending.append((key, group))
+        pending_rows += len(group)
+    flush()
+    return chunks
+
+
+def _summaries(partials):
+    return "\n\n".join(f"Part {i}:\n{text}" for i, text in enumerate(partials, 1))
+
+
+def _run_all(func, items, progress, state):
+    results = [None] * len(items)
+    for index, result, error in run_concurrently(func, items):
+        if error is not None:
+            raise error
+        results[index] = result
+        state["done"] += 1
+        if progress:
+            progress(state["done"], state["total"])
+    return results
+
+
+def summarize_frame(question, df, style="structured", group_by=None, stream=False,
+                    max_tokens=CHUNK_TOKENS, progress=None):
+    """
+    Answer ``question`` from every row of ``df`` by map-reduce over chunks.
+
+    Returns the answer text, or a generator of text fragments when ``stream`` is true (only
+    the final combine step streams). ``progress(done, total)`` is called from the caller's
+    thread as map and intermediate reduce calls finish. A frame that fits one chunk is sent
+    whole, as a single prompt.
+    """
+    chunks = split_frame(df, question, group_by, max_tokens)
+    spec = PROMPT_STYLES[style]
+
+    def complete(prompt):
+        return chat_completion(spec["system"], prompt, **spec["params"])
+
+    if len(chunks) == 1:
+        # Every row, not the profile and sample ``analyze_chatbot`` sends for frames over 50 rows
+        prompt = WHOLE_TEMPLATE.format(rows=len(df), data=df.to_csv(index=False), question=question)
+        return stream_chat_completion(spec["system"], prompt, **spec["params"]) if stream else complete(prompt)
+
+    def map_chunk(item):
+        label, chunk = item
+        return complete(MAP_TEMPLATE.format(part=label, data=chunk.to_csv(index=False), question=question))
+
+    def reduce_batch(batch):
+        return complete(REDUCE_TEMPLATE.format(count=len(batch), summaries=_summaries(batch), question=question))
+
+    total, remaining = len(chunks), len(chunks)
+    while remaining > REDUCE_FANIN:
+        remaining = math.ceil(remaining / REDUCE_FANIN)
+        total += remaining
+    state = {"done": 0, "total": total}
+
+    def final_prompt():
+        partials = _run_all(map_chunk, chunks, progress, state)
+        while len(partials) > REDUCE_FANIN:
+            batches = [partials[i:i + REDUCE_FANIN] for i in range(0, len(partials), REDUCE_FANIN)]
+            partials = _run_all(reduce_batch, batches, progress, state)
+        return FINAL_TEMPLATE.format(rows=len(df), count=len(chunks), summaries=_summaries(partials), question=question)
+
+    if stream:
+        def fragments():
+            yield from stream_chat_completion(spec["system"], final_prompt(), **spec["params"])
+        return fragments()
+    return complete(final_prompt())
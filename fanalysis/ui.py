@@ -0,0 +1,284 @@
+"""
+Streamlit building blocks shared by the app pages.
+
+Kept separate from the data modules so that ingestion, aggregation and prompting stay
+importable (and testable) without a Streamlit session.
+"""
+import os
+import uuid
+
+import streamlit as st
+
+from fanalysis.aggregation import aggregate_trends
+from fanalysis.answers import compute_answer, narrate_answer
+from fanalysis.charts import choose_backend, render_bar_chart, vega_lite_bar
+from fanalysis.fanout import run_concurrently
+from fanalysis.history import HISTORY_PAGE_SIZE
+from fanalysis.ingest import describe_upload, load_upload
+from fanalysis.jobs import ACTIVE, get_job_queue
+from fanalysis.reconcile import describe_reconciliation, is_reconciled, mismatched_rows, reconcile, reconciliation_summary
+from fanalysis.schema import FEATURE_META_COLUMNS
+from fanalysis.summarize import summarize_frame
+
+JOB_POLL_SECONDS = float(os.environ.get("FANALYSIS_JOB_POLL_SECONDS", "2"))
+
+
+# Plotting function
+def plot_trend(df, group_by_col, value_col, title, trend_data=None, **chart_style):
+    if trend_data is None:
+        trend_data = df.groupby(group_by_col)[value_col].sum().reset_index()
+    if choose_backend(trend_data) == "vega-lite":
+        # Too many groups for a readable image: send the top-N points and let the browser draw them
+        data, spec = vega_lite_bar(trend_data, group_by_col, value_col, title)
+        st.vega_lite_chart(data, spec)
+        return
+    # Rendered off-screen and memoized as PNG bytes, so no pyplot figures pile up across reruns
+    st.image(render_bar_chart(trend_data, group_by_col, value_col, title, **chart_style))
+
+
+def render_trend_charts(df, analysis_options, **chart_style):
+    # One grouped aggregation per distinct key, shared by every chart on that key
+    trend_tables = aggregate_trends(df, analysis_options)
+    for title, group_by, value in analysis_options:
+        st.subheader(title)
+        plot_trend(df, group_by, value, title, trend_tables[(group_by, value)], **chart_style)
+
+
+# File reading helper: encoding and delimiter are sniffed once and the file is parsed exactly once
+def read_file(file):
+    df, info = load_upload(file)
+    if info:
+        st.caption(describe_upload(info))
+    return df
+
+
+def stream_success(chunks):
+    """
+    Render streamed text incrementally inside an st.success box and return the full text.
+    """
+    placeholder = st.empty()
+    text = ""
+    for chunk in chunks:
+        text += chunk
+        placeholder.success(text)
+    return text
+
+
+def render_reconciliation(df):
+    """
+    Exact Total Commissions / Gross Earnings check from the columns added at ingestion.
+
+    Shows the mismatched rows, if any, and returns the summary line for the search history.
+    """
+    if not is_reconciled(df):
+        reconcile(df)
+    text = describe_reconciliation(reconciliation_summary(df))
+    mismatched = mismatched_rows(df)
+    if mismatched.empty:
+        st.success(text)
+    else:
+        st.warning(text)
+        st.dataframe(mismatched)
+    return text
+
+
+def stream_file_answer(question, df, style, group_by=None):
+    """
+    Stream a map-reduce answer over every row of ``df``, with a progress bar for the map stage.
+    """
+    bar = st.progress(0.0, text="Reading the whole file...")
+
+    def progress(done, total):
+        bar.progress(done / total, text=f"Summarized {done} of {total} parts")
+
+    answer = st.write_stream(summarize_frame(question, df, style=style, group_by=group_by, stream=True, progress=progress))
+    bar.empty()
+    return answer
+
+
+def render_country_summaries(df, analyze_chatbot):
+    """
+    Feature Analysis tab: summarize every country column concurrently, in column order.
+
+    Returns the ``{"Country", "Summary"}`` rows for the results table.
+    """
+    country_columns = [col for col in df.columns if col not in FEATURE_META_COLUMNS]
+    country_tasks = []
+    for country in country_columns:
+        country_features = df[["Feature", "Description", country]].dropna()
+        country_features = country_features[country_features[country].astype(str).str.lower() == "yes"]
+
+        if not country_features.empty:
+            country_tasks.append((country, country_features))
+
+    # Each slot fills in as soon as its call finishes
+    placeholders = [st.empty() for _ in country_tasks]
+    summaries = [None] * len(country_tasks)
+    for i, summary, error in run_concurrently(
+        lambda task: analyze_chatbot(f"Summarize features for {task[0]}", task[1]), country_tasks
+    ):
+        if error is not None:
+            placeholders[i].error(f"Summary for {country_tasks[i][0]} failed: {error}")
+        else:
+            summaries[i] = summary
+            placeholders[i].write(summary)
+
+    return [
+        {"Country": country, "Summary": summary}
+        for (country, _), summary in zip(country_tasks, summaries)
+        if summary is not None
+    ]
+
+
+def history_scope(page):
+    """
+    ``SearchHistory`` scope of ``page`` for the current user.
+
+    The signed-in account when the app uses authentication, otherwise this browser session,
+    so one user's questions and answers are never shown to another.
+    """
+    if st.user.get("is_logged_in") and st.user.get("email"):
+        user = st.user.get("email")
+    else:
+        user = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+    return f"{page}:{user}"
+
+
+def render_search_history(history, title="Search History", expanders=True, key="history"):
+    """
+    One page of a ``SearchHistory`` with a search box, a page picker and a CSV export.
+
+    Only the entries on the page shown are read, so reruns don't slow down as the history
+    grows. ``expanders`` shows each entry collapsed under its question, as the Report
+    Generator pages do; otherwise as Q/A lines.
+    """
+    total = history.count()
+    if not total:
+        return
+    st.subheader(title)
+    query = st.text_input("Search past questions and answers", key=f"{key}_query").strip()
+    matches = history.count(query) if query else total
+    pages = max(1, -(-matches // HISTORY_PAGE_SIZE))
+    number = 1
+    if pages > 1:
+        # Keyed on the query too: a narrower search may have fewer pages than the one picked
+        number = st.number_input("Page", min_value=1, max_value=pages, value=1, key=f"{key}_page_{query}")
+    for question, answer in history.page(number - 1, query=query):
+        if expanders:
+            with st.expander(question):
+                st.write(answer)
+        elif isinstance(answer, str):
+            st.write(f"**Q: {question}**")
+            st.write(f"**A:** {answer}")
+        else:
+            st.write(f"**Q: {question}**")
+            st.write("**A:**")
+            st.dataframe(answer)
+    entries = "entry" if total == 1 else "entries"
+    found = f"{matches} of {total} {entries} match" if query else f"{total} {entries}"
+    st.caption(f"{found} · page {number} of {pages}")
+    if st.button("Download History", key=f"{key}_export"):
+        st.download_button("Download CSV", history.export(), f"{history.scope.split(':')[0]}_history.csv", "text/csv", key=f"{key}_download")
+
+
+def _show_job(job):
+    if job["status"] in ACTIVE:
+        st.progress(job["progress"], text=f"{job['label']}: {job['message']}...")
+        if job["result"]:
+            st.markdown(job["result"])
+    elif job["status"] == "done":
+        st.markdown(job["result"])
+    else:
+        st.error(f"{job['label']} failed: {job['error']}")
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def _poll_job(job_id):
+    job = get_job_queue().get(job_id)
+    _show_job(job)
+    if job["status"] not in ACTIVE:
+        # Finished: one full rerun renders it statically and stops the polling
+        st.rerun()
+
+
+def render_job(job_id, heading=None):
+    """
+    Status, progress and (partial) output of a background job, or nothing if there is no such job.
+
+    While the job is queued or running only this block re-runs, every ``JOB_POLL_SECONDS``,
+    so the rest of the page stays usable. Returns the job row.
+    """
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return None
+    if heading:
+        st.markdown(heading)
+    if job["status"] in ACTIVE:
+        _poll_job(job_id)
+    else:
+        _show_job(job)
+    return job
+
+
+_JOB_ICONS = {"queued": "⏳", "running": "🔄", "done": "✅", "failed": "❌"}
+
+
+def _show_jobs(jobs, titles):
+    finished = sum(job["status"] not in ACTIVE for job in jobs)
+    if finished < len(jobs):
+        st.progress(finished / len(jobs), text=f"{finished} of {len(jobs)} finished")
+    for title, job in zip(titles, jobs):
+        with st.expander(f"{_JOB_ICONS.get(job['status'], '')} {title}"):
+            _show_job(job)
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def _poll_jobs(job_ids, titles):
+    jobs = [get_job_queue().get(job_id) for job_id in job_ids]
+    _show_jobs(jobs, titles)
+    if all(job["status"] not in ACTIVE for job in jobs):
+        st.rerun()
+
+
+def render_jobs(job_ids, titles, heading=None):
+    """
+    A group of background jobs (e.g. a batch of countries) as one expander per job.
+
+    Shows nothing unless every job exists; polls like ``render_job`` while any is still
+    running. Returns the job rows once all of them have finished, otherwise None.
+    """
+    queue = get_job_queue()
+    jobs = [queue.get(job_id) for job_id in job_ids]
+    if not jobs or any(job is None for job in jobs):
+        return None
+    if heading:
+        st.markdown(heading)
+    if any(job["status"] in ACTIVE for job in jobs):
+        _poll_jobs(job_ids, titles)
+        return None
+    _show_jobs(jobs, titles)
+    return jobs
+
+
+def answer_question(question, df, analyze_chatbot, narrate, render_stream=None,
+                    response_label="**Response:**", table_label=None, compute=compute_answer):
+    """
+    Answer a Report Generator question and return what goes into the search history.
+
+    Predefined aggregations are answered exactly by ``compute(question, df)`` and shown as a
+    table; the LLM only narrates that table (if ``narrate``). Anything else is streamed from
+    the LLM over ``df``, or from the semantic cache when it rephrases an answered question.
+    """
+    render_stream = render_stream or st.write_stream
+    table = compute(question, df)
+    if table is None:
+        st.write(response_label)
+        return render_stream(analyze_chatbot(question, df, stream=True, retrieve=True, similar=True))
+
+    if table_label:
+        st.write(table_label)
+    st.dataframe(table)
+    if not narrate:
+        return table
+    st.write(response_label)
+    return render_stream(narrate_answer(question, table, lambda q, t: analyze_chatbot(q, t, stream=True)))
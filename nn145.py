@@ -1,87 +1,21 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import openai
-
-# OpenAI API Configuration (Azure)
-openai.api_key = "14560021aaf84772835d76246b53397a"
-openai.api_base = "https://amrxgenai.openai.azure.com/"
-openai.api_type = 'azure'
-openai.api_version = '2024-02-15-preview'
-deployment_name = 'gpt'
+from functools import partial
+from fanalysis import llm, ui
+from fanalysis.charts import COMPACT_CHART
+from fanalysis.ingest import fingerprint_bytes, read_bytes
+from fanalysis.jobs import market_entry_job_id, submit_market_entry
+from fanalysis.market import DETAILED_PROMPT, NEW_COUNTRIES
+from fanalysis.ranking import top_n
+from fanalysis.schema import PSU_COLUMN
+from fanalysis.ui import read_file
+
+analyze_chatbot = partial(llm.analyze_chatbot, style="structured")
+plot_trend = partial(ui.plot_trend, **COMPACT_CHART)
 
 st.set_page_config(layout="wide")
 st.title("Per-File Sales Agent Performance & LLM Chatbot")
 
-# Function to call LLM
-def analyze_chatbot(question, df):
-    prompt = f"""
-    Analyze the following data and answer the question concisely but informatively.
-    Data:
-    {df.to_string(index=False)}
-    
-    Question: {question}
-    """
-    response = openai.ChatCompletion.create(
-        engine=deployment_name,
-        messages=[ 
-            {"role": "system", "content": "You are a data analyst. Provide structured, easy-to-understand answers using bullet points and summaries."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.5
-    )
-    return response["choices"][0]["message"]["content"].strip()
-
-# Simulate checklist evaluation
-def evaluate_market_checklist(response_text):
-    checklist = {
-        "🥣 Eating Habits": "Typical food prep methods",
-        "👥 Demographics": "Age distribution",
-        "🏷️ Competition": "top 5 local competitors",
-        "💸 Pricing": "average income",
-        "🛍️ Distribution": "Online vs retail",
-        "📢 Marketing": "Influencer culture",
-        "📚 Education": "product demos",
-        "🍛 Recipe Localization": "Popular regional cuisines",
-        "🔧 After-sales": "service centers",
-        "🌿 Sustainability": "Eco-awareness",
-        "⚖️ Regulatory": "appliance safety laws",
-        "📈 Sales Forecast": "6-month and 1-year prediction"
-    }
-
-    checklist_results = []
-    for area, focus in checklist.items():
-        if focus.lower() in response_text.lower():
-            result = ("Pass", f"Includes: {focus}")
-        else:
-            result = ("Fail", f"Missing: {focus}")
-        checklist_results.append((area, focus, result[0], result[1]))
-    return checklist_results
-
-# Plotting function
-def plot_trend(df, group_by_col, value_col, title):
-    trend_data = df.groupby(group_by_col)[value_col].sum().reset_index()
-    fig, ax = plt.subplots(figsize=(8, 3))
-    ax.bar(trend_data[group_by_col], trend_data[value_col], color="skyblue")
-    plt.xticks(rotation=90, ha='right', fontsize=8)
-    plt.title(title)
-    plt.tight_layout()
-    st.pyplot(fig)
-
-# File reading helper
-def read_file(file):
-    try:
-        if file.name.endswith('.csv'):
-            return pd.read_csv(file, encoding="utf-8")
-    except Exception:
-        try:
-            return pd.read_csv(file, encoding="ISO-8859-1")
-        except Exception:
-            return pd.read_csv(file, encoding="latin1")
-    if file.name.endswith(('.xls', '.xlsx')):
-        return pd.read_excel(file)
-    return None
-
 # Upload files
 uploaded_files = st.file_uploader("Upload CSV or Excel files", type=["csv", "xls", "xlsx"], accept_multiple_files=True)
 
@@ -104,18 +38,17 @@ if uploaded_files:
         # Summary chatbot
         st.subheader("📊 File Summary (Generated by LLM)")
         try:
-            summary = analyze_chatbot("Please summarize the uploaded file.", df.head(20))
-            st.write(summary)
+            st.write_stream(analyze_chatbot("Please summarize the uploaded file.", df.head(20), stream=True))
         except Exception as e:
             st.error(f"Summary generation failed: {e}")
             continue
 
         # Top 10 Analysis
-        if "PSU" in df.columns and "Last Name" in df.columns:
-            df["PSU"] = pd.to_numeric(df["PSU"], errors="coerce").fillna(0)
-            top_10 = df.sort_values(by="PSU", ascending=False).head(10)
+        if PSU_COLUMN in df.columns and "Last Name" in df.columns:
+            df[PSU_COLUMN] = pd.to_numeric(df[PSU_COLUMN], errors="coerce").fillna(0)
+            top_10 = top_n(df, PSU_COLUMN, 10)
             st.subheader("🏆 Top 10 Performers (by PSU)")
-            st.dataframe(top_10[["Partner Id", "Last Name", "PSU", "Gross Earnings"]])
+            st.dataframe(top_10[["Partner Id", "Last Name", PSU_COLUMN, "Gross Earnings"]])
 
             st.subheader("📈 Trend Charts")
             if "Paid As Position" in df.columns:
@@ -128,143 +61,26 @@ if uploaded_files:
             question = st.text_input(f"Ask something about `{file.name}` data:", key=file.name)
             if st.button(f"Ask LLM ({file.name})", key=f"ask_{file.name}"):
                 if question:
-                    response = analyze_chatbot(question, df.head(50))
-                    st.write("**Response:**", response)
+                    st.write("**Response:**")
+                    st.write_stream(analyze_chatbot(question, df, stream=True, retrieve=True, similar=True))
 
             # 🌍 Sales prediction section
             st.subheader("🌍 Sales Prediction in New Countries")
 
-            new_countries = ["Germany", "France", "Italy", "India", "USA", "Japan", "Brazil", "Singapore"]
-            selected_country = st.selectbox(f"Select a country for prediction", new_countries)
+            selected_country = st.selectbox(f"Select a country for prediction", NEW_COUNTRIES)
 
+            # Predictions run as background jobs, one per file and country, so a click elsewhere
+            # on the page no longer cancels them; the output below updates as the job runs
+            file_fingerprint = fingerprint_bytes(read_bytes(file))
             if st.button(f"Predict Sales for {selected_country}"):
                 try:
-                    features_prompt = f"""
-You are a market analyst. Given the uploaded sales agent data and general market insights, analyze the opportunity for launching Thermomix by Vorwerk in the country: **{selected_country}**.
-
-Please include the following sections with bullet points and concise insights:
-
-### 1. **Product Overview**
-- Key features and USPs of Thermomix
-- Target consumer profile
-
-### 2. **Country Market Evaluation: {selected_country}**
-Analyze the following **12 key evaluation areas** in-depth. For each area:
-- Provide detailed, country-specific insights covering all sub-points listed below.
-- Explicitly **mention each of the following focus areas verbatim** in your response so the system can validate them.
-- Structure your response such that it includes the **exact phrasing** like "Typical food prep methods", "average income", etc., directly in the bullet points.
-- Ensure every evaluation area gets a **"Pass"** by addressing risks with mitigation strategies where needed.
-- **Include real-time examples**, such as:
-  - Names of popular local recipes
-  - Notable influencers in the culinary space
-  - Relevant websites or platforms (with URLs)
-  - Local appliance retailers or e-commerce platforms
-
-🔍 Focus: **High-detail, bullet-based analysis covering the full market readiness checklist with real-world examples, web links, brand names, product comparisons, influencers, laws, pricing, sustainability data, and more.**
-
-📌 **Your output should contain all 12 checklist areas below. Use the exact phrases like 'Typical food prep methods', 'average income', etc., as written so the validation system can parse them.**
-
-🎯 **For each topic:**
-- Use dynamic **country-specific data** (assume access to the internet).
-- Provide **web links** to real sources (e.g. local cooking websites, influencer profiles, appliance stores, regulations).
-- Include **local product names**, **prices**, **examples**, and **facts** where possible,, **supported by links**.
-- **Echo the exact sub-phrases** in bullet points (to ensure checklist scoring works).
-- Include **risks with mitigation strategies** if something is missing.
-**Checklist Areas:**
-
-1. 🥣 **Eating Habits**
-   - Typical food prep methods
-   - Meal frequency and kitchen appliance use
-   - Cultural food preferences
-   - Cooking styles and techniques
-   - Popular local recipes with examples that can be added in Thermomix
-
-
-2. 👥 **Demographics**
-   - Age distribution, urban/rural split
-   - urban population city names
-   - Household size and structure
-   - Gender roles in cooking
-   - Tech-savvy population segments
-
-3. 🏷️ **Competition**
-   - List top 5 Thermomix competitors in {selected_country}
-   - Market share of competitors {selected_country}
-   - Compare their features, price, and market share
-
-4. 💸 **Pricing**
-   - Local affordability, average income
-   - average income with respect to age groups {selected_country}
-   - average income in {selected_country}
-   - Affordability of Thermomix vs. alternatives
-   - Financing options, EMIs, price positioning,estimate price range for product
-
-5. 🛍️ **Distribution**
-   - Online vs retail appliance market penetration
-   - Preferred consumer buying channels
-   - Local appliance retailers or e-commerce platforms (with URLs)
-
-6. 📢 **Marketing**
-   - Influencer culture,Top influencer names, language preferences
-   - Suitable localized marketing strategies with examples
-   - Thermomix brand positioning
-   - Local cooking content formats and platforms with examples
-
-7. 📚 **Education & Onboarding**
-   - Acceptance of product demos, tutorials
-   - Existing cooking content formats and platforms with examples
-
-8. 🍛 **Recipe Localization**
-   - Popular regional cuisines with examples
-   - Local recipe websites or platforms (with URLs)
-   - Thermomix adaptability for those dishes
-
-9. 🔧 **After-sales**
-   - Need for service centers, typical warranty expectations 
-   - Local support partners if any with examples
-   - Local appliance retailers or e-commerce platforms (with URLs)
-
-10. 🌿 **Sustainability**
-    - Eco-awareness, energy consumption attitudes with examples
-    - Recyclability and repair regulations
-    - I am trying to sell product in selected country. Will the power ratign support this appliances
-    - Local sustainability initiatives or certifications
-    - Thermomix's eco-friendly features
-
-11. ⚖️ **Regulatory Compliance**
-    - Local appliance safety laws with real-time examples
-    - Appliance safety laws in {selected_country}
-    - Laws,certifications, food contact material rules with examples
-    - Thermomix's compliance with local regulations
-    - Local certifications or standards
-
-12. 📈 **Sales Forecast**
-    - 6-month and 1-year prediction
-    - Market share capture estimate
-
----
-
-### 3. **Checklist Table Summary**
-Finally, provide a table with the following format:
-| Area | Focus | Evaluation (Pass/Fail) | Reason |
-|------|-------|-------------------------|--------|
-| Eating Habits | [key points] | Pass | [reason] |
-| ... | ... | ... | ... |
-
-✅ Ensure that **each row** provides sufficient evidence to **justify a "Pass"** where applicable.
-
-If there are risks, suggest **mitigation strategies** to turn a Fail into a Pass.
-
-Base all reasoning on real market trends and local context. Be detailed but concise.
-"""
-                    prediction_output = analyze_chatbot(features_prompt, df.head(50))
-                    st.markdown("**📈 Prediction Output:**")
-                    st.write(prediction_output)
-
-                    #st.subheader("✅ Market Entry Checklist Evaluation")
-                    #checklist = evaluate_market_checklist(prediction_output)
-                    #checklist_df = pd.DataFrame(checklist, columns=["Area", "Focus", "Evaluation (Pass/Fail)", "Reason"])
-                    #st.dataframe(checklist_df)
-
+                    submit_market_entry(df, file_fingerprint, selected_country, DETAILED_PROMPT)
                 except Exception as e:
                     st.error(f"Prediction generation failed: {e}")
+
+            ui.render_job(market_entry_job_id(file_fingerprint, selected_country, DETAILED_PROMPT), "**📈 Prediction Output:**")
+
+            #st.subheader("✅ Market Entry Checklist Evaluation")
+            #checklist = evaluate_market_checklist(prediction_output)
+            #checklist_df = pd.DataFrame(checklist, columns=["Area", "Focus", "Evaluation (Pass/Fail)", "Reason"])
+            #st.dataframe(checklist_df)
@@ -1,279 +1,186 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import openai
+from functools import partial
+from fanalysis import llm, ui
+from fanalysis.batch import batch_job_ids, combined_report, submit_batch
+from fanalysis.charts import COMPACT_CHART
+from fanalysis.ingest import describe_upload, load_upload
+from fanalysis.jobs import market_entry_job_id, submit_market_entry
+from fanalysis.market import EXTENDED_PROMPT, NEW_COUNTRIES
+from fanalysis.pipeline import FilePipeline
+from fanalysis.ranking import group_top_n, top_n
+from fanalysis.schema import EARNINGS_COLUMN, PSU_COLUMN
+from fanalysis.store import ConsolidatedStore, period_questions
+from fanalysis.summarize import summarize_frame
+from fanalysis.ui import answer_question, stream_file_answer
+
+analyze_chatbot = partial(llm.analyze_chatbot, style="structured")
+plot_trend = partial(ui.plot_trend, **COMPACT_CHART)
+# Summaries and answers cover every row: the file is summarized per manager and the parts combined
+answer_from_file = partial(stream_file_answer, style="structured", group_by="Manager Name")
+
+
+# Pipeline stages, run on worker threads for every new or changed file
+def parse_file(file, outputs):
+    return load_upload(file)
+
+
+def profile_file(file, outputs):
+    df, _ = outputs["parse"]
+    if df is None or df.empty or PSU_COLUMN not in df.columns or "Last Name" not in df.columns:
+        return None
+    df[PSU_COLUMN] = pd.to_numeric(df[PSU_COLUMN], errors="coerce").fillna(0)
+    profile = {"top": top_n(df, PSU_COLUMN, 10)}
+    if "Paid As Position" in df.columns:
+        profile["by_position"] = group_top_n(df, PSU_COLUMN, "Paid As Position", 3)
+    return profile
+
+
+def summarize_file(file, outputs):
+    df, _ = outputs["parse"]
+    if df is None or df.empty:
+        return None
+    return summarize_frame("Please summarize the uploaded file.", df, style="structured", group_by="Manager Name")
+
+
+def render_questions(file, df, fingerprint):
+    # File-specific chatbot
+    st.subheader("💬 Ask a Question About This File")
+    question = st.text_input(f"Ask something about `{file.name}` data:", key=file.name)
+    if st.button(f"Ask LLM ({file.name})", key=f"ask_{file.name}"):
+        if question:
+            st.write("**Response:**")
+            answer_from_file(question, df)
+
+    # 🌍 Sales prediction section
+    st.subheader("🌍 Sales Prediction in New Countries")
+
+    selected_country = st.selectbox(f"Select a country for prediction", NEW_COUNTRIES, key=f"country_{file.name}")
+
+    if st.button(f"Predict Sales for {selected_country}", key=f"predict_{file.name}"):
+        try:
+            # Runs as a background job: clicks and reruns no longer cancel it, and asking for
+            # the same country on the same file again reuses the job
+            submit_market_entry(df, fingerprint, selected_country, EXTENDED_PROMPT)
+        except Exception as e:
+            st.error(f"Prediction generation failed: {e}")
 
-# OpenAI API Configuration (Azure)
-openai.api_key = "14560021aaf84772835d76246b53397a"
-openai.api_base = "https://amrxgenai.openai.azure.com/"
-openai.api_type = 'azure'
-openai.api_version = '2024-02-15-preview'
-deployment_name = 'gpt'
+    ui.render_job(market_entry_job_id(fingerprint, selected_country, EXTENDED_PROMPT), "**📈 Prediction Output:**")
 
-st.set_page_config(layout="wide")
-st.title("Per-File Sales Agent Performance & LLM Chatbot")
+    # Every country at once; also shows the results of `python -m fanalysis.batch` for this file
+    if st.button("Predict Sales for All Countries", key=f"predict_all_{file.name}"):
+        try:
+            submit_batch(df, fingerprint, NEW_COUNTRIES, EXTENDED_PROMPT)
+        except Exception as e:
+            st.error(f"Prediction generation failed: {e}")
 
-# Function to call LLM
-def analyze_chatbot(question, df):
-    prompt = f"""
-    Analyze the following data and answer the question concisely but informatively.
-    Data:
-    {df.to_string(index=False)}
-    
-    Question: {question}
-    """
-    response = openai.ChatCompletion.create(
-        engine=deployment_name,
-        messages=[ 
-            {"role": "system", "content": "You are a data analyst. Provide structured, easy-to-understand answers using bullet points and summaries."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.5
-    )
-    return response["choices"][0]["message"]["content"].strip()
+    jobs = ui.render_jobs(batch_job_ids(fingerprint, NEW_COUNTRIES, EXTENDED_PROMPT), NEW_COUNTRIES, "**🗺️ All Countries:**")
+    if jobs:
+        report = combined_report(NEW_COUNTRIES, jobs, source=file.name)
+        st.download_button("Download Combined Report", report, f"market_entry_{file.name}.md", "text/markdown", key=f"report_{file.name}")
 
-# Simulate checklist evaluation
-def evaluate_market_checklist(response_text):
-    checklist = {
-        "🥣 Eating Habits": "Typical food prep methods",
-        "👥 Demographics": "Age distribution",
-        "🏷️ Competition": "top 5 local competitors",
-        "💸 Pricing": "average income",
-        "🛍️ Distribution": "Online vs retail",
-        "📢 Marketing": "Influencer culture",
-        "📚 Education": "product demos",
-        "🍛 Recipe Localization": "Popular regional cuisines",
-        "🔧 After-sales": "service centers",
-        "🌿 Sustainability": "Eco-awareness",
-        "⚖️ Regulatory": "appliance safety laws",
-        "📈 Sales Forecast": "6-month and 1-year prediction"
-    }
+    #st.subheader("✅ Market Entry Checklist Evaluation")
+    #checklist = evaluate_market_checklist(prediction_output)
+    #checklist_df = pd.DataFrame(checklist, columns=["Area", "Focus", "Evaluation (Pass/Fail)", "Reason"])
+    #st.dataframe(checklist_df)
 
-    checklist_results = []
-    for area, focus in checklist.items():
-        if focus.lower() in response_text.lower():
-            result = ("Pass", f"Includes: {focus}")
-        else:
-            result = ("Fail", f"Missing: {focus}")
-        checklist_results.append((area, focus, result[0], result[1]))
-    return checklist_results
 
-# Plotting function
-def plot_trend(df, group_by_col, value_col, title):
-    trend_data = df.groupby(group_by_col)[value_col].sum().reset_index()
-    fig, ax = plt.subplots(figsize=(8, 3))
-    ax.bar(trend_data[group_by_col], trend_data[value_col], color="skyblue")
-    plt.xticks(rotation=90, ha='right', fontsize=8)
-    plt.title(title)
-    plt.tight_layout()
-    st.pyplot(fig)
+st.set_page_config(layout="wide")
+st.title("Per-File Sales Agent Performance & LLM Chatbot")
 
-# File reading helper
-def read_file(file):
-    try:
-        if file.name.endswith('.csv'):
-            return pd.read_csv(file, encoding="utf-8")
-    except Exception:
-        try:
-            return pd.read_csv(file, encoding="ISO-8859-1")
-        except Exception:
-            return pd.read_csv(file, encoding="latin1")
-    if file.name.endswith(('.xls', '.xlsx')):
-        return pd.read_excel(file)
-    return None
+if "file_pipeline" not in st.session_state:
+    st.session_state.file_pipeline = FilePipeline(
+        [("parse", parse_file), ("profile", profile_file), ("summary", summarize_file)]
+    )
+if "consolidated" not in st.session_state:
+    st.session_state.consolidated = ConsolidatedStore()
 
 # Upload files
 uploaded_files = st.file_uploader("Upload CSV or Excel files", type=["csv", "xls", "xlsx"], accept_multiple_files=True)
 
+
 if uploaded_files:
+    # One slot per section and file, filled in whichever order the stages finish; unchanged
+    # files come straight from the pipeline's memory
+    sections = []
     for file in uploaded_files:
         st.markdown(f"---\n### 📁 File: `{file.name}`")
+        sections.append({name: st.empty() for name in ("parse", "summary", "profile", "questions")})
 
-        try:
-            df = read_file(file)
+    state = [{} for _ in uploaded_files]
+    for index, stage, value, error in st.session_state.file_pipeline.run(uploaded_files):
+        file, slots, done = uploaded_files[index], sections[index], state[index]
+        done[stage] = (value, error)
+
+        if stage == "parse":
+            if error is not None:
+                slots["parse"].error(f"Failed to read {file.name}: {error}")
+                continue
+            df, info = value
             if df is None or df.empty:
-                st.warning(f"No valid data found in {file.name}")
+                slots["parse"].warning(f"No valid data found in {file.name}")
                 continue
-        except Exception as e:
-            st.error(f"Failed to read {file.name}: {e}")
-            continue
-
-        st.subheader("🔍 Data Preview")
-        st.dataframe(df.head())
-
-        # Summary chatbot
-        st.subheader("📊 File Summary (Generated by LLM)")
-        try:
-            summary = analyze_chatbot("Please summarize the uploaded file.", df.head(20))
-            st.write(summary)
-        except Exception as e:
-            st.error(f"Summary generation failed: {e}")
+            with slots["parse"].container():
+                st.caption(describe_upload(info))
+                st.subheader("🔍 Data Preview")
+                st.dataframe(df.head())
+            slots["summary"].info("⏳ Summarizing the file...")
+
+        elif stage == "summary" and value is not None:
+            with slots["summary"].container():
+                # Summary chatbot
+                st.subheader("📊 File Summary (Generated by LLM)")
+                st.write(value)
+        elif stage == "summary" and error is not None:
+            slots["summary"].error(f"Summary generation failed: {error}")
+
+        elif stage == "profile" and value is not None:
+            df, _ = done["parse"][0]
+            with slots["profile"].container():
+                # Top 10 Analysis
+                st.subheader("🏆 Top 10 Performers (by PSU)")
+                st.dataframe(value["top"][["Partner Id", "Last Name", PSU_COLUMN, "Gross Earnings"]])
+                if "by_position" in value:
+                    st.subheader("🏅 Top 3 per Position (by PSU)")
+                    st.dataframe(value["by_position"][["Paid As Position", "Rank", "Partner Id", "Last Name", PSU_COLUMN]], hide_index=True)
+
+                st.subheader("📈 Trend Charts")
+                if "Paid As Position" in df.columns:
+                    plot_trend(df, "Paid As Position", "Gross Earnings", "Gross Earnings by Role")
+                if "Gender" in df.columns:
+                    plot_trend(df, "Gender", "Gross Earnings", "Earnings by Gender")
+
+        # Questions need both the summary and the PSU profile, as before
+        summary, profile = done.get("summary", (None, None)), done.get("profile", (None, None))
+        if stage in ("summary", "profile") and summary[0] is not None and profile[0] is not None:
+            with slots["questions"].container():
+                df, info = done["parse"][0]
+                render_questions(file, df, info["fingerprint"])
+
+    # Every parsed file is also a period partition of one consolidated store, so month-over-month
+    # questions see all months instead of one file
+    store = st.session_state.consolidated
+    fingerprints = []
+    for file, done in zip(uploaded_files, state):
+        parsed, error = done.get("parse", (None, None))
+        if parsed is None or parsed[0] is None or parsed[0].empty:
             continue
-
-        # Top 10 Analysis
-        if "PSU" in df.columns and "Last Name" in df.columns:
-            df["PSU"] = pd.to_numeric(df["PSU"], errors="coerce").fillna(0)
-            top_10 = df.sort_values(by="PSU", ascending=False).head(10)
-            st.subheader("🏆 Top 10 Performers (by PSU)")
-            st.dataframe(top_10[["Partner Id", "Last Name", "PSU", "Gross Earnings"]])
-
-            st.subheader("📈 Trend Charts")
-            if "Paid As Position" in df.columns:
-                plot_trend(df, "Paid As Position", "Gross Earnings", "Gross Earnings by Role")
-            if "Gender" in df.columns:
-                plot_trend(df, "Gender", "Gross Earnings", "Earnings by Gender")
-
-            # File-specific chatbot
-            st.subheader("💬 Ask a Question About This File")
-            question = st.text_input(f"Ask something about `{file.name}` data:", key=file.name)
-            if st.button(f"Ask LLM ({file.name})", key=f"ask_{file.name}"):
-                if question:
-                    response = analyze_chatbot(question, df.head(50))
-                    st.write("**Response:**", response)
-
-            # 🌍 Sales prediction section
-            st.subheader("🌍 Sales Prediction in New Countries")
-
-            new_countries = ["Germany", "France", "Italy", "India", "USA", "Japan", "Brazil", "Singapore"]
-            selected_country = st.selectbox(f"Select a country for prediction", new_countries)
-
-            if st.button(f"Predict Sales for {selected_country}"):
-                try:
-                    features_prompt = f"""
-You are a market analyst. Given the uploaded sales agent data and general market insights, analyze the opportunity for launching Thermomix by Vorwerk in the country: **{selected_country}**.
-
-Please include the following sections with bullet points and concise insights:
-
-### 1. **Product Overview**
-- Key features and USPs of Thermomix
-- Target consumer profile
-- Features that can be added in Thermomix
-
-### 2. **Country Market Evaluation: {selected_country}**
-Analyze the following **12 key evaluation areas** in-depth. For each area:
-- Provide detailed, country-specific insights covering all sub-points listed below.
-- Explicitly **mention each of the following focus areas verbatim** in your response so the system can validate them.
-- Structure your response such that it includes the **exact phrasing** like "Typical food prep methods", "average income", etc., directly in the bullet points.
-- Ensure every evaluation area gets a **"Pass"** by addressing risks with mitigation strategies where needed.
-- **Include real-time examples**, such as:
-  - Names of popular local recipes
-  - Notable influencers in the culinary space
-  - Relevant websites or platforms (with URLs)
-  - Local appliance retailers or e-commerce platforms
-
-🔍 Focus: **High-detail, bullet-based analysis covering the full market readiness checklist with real-world examples, web links, brand names, product comparisons, influencers, laws, pricing, sustainability data, and more.**
-
-📌 **Your output should contain all 12 checklist areas below. Use the exact phrases like 'Typical food prep methods', 'average income', etc., as written so the validation system can parse them.**
-
-🎯 **For each topic:**
-- Use dynamic **country-specific data** (assume access to the internet).
-- Provide **web links** to real sources (e.g. local cooking websites, influencer profiles, appliance stores, regulations).
-- Include **local product names**, **prices**, **examples**, and **facts** where possible,, **supported by links**.
-- **Echo the exact sub-phrases** in bullet points (to ensure checklist scoring works).
-- Include **risks with mitigation strategies** if something is missing.
-**Checklist Areas:**
-
-1. 🥣 **Eating Habits**
-   - Typical food prep methods
-   - Meal frequency and kitchen appliance use
-   - Cultural food preferences
-   - Cooking styles and techniques
-   - Popular local recipes with examples that can be added in Thermomix
-
-
-2. 👥 **Demographics**
-   - Age distribution, urban/rural split
-   - Urban Population City Names
-   - Total population
-   - Household size and structure
-   - Gender roles in cooking
-   - Tech-savvy population segments
-
-3. 🏷️ **Competition**
-   - List top 5 Thermomix competitors in {selected_country}
-   - Market share of competitors {selected_country}
-   - Compare their features, price, and market share
-
-4. 💸 **Pricing**
-   - Local affordability, average income
-   - average income with respect to age groups {selected_country}
-   - average income in {selected_country}
-   - Affordability of Thermomix vs. alternatives
-   - Financing options, EMIs, price positioning,estimate price range for product
-
-5. 🛍️ **Distribution**
-   - Online vs retail appliance market penetration
-   - Preferred consumer buying channels
-   - Local appliance retailers or e-commerce platforms (with URLs)
-
-6. 📢 **Marketing**
-   - Influencer culture,Top influencer names, language preferences
-   - Suitable localized marketing strategies with examples
-   - Thermomix brand positioning
-   - Local cooking content formats and platforms with examples
-
-7. 📚 **Education & Onboarding**
-   - Acceptance of product demos, tutorials
-   - Existing cooking content formats and platforms with examples
-
-8. 🍛 **Recipe Localization**
-   - Popular regional cuisines with examples
-   - Local recipe websites or platforms (with URLs)
-   - Thermomix adaptability for those dishes
-
-9. 🔧 **After-sales**
-   - Need for service centers, typical warranty expectations 
-   - Local support partners if any with examples
-   - Local appliance retailers or e-commerce platforms (with URLs)
-
-10. 🌿 **Sustainability**
-    - Eco-awareness, energy consumption attitudes with examples
-    - Recyclability and repair regulations
-    - I am trying to sell product in selected country. Will the power ratign support this appliances
-    - Local sustainability initiatives or certifications
-    - Thermomix's eco-friendly features
-
-11. ⚖️ **Regulatory Compliance**
-    - Local appliance safety laws with real-time examples
-    - Appliance safety laws in {selected_country}
-    - Laws,certifications, food contact material rules with examples
-    - Thermomix's compliance with local regulations
-    - Local certifications or standards
-
-12. 📈 **Sales Forecast**
-    - Thermomix's market current sales monthly with exact numbers
-    - Thermomix's market sales for 6 months and 1 year with exact numbers
-    - Competitor sales forecast for 6 months and 1 year with exact numbers
-    - Local sales trends and forecasts with exact numbers
-    - Market Positioning and growth potential of thermomix and competitors with exact numbers
-    - Comparative analysis of Thermomix vs. competitors
-    - Market Positiioning and growth potential of thermomix and competitors
-    - Competetive Edge of thermomix over competitors
-    - Challenges and opportunities in the market
-
----
-
-### 3. **Checklist Table Summary**
-Finally, provide a table with the following format:
-| Area | Focus | Evaluation (Pass/Fail) | Reason |
-|------|-------|-------------------------|--------|
-| Eating Habits | [key points] | Pass | [reason] |
-| ... | ... | ... | ... |
-
-✅ Ensure that **each row** provides sufficient evidence to **justify a "Pass"** where applicable.
-
-If there are risks, suggest **mitigation strategies** to turn a Fail into a Pass.
-
-Base all reasoning on real market trends and local context. Be detailed but concise.
-"""
-                    prediction_output = analyze_chatbot(features_prompt, df.head(50))
-                    st.markdown("**📈 Prediction Output:**")
-                    st.write(prediction_output)
-
-                    #st.subheader("✅ Market Entry Checklist Evaluation")
-                    #checklist = evaluate_market_checklist(prediction_output)
-                    #checklist_df = pd.DataFrame(checklist, columns=["Area", "Focus", "Evaluation (Pass/Fail)", "Reason"])
-                    #st.dataframe(checklist_df)
-
-                except Exception as e:
-                    st.error(f"Prediction generation failed: {e}")
+        df, info = parsed
+        fingerprints.append(info["fingerprint"])
+        if info["fingerprint"] not in store:
+            store.add(df, file.name, info["fingerprint"])
+    store.retain(fingerprints)
+
+    if len(store.periods) > 1:
+        st.markdown("---\n### 🗓️ All Files Combined")
+        st.caption(f"{len(uploaded_files)} files across {len(store.periods)} periods: {', '.join(store.periods)}")
+        if store.undated:
+            st.warning(f"No month recognised in: {', '.join(store.undated)}. These are shown after the dated months.")
+        st.line_chart(store.series("totals").T.rename(columns={"All": EARNINGS_COLUMN}))
+
+        combined_question = st.selectbox("Choose a month-over-month question", [""] + period_questions(), key="combined_predefined")
+        combined_own = st.text_input("Or ask your own question about all files:", key="combined_question")
+        if st.button("Ask about all files", key="ask_combined"):
+            question = combined_own or combined_question
+            if question:
+                answer_question(question, store.frame(), analyze_chatbot, narrate=True, compute=store.compute_answer)
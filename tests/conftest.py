@@ -0,0 +1,50 @@
+import os
+import tempfile
+
+# Keep the caches, job table and history of test runs out of the user's cache directory
+os.environ["FANALYSIS_CACHE_DIR"] = tempfile.mkdtemp(prefix="fanalysis-tests-")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import pytest  # noqa: E402
+
+from fanalysis import llm  # noqa: E402
+from fanalysis.cache import ResponseCache  # noqa: E402
+
+
+class FakeGateway:
+    """Stands in for ``LLMGateway``: records every prompt actually sent and answers at once."""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def complete(self, messages, **params):
+        self.prompts.append(messages[-1]["content"])
+        return f"answer {len(self.prompts)}"
+
+    async def stream(self, messages, **params):
+        self.prompts.append(messages[-1]["content"])
+        for word in ("streamed", "answer"):
+            yield word + " "
+
+
+@pytest.fixture
+def fake_llm(monkeypatch, tmp_path):
+    gateway = FakeGateway()
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+    monkeypatch.setattr(llm, "get_gateway", lambda: gateway)
+    monkeypatch.setattr(llm, "get_cache", lambda: cache)
+    return gateway
+
+
+@pytest.fixture
+def bonus_frame():
+    rng = np.random.default_rng(0)
+    rows = 600
+    return pd.DataFrame({
+        "Partner Id": np.arange(1000, 1000 + rows),
+        "Last Name": [f"Name{i}" for i in range(rows)],
+        "Manager Name": rng.choice(["Smith", "Jones", "Garcia", "Chen"], rows),
+        "Paid As Position": rng.choice(["Advisor", "Team Leader", "Manager"], rows),
+        "Gross Earnings": rng.normal(2500, 800, rows).round(2),
+    })
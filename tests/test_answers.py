@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fanalysis.answers import compute_answer
+from fanalysis.schema import BONUS_COLUMNS, EARNINGS_COLUMN
+
+QUESTIONS = [
+    "Overall Bonus Analysis",
+    "Role wise bonus analysis with Total Bonus earned",
+    "Top Performers analysis - Total (Gross earnings)",
+    "Bottom Performers analysis - Total (Gross earnings)",
+    "Top Performers analysis - Individual Bonuses",
+    "Bottom Performers analysis - Individual Bonuses",
+    "Gender Wise Analysis",
+    "How many types of bonuses are distributed?",
+    "Which bonus type contributes most to total earnings?",
+    "Top 3 bonus types based on total distribution.",
+]
+
+
+@pytest.fixture
+def export():
+    rng = np.random.default_rng(2)
+    rows = 40
+    df = pd.DataFrame({
+        "Partner Id": [f"P{i}" for i in range(rows)],
+        "First Name": [f"First{i}" for i in range(rows)],
+        "Last Name": [f"Last{i}" for i in range(rows)],
+        "Paid As Position": rng.choice(["Advisor", "Manager"], rows),
+        "Gender": rng.choice(["F", "M"], rows),
+    })
+    for col in BONUS_COLUMNS:
+        df[col] = rng.integers(0, 500, rows).astype(float)
+    df[EARNINGS_COLUMN] = df[BONUS_COLUMNS].sum(axis=1)
+    return df
+
+
+@pytest.mark.parametrize("question", QUESTIONS)
+def test_every_catalogue_question_is_computed_on_a_full_export(export, question):
+    table = compute_answer(question, export)
+    assert isinstance(table, pd.DataFrame) and not table.empty
+
+
+@pytest.mark.parametrize("question", QUESTIONS)
+def test_a_file_without_the_columns_falls_back_to_the_llm(question):
+    df = pd.DataFrame({"Region": ["North", "South"], "Sales": [10, 20]})
+    assert compute_answer(question, df) is None
+
+
+@pytest.mark.parametrize("question, dropped", [
+    ("Role wise bonus analysis with Total Bonus earned", ["Paid As Position"]),
+    ("Gender Wise Analysis", ["Gender"]),
+    ("Top Performers analysis - Total (Gross earnings)", [EARNINGS_COLUMN]),
+    ("Overall Bonus Analysis", [EARNINGS_COLUMN]),
+    ("Top 3 bonus types based on total distribution.", BONUS_COLUMNS),
+])
+def test_one_missing_column_is_enough_to_fall_back(export, question, dropped):
+    assert compute_answer(question, export.drop(columns=dropped)) is None
+
+
+def test_answers_use_the_columns_that_are_there(export):
+    table = compute_answer("Top 3 bonus types based on total distribution.", export.drop(columns=BONUS_COLUMNS[1:]))
+    assert table["Bonus Type"].tolist() == [BONUS_COLUMNS[0]]
+
+
+def test_rankings_and_groups_are_exact(export):
+    top = compute_answer("Top Performers analysis - Total (Gross earnings)", export)
+    assert top[EARNINGS_COLUMN].tolist() == export[EARNINGS_COLUMN].nlargest(10, keep="first").tolist()
+    roles = compute_answer("Role wise bonus analysis with Total Bonus earned", export)
+    assert roles["Agents"].sum() == len(export)
+    assert roles["Total Bonus"].sum() == pytest.approx(export[BONUS_COLUMNS].to_numpy().sum())
+
+
+def test_unregistered_questions_are_not_computed(export):
+    assert compute_answer("Why did earnings drop?", export) is None
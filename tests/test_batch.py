@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+from fanalysis import batch, jobs
+from fanalysis.batch import batch_job_ids, combined_report, submit_batch
+from fanalysis.jobs import JobQueue
+from fanalysis.market import BASIC_CHECKLIST, EXTENDED_PROMPT
+
+COUNTRIES = ["Japan", "India", "Brazil"]
+
+
+@pytest.fixture
+def export(tmp_path):
+    path = tmp_path / "bonus.csv"
+    path.write_text("Region,Sales\nNorth,300\nSouth,200\n")
+    return path
+
+
+@pytest.fixture
+def job_path(monkeypatch, tmp_path):
+    # The CLI's queue uses the default job table; keep it per test
+    path = str(tmp_path / "jobs.sqlite")
+    monkeypatch.setattr(jobs, "DEFAULT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(jobs, "HEARTBEAT_SECONDS", 0.05)
+    return path
+
+
+def _run(export, tmp_path, *args):
+    return batch.main([str(export), "--countries", *COUNTRIES, "-o", str(tmp_path / "report.md"), *args])
+
+
+def test_a_run_writes_the_combined_report(fake_llm, job_path, export, tmp_path, capsys):
+    assert _run(export, tmp_path) == 0
+    assert len(fake_llm.prompts) == 3
+    report = (tmp_path / "report.md").read_text(encoding="utf-8")
+    assert "Countries: 3 of 3 completed" in report
+    assert [line for line in report.splitlines() if line.startswith("## ")] == [
+        "## Checklist Summary", "## Japan", "## India", "## Brazil"]
+    assert report.count("streamed answer") == 3
+    assert "Report written to" in capsys.readouterr().out
+
+
+def test_a_rerun_resumes_where_the_last_one_stopped(fake_llm, job_path, export, tmp_path, capsys):
+    from fanalysis.ingest import load_upload
+
+    df, info = load_upload(str(export))
+    queue = JobQueue(job_path, workers=1)
+    submit_batch(df, info["fingerprint"], COUNTRIES[:1], EXTENDED_PROMPT, queue=queue)
+    queue.wait(batch_job_ids(info["fingerprint"], COUNTRIES[:1]), timeout=5)
+    # India was in flight when its process died
+    india = batch_job_ids(info["fingerprint"], ["India"])[0]
+    with queue._connect() as conn:
+        params = json.dumps({"system": "", "prompt": "India", "params": {}})
+        conn.execute(
+            "INSERT INTO jobs (id, kind, label, params, status, owner, created, updated) "
+            "VALUES (?, 'chat', '', ?, 'running', 'gone:0', 0, 0)",
+            (india, params),
+        )
+    queue.close()
+    sent = len(fake_llm.prompts)
+
+    assert _run(export, tmp_path) == 0
+    assert "Resuming: 1 of 3 countries already done" in capsys.readouterr().out
+    assert len(fake_llm.prompts) - sent == 2  # India restarted and Brazil; Japan reused
+    assert "Countries: 3 of 3 completed" in (tmp_path / "report.md").read_text(encoding="utf-8")
+
+
+def test_an_interrupted_run_saves_nothing_and_can_be_resumed(fake_llm, job_path, export, tmp_path, monkeypatch, capsys):
+    wait = JobQueue.wait
+
+    def interrupt(self, job_ids, timeout=None, poll=0.5):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(JobQueue, "wait", interrupt)
+    assert _run(export, tmp_path) == 130
+    assert "run the same command again to resume" in capsys.readouterr().err
+    assert not (tmp_path / "report.md").exists()
+
+    monkeypatch.setattr(JobQueue, "wait", wait)
+    assert _run(export, tmp_path) == 0
+    assert len(fake_llm.prompts) == 3  # every country was predicted exactly once
+    assert "Countries: 3 of 3 completed" in (tmp_path / "report.md").read_text(encoding="utf-8")
+
+
+def test_the_report_lists_every_country_with_its_outcome():
+    jobs_ = [
+        {"status": "done", "result": " ".join(BASIC_CHECKLIST.values())},
+        {"status": "failed", "error": "rate limited"},
+        None,
+    ]
+    report = combined_report(COUNTRIES, jobs_, source="bonus.csv", checklist=BASIC_CHECKLIST)
+    assert "Source file: bonus.csv" in report
+    assert "Countries: 1 of 3 completed" in report
+    assert f"| Japan | {len(BASIC_CHECKLIST)} of {len(BASIC_CHECKLIST)} | - |" in report
+    assert "| India |" not in report  # only finished countries are scored
+    assert "_Not generated: rate limited_" in report
+    assert report.rstrip().endswith("_Not generated yet._")
+
+
+def test_files_without_rows_are_rejected(tmp_path, capsys):
+    (tmp_path / "empty.csv").write_text("Region,Sales\n")
+    assert batch.main([str(tmp_path / "empty.csv")]) == 1
+    assert "No valid data found" in capsys.readouterr().err
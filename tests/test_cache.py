@@ -0,0 +1,69 @@
+import types
+
+import pytest
+
+from fanalysis import cache as cache_module
+from fanalysis.cache import ResponseCache, make_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def test_keys_depend_on_every_part_but_not_parameter_order():
+    assert make_key("system", "prompt", engine="gpt-4", temperature=0) == make_key(
+        "system", "prompt", temperature=0, engine="gpt-4")
+    assert make_key("system", "prompt", engine="gpt-4") != make_key("system", "prompt!", engine="gpt-4")
+    assert make_key("system", "prompt", engine="gpt-4") != make_key("system", "prompt", engine="gpt-35")
+
+
+def test_hits_and_misses_are_counted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+    calls = []
+    for _ in range(3):
+        assert cache.get_or_compute("k", lambda: calls.append(1) or "answer") == "answer"
+    assert len(calls) == 1
+    assert cache.stats() == {"hits": 2, "misses": 1, "entries": 1}
+    assert "k" in cache and "other" not in cache
+    assert cache.stats()["hits"] == 2  # membership tests are not counted
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), ttl_seconds=60)
+    cache.set("k", "answer")
+    clock[0] += 59
+    assert cache.get("k") == "answer"
+    clock[0] += 2
+    assert "k" not in cache
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), max_entries=2)
+    cache.set("a", "1")
+    clock[0] += 1
+    cache.set("b", "2")
+    clock[0] += 1
+    assert cache.get("a") == "1"  # "a" is now the most recently used
+    clock[0] += 1
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("1", "3")
+
+
+def test_entries_are_shared_through_the_file(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    ResponseCache(path).set("k", "answer")
+    assert ResponseCache(path).get("k") == "answer"
+
+
+def test_clear_resets_entries_and_counters(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+    cache.set("k", "answer")
+    cache.get("k")
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "entries": 0}
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+from fanalysis import charts
+from fanalysis.charts import (WIDE_CHART, chart_cache_stats, choose_backend, render_bar_chart,
+                              vega_lite_bar)
+
+
+@pytest.fixture
+def draws(monkeypatch):
+    """Count real renders; the PNG memo is emptied so every test starts cold."""
+    monkeypatch.setattr(charts, "_png_cache", type(charts._png_cache)())
+    calls = []
+    draw = charts._draw_bar
+    monkeypatch.setattr(charts, "_draw_bar", lambda *args: calls.append(args) or draw(*args))
+    return calls
+
+
+def _trend(values):
+    return pd.DataFrame({"Region": [f"R{i}" for i in range(len(values))], "Sales": values})
+
+
+def test_identical_charts_are_drawn_once(draws):
+    before = chart_cache_stats()
+    png = render_bar_chart(_trend([3, 1, 2]), "Region", "Sales", "Sales by Region", **WIDE_CHART)
+    assert png.startswith(b"\x89PNG")
+    again = render_bar_chart(_trend([3, 1, 2]), "Region", "Sales", "Sales by Region", **WIDE_CHART)
+    assert again is png
+    assert len(draws) == 1
+    stats = chart_cache_stats()
+    assert (stats["hits"] - before["hits"], stats["misses"] - before["misses"]) == (1, 1)
+
+
+def test_changed_data_or_style_is_redrawn(draws):
+    render_bar_chart(_trend([3, 1, 2]), "Region", "Sales", "Sales by Region")
+    render_bar_chart(_trend([3, 1, 5]), "Region", "Sales", "Sales by Region")
+    render_bar_chart(_trend([3, 1, 5]), "Region", "Sales", "Sales by Region", rotation=45)
+    assert len(draws) == 3
+
+
+def test_the_memo_is_bounded(draws, monkeypatch):
+    monkeypatch.setattr(charts, "MAX_CACHED_CHARTS", 2)
+    for values in ([1], [2], [3]):
+        render_bar_chart(_trend(values), "Region", "Sales", "t")
+    assert chart_cache_stats()["entries"] == 2
+    render_bar_chart(_trend([1]), "Region", "Sales", "t")
+    assert len(draws) == 4  # the oldest chart was evicted
+
+
+def test_many_groups_switch_to_vega_lite_with_an_other_bucket():
+    trend = _trend(list(range(100)))
+    assert choose_backend(trend, "auto") == "vega-lite"
+    assert choose_backend(trend.head(5), "auto") == "matplotlib"
+    data, spec = vega_lite_bar(trend, "Region", "Sales", "Sales by Region", top_n=10)
+    assert len(data) == 11
+    assert list(data["value"][:10]) == list(range(99, 89, -1))
+    assert data["group"].iloc[-1] == "Other (90 more)"
+    assert data["value"].iloc[-1] == sum(range(90))
+    assert spec["encoding"]["x"]["title"] == "Region"
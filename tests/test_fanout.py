@@ -0,0 +1,32 @@
+import time
+
+from fanalysis.fanout import RateLimiter, run_concurrently
+
+
+def test_results_carry_their_input_index():
+    results = {index: result for index, result, error in run_concurrently(lambda x: x * 2, range(20))}
+    assert results == {i: i * 2 for i in range(20)}
+
+
+def test_errors_are_yielded_not_raised():
+    def fail_on_three(x):
+        if x == 3:
+            raise ValueError("three")
+        return x
+
+    errors = {index: error for index, _, error in run_concurrently(fail_on_three, range(5)) if error}
+    assert list(errors) == [3] and isinstance(errors[3], ValueError)
+
+
+def test_calls_are_not_rate_limited_by_default():
+    # Cached LLM calls go through here too; the gateway limits the real requests
+    start = time.monotonic()
+    assert len(list(run_concurrently(lambda x: x, range(500)))) == 500
+    assert time.monotonic() - start < 5
+
+
+def test_an_explicit_limiter_still_throttles():
+    limiter = RateLimiter(2, period=0.3)
+    start = time.monotonic()
+    list(run_concurrently(lambda x: x, range(3), limiter=limiter))
+    assert time.monotonic() - start >= 0.3
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import time
+
+import pytest
+from aiohttp import web
+
+from fanalysis import gateway
+from fanalysis.gateway import GatewayError, LLMGateway, retry_after_seconds
+
+MESSAGES = [{"role": "user", "content": "How many partners?"}]
+
+
+class StubServer:
+    """Azure-shaped chat completions endpoint: ``fail`` 429s first, a short delay per call."""
+
+    def __init__(self, fail=0, retry_after="0.3", delay=0.1):
+        self.fail = fail
+        self.retry_after = retry_after
+        self.delay = delay
+        self.hits = 0
+        self.times = []
+
+    async def handle(self, request):
+        body = await request.json()
+        self.hits += 1
+        self.times.append(time.monotonic())
+        if self.fail:
+            self.fail -= 1
+            return web.json_response({"error": "throttled"}, status=429, headers={"Retry-After": self.retry_after})
+        prompt = body["messages"][-1]["content"]
+        if "bad request" in prompt:
+            return web.json_response({"error": "invalid"}, status=400)
+        await asyncio.sleep(self.delay)
+        answer = f"Answer to: {prompt}"
+        if not body.get("stream"):
+            return web.json_response({
+                "choices": [{"message": {"content": answer}}],
+                "usage": {"total_tokens": 20},
+            })
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        events = [{"choices": []}] + [{"choices": [{"delta": {"content": word + " "}}]} for word in answer.split()]
+        for event in events:
+            await response.write(f"data: {json.dumps(event)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+
+def serve(stub, scenario):
+    """Run ``scenario(gateway)`` against ``stub`` on a local port."""
+
+    async def main():
+        app = web.Application()
+        app.router.add_post("/openai/deployments/{deployment}/chat/completions", stub.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        client = LLMGateway(f"http://127.0.0.1:{port}/", "key", "2024-02-01", requests_per_minute=0, max_retries=3)
+        try:
+            return await scenario(client)
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+@pytest.fixture(autouse=True)
+def small_jitter(monkeypatch):
+    monkeypatch.setattr(gateway, "BACKOFF_BASE", 0.01)
+
+
+def test_completion_text_is_returned():
+    stub = StubServer()
+    answer = serve(stub, lambda client: client.complete(MESSAGES, engine="gpt-4"))
+    assert answer == "Answer to: How many partners?"
+
+
+def test_429_is_retried_after_retry_after():
+    stub = StubServer(fail=2, retry_after="0.3")
+
+    async def scenario(client):
+        answer = await client.complete(MESSAGES, engine="gpt-4")
+        return answer, client.stats
+
+    answer, stats = serve(stub, scenario)
+    assert answer.startswith("Answer to:")
+    assert stub.hits == 3 and stats["throttled"] == 2 and stats["retries"] == 2
+    assert all(later - earlier >= 0.3 for earlier, later in zip(stub.times, stub.times[1:]))
+
+
+def test_429_pauses_the_other_requests_too():
+    stub = StubServer(fail=1, retry_after="0.5")
+
+    async def scenario(client):
+        first = asyncio.ensure_future(client.complete(MESSAGES, engine="gpt-4"))
+        await asyncio.sleep(0.05)
+        start = time.monotonic()
+        await client.complete([{"role": "user", "content": "Another question"}], engine="gpt-4")
+        await first
+        return start
+
+    start = serve(stub, scenario)
+    # The second request was sent only once the 429's Retry-After had passed
+    assert stub.times[1] - stub.times[0] >= 0.5 and stub.times[1] > start
+
+
+def test_identical_requests_in_flight_are_coalesced():
+    stub = StubServer(delay=0.3)
+
+    async def scenario(client):
+        answers = await asyncio.gather(*(client.complete(MESSAGES, engine="gpt-4") for _ in range(5)))
+        return answers, client.stats
+
+    answers, stats = serve(stub, scenario)
+    assert len(set(answers)) == 1
+    assert stub.hits == 1 and stats["coalesced"] == 4
+
+
+def test_4xx_raises_gateway_error_without_retrying():
+    stub = StubServer()
+
+    async def scenario(client):
+        with pytest.raises(GatewayError) as excinfo:
+            await client.complete([{"role": "user", "content": "bad request"}], engine="gpt-4")
+        return excinfo.value
+
+    error = serve(stub, scenario)
+    assert error.status == 400 and stub.hits == 1
+
+
+def test_retries_are_exhausted_with_gateway_error():
+    stub = StubServer(fail=10, retry_after="0")
+
+    async def scenario(client):
+        with pytest.raises(GatewayError) as excinfo:
+            await client.complete(MESSAGES, engine="gpt-4")
+        return excinfo.value
+
+    assert serve(stub, scenario).status == 429
+    assert stub.hits == 4
+
+
+def test_stream_yields_fragments():
+    stub = StubServer(fail=1, retry_after="0")
+
+    async def scenario(client):
+        return [fragment async for fragment in client.stream(MESSAGES, engine="gpt-4")]
+
+    fragments = serve(stub, scenario)
+    assert len(fragments) > 1
+    assert "".join(fragments).strip() == "Answer to: How many partners?"
+
+
+def test_a_deployment_is_required():
+    with pytest.raises(GatewayError):
+        serve(StubServer(), lambda client: client.complete(MESSAGES))
+
+
+def test_retry_after_headers():
+    assert retry_after_seconds({"retry-after-ms": "250"}) == 0.25
+    assert retry_after_seconds({"Retry-After": "3"}) == 3.0
+    assert retry_after_seconds({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0.0
+    assert retry_after_seconds({}) is None
@@ -0,0 +1,85 @@
+import csv
+import io
+
+import pandas as pd
+import pytest
+
+from fanalysis.history import SearchHistory
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "history.sqlite")
+
+
+def _fill(history, n):
+    for i in range(n):
+        history.add(f"question {i}", f"answer {i}")
+
+
+def test_pages_are_newest_first(path):
+    history = SearchHistory("page", path)
+    _fill(history, 25)
+    assert history.count() == 25
+    assert [q for q, _ in history.page(0, size=10)] == [f"question {i}" for i in range(24, 14, -1)]
+    assert [q for q, _ in history.page(2, size=10)] == [f"question {i}" for i in range(4, -1, -1)]
+    assert history.page(3, size=10) == []
+
+
+@pytest.mark.parametrize("full_text", [True, False])
+def test_search_matches_questions_and_answers(path, full_text):
+    history = SearchHistory("page", path)
+    history.full_text = full_text and history.full_text
+    history.add("Who earned the most?", "Agent Smith earned 1200")
+    history.add("Total bonus by region", "North: 300, South: 200")
+    history.add("Who manages Smith?", "Jones")
+    assert history.count("smith") == 2
+    assert [q for q, _ in history.page(query="smith")] == ["Who manages Smith?", "Who earned the most?"]
+    assert [q for q, _ in history.page(query="north")] == ["Total bonus by region"]
+    assert history.count("") == history.count() == 3
+
+
+def test_search_words_are_prefixes_and_syntax_is_literal(path):
+    history = SearchHistory("page", path)
+    if not history.full_text:
+        pytest.skip("SQLite without FTS5")
+    history.add("Gross earnings by manager", "...")
+    history.add("Gross bonus", "...")
+    assert history.count("earn gross") == 1
+    assert history.count('gross"*') == 2
+    assert history.count("NEAR(") == 0
+
+
+def test_each_scope_keeps_only_its_latest_entries(path):
+    capped = SearchHistory("capped", path, max_entries=5)
+    other = SearchHistory("other", path, max_entries=5)
+    _fill(other, 3)
+    _fill(capped, 12)
+    assert capped.count() == 5
+    assert [q for q, _ in capped.page(size=10)] == [f"question {i}" for i in range(11, 6, -1)]
+    assert other.count() == 3
+    if capped.full_text:
+        assert capped.count("question 3") == 0  # evicted entries leave the search index too
+
+
+def test_scopes_are_separate_and_durable(path):
+    SearchHistory("alice", path).add("mine", "a")
+    SearchHistory("bob", path).add("theirs", "b")
+    assert SearchHistory("alice", path).page() == [("mine", "a")]
+    SearchHistory("bob", path).clear()
+    assert SearchHistory("bob", path).count() == 0
+    assert SearchHistory("alice", path).count() == 1
+
+
+def test_tables_round_trip_and_export_as_records(path):
+    history = SearchHistory("page", path)
+    table = pd.DataFrame({"Region": ["North", "South"], "Total": [300, 200]})
+    history.add("Total by region", table)
+    history.add("Plain", None)
+    (_, plain), (_, answer) = history.page()
+    assert plain == ""
+    pd.testing.assert_frame_equal(answer, table)
+    rows = list(csv.reader(io.StringIO(history.export().decode("utf-8"))))
+    assert rows[0] == ["question", "answer", "asked_at"]
+    assert rows[1][:2] == ["Total by region", '[{"Region": "North", "Total": 300}, {"Region": "South", "Total": 200}]']
+    assert rows[2][:2] == ["Plain", ""]
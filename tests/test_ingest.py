@@ -0,0 +1,101 @@
+import io
+
+import pytest
+
+from fanalysis import ingest
+from fanalysis.ingest import describe_upload, detect_encoding, read_upload, sniff_delimiter
+
+
+@pytest.fixture(autouse=True)
+def upload_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "UPLOAD_CACHE_DIR", str(tmp_path / "uploads"))
+    return tmp_path / "uploads"
+
+
+SEMICOLON_CP1252 = "Region;Agent;Sales\r\nNord;José Müller;1200\r\nSüd;Zoë Ångström;800\r\n".encode("cp1252")
+
+
+def test_windows_exports_keep_their_accents():
+    assert detect_encoding(SEMICOLON_CP1252) == "cp1252"
+    df, info = read_upload(io.BytesIO(SEMICOLON_CP1252), name="sales.csv")
+    assert (info["encoding"], info["delimiter"]) == ("cp1252", ";")
+    assert list(df.columns) == ["Region", "Agent", "Sales"]
+    assert list(df["Agent"]) == ["José Müller", "Zoë Ångström"]
+    assert list(df["Sales"]) == [1200, 800]
+    assert "delimiter: semicolon" in describe_upload(info)
+
+
+def test_utf8_with_and_without_bom():
+    text = "Region,Agent\nNord,José\n"
+    assert detect_encoding(text.encode("utf-8")) == "utf-8"
+    df, info = read_upload(b"\xef\xbb\xbf" + text.encode("utf-8"), name="sales.csv")
+    assert info["encoding"] == "utf-8-sig"
+    assert list(df.columns) == ["Region", "Agent"]
+    assert df["Agent"][0] == "José"
+
+
+def test_a_character_split_across_decode_chunks_is_still_utf8(monkeypatch):
+    monkeypatch.setattr(ingest, "_DECODE_CHUNK", 4)
+    assert detect_encoding("abcé".encode("utf-8")) == "utf-8"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("a\tb\tc\n1\t2\t3\n", "\t"),
+    ("a|b|c\n1|2|3\n", "|"),
+    ("a,b,c\n1,2,3\n", ","),
+    ("single column\nvalue\n", ","),
+    ("", ","),
+])
+def test_sniff_delimiter(text, expected):
+    assert sniff_delimiter(text) == expected
+
+
+def test_unsupported_extensions_are_not_parsed():
+    assert read_upload(b"whatever", name="notes.txt") == (None, {})
+
+
+def _bonus_csv(rows=40):
+    lines = ["Partner Id,Paid As Position,Gross Pay"]
+    lines += [f"P{i:03d},{('Agent', 'Manager')[i % 2]},{100 + i}.5" for i in range(rows)]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def test_uploads_round_trip_through_the_columnar_cache(monkeypatch):
+    first, info = ingest.load_upload(_bonus_csv(), name="bonus.csv")
+    assert info["cached"] is False
+    assert info["renamed"] == {"Gross Pay": "Gross Earnings"}
+
+    monkeypatch.setattr(ingest, "read_upload", lambda *a, **k: pytest.fail("cached upload was re-parsed"))
+    second, cached_info = ingest.load_upload(_bonus_csv(), name="bonus.csv")
+    assert cached_info["cached"] is True
+    assert cached_info["fingerprint"] == info["fingerprint"]
+    assert cached_info["renamed"] == info["renamed"]
+    assert dict(second.dtypes) == dict(first.dtypes)
+    assert str(second["Paid As Position"].dtype) == "category"
+    assert list(second["Partner Id"]) == list(first["Partner Id"])
+    assert list(second["Gross Earnings"]) == list(first["Gross Earnings"])
+    assert "(served from upload cache)" in describe_upload(cached_info)
+
+
+def test_changed_bytes_are_parsed_again():
+    _, info = ingest.load_upload(_bonus_csv(40), name="bonus.csv")
+    _, other = ingest.load_upload(_bonus_csv(41), name="bonus.csv")
+    assert other["cached"] is False
+    assert other["fingerprint"] != info["fingerprint"]
+
+
+def test_an_unreadable_cache_entry_is_rebuilt(upload_cache):
+    _, info = ingest.load_upload(_bonus_csv(), name="bonus.csv")
+    (upload_cache / (info["fingerprint"] + ".arrow")).write_bytes(b"not arrow")
+    df, again = ingest.load_upload(_bonus_csv(), name="bonus.csv")
+    assert again["cached"] is False
+    assert len(df) == 40
+    assert ingest.load_upload(_bonus_csv(), name="bonus.csv")[1]["cached"] is True
+
+
+def test_the_upload_cache_is_bounded(upload_cache, monkeypatch):
+    monkeypatch.setattr(ingest, "MAX_CACHED_UPLOADS", 2)
+    for rows in (10, 11, 12):
+        ingest.load_upload(_bonus_csv(rows), name="bonus.csv")
+    assert len(list(upload_cache.glob("*.arrow"))) == 2
+    assert len(list(upload_cache.glob("*.json"))) == 2
@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from fanalysis import jobs
+from fanalysis.jobs import JobQueue, job_handler
+
+release = threading.Event()
+
+
+@job_handler("test-echo")
+def _echo_job(params, report):
+    return params["text"]
+
+
+@job_handler("test-wait")
+def _wait_job(params, report):
+    release.wait(10)
+    return "released"
+
+
+@pytest.fixture
+def fast_heartbeat(monkeypatch):
+    monkeypatch.setattr(jobs, "HEARTBEAT_SECONDS", 0.05)
+    release.clear()
+    yield
+    release.set()
+
+
+def orphan(path, job_id, owner, status="running"):
+    """A job row left behind by a process that is gone."""
+    with JobQueue(path, workers=1)._connect() as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, kind, label, params, status, owner, created, updated) VALUES (?, ?, '', ?, ?, ?, 0, 0)",
+            (job_id, "test-echo", json.dumps({"text": "resumed"}), status, owner),
+        )
+
+
+def test_submit_runs_the_job_once(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    job = queue.submit("a", "test-echo", {"text": "hello"})
+    assert queue.submit("a", "test-echo", {"text": "other"})["id"] == job["id"]
+    assert queue.wait(["a"], timeout=5)[0]["result"] == "hello"
+
+
+@pytest.mark.parametrize("owner", ["4242:0123456789abcdef", 4242, None], ids=["token", "legacy-pid", "none"])
+def test_jobs_of_a_dead_owner_are_resumed(tmp_path, owner):
+    path = str(tmp_path / "jobs.sqlite")
+    orphan(path, "a", owner)
+    queue = JobQueue(path)
+    job = queue.wait(["a"], timeout=5)[0]
+    assert job["status"] == "done" and job["result"] == "resumed"
+
+
+def test_a_reused_pid_does_not_keep_a_job_claimed(tmp_path):
+    # The dead owner had this very pid; only its token tells it apart from us
+    path = str(tmp_path / "jobs.sqlite")
+    orphan(path, "a", f"{os.getpid()}:dead")
+    assert JobQueue(path).wait(["a"], timeout=5)[0]["status"] == "done"
+
+
+def test_a_live_owner_keeps_its_jobs(tmp_path, fast_heartbeat):
+    path = str(tmp_path / "jobs.sqlite")
+    first = JobQueue(path, workers=1)
+    first.submit("a", "test-wait", {})
+    second = JobQueue(path, workers=1)
+    time.sleep(0.5)
+    assert second.get("a")["owner"] == first.owner and second.get("a")["status"] == "running"
+    release.set()
+    assert first.wait(["a"], timeout=5)[0]["result"] == "released"
+
+
+def test_jobs_of_an_owner_that_stops_beating_are_taken_over(tmp_path, fast_heartbeat):
+    path = str(tmp_path / "jobs.sqlite")
+    first = JobQueue(path, workers=1)
+    first.submit("a", "test-wait", {})
+    first.submit("b", "test-echo", {"text": "taken over"})
+    second = JobQueue(path, workers=1)
+    # Closing stops the heartbeat; "b" is still queued behind "a"
+    first.close()
+    job = second.wait(["b"], timeout=5)[0]
+    assert job["status"] == "done" and job["owner"] == second.owner
+
+
+def test_chat_job_reads_a_long_stream_in_linear_time(monkeypatch):
+    from fanalysis import llm
+
+    fragments = [f"word{i} " for i in range(20000)]
+    monkeypatch.setattr(llm, "stream_chat_completion", lambda system, prompt, **params: iter(fragments))
+    reports = []
+
+    def report(progress, message="", partial=None):
+        if not reports:
+            reports.append((message() if callable(message) else message, partial() if callable(partial) else partial))
+
+    start = time.monotonic()
+    result = jobs._chat_job({"system": "", "prompt": "", "params": {"max_tokens": 100}}, report)
+    assert time.monotonic() - start < 2
+    assert result == "".join(fragments).strip()
+    assert reports == [("1 words written", "word0 ")]
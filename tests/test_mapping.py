@@ -0,0 +1,48 @@
+import pandas as pd
+
+from fanalysis.mapping import conform, header_key, missing_columns, resolve_columns
+
+
+def test_header_key_ignores_case_spacing_and_punctuation():
+    assert header_key(" Gross-Earnings ") == header_key("gross earnings") == "grossearnings"
+
+
+def test_headers_resolve_by_alias_abbreviation_and_fuzzy_match():
+    renames = resolve_columns(("PSU", "Basic Commission Bonus", "agent id", "Gros Earnings", "Notes"))
+    assert renames == {
+        "PSU": "Personal Sales Unit(PSU)",
+        "Basic Commission Bonus": "Basic commission Bonus(BCB)",
+        "agent id": "Partner Id",
+        "Gros Earnings": "Gross Earnings",
+    }
+
+
+def test_a_canonical_name_is_never_given_twice():
+    assert resolve_columns(("PSU", "Personal Sales Unit(PSU)")) == {}
+    assert resolve_columns(("Manager", "manager name")) == {"Manager": "Manager Name"}
+
+
+def test_missing_columns():
+    assert missing_columns(["A", "B"], {"C", "A", "D"}) == ["C", "D"]
+
+
+def test_conform_renames_and_compacts():
+    df = pd.DataFrame({
+        "Agent Code": ["P1", "P2", "P3", "P4"],
+        "Role": ["Advisor", "Advisor", "Manager", "Advisor"],
+        "PSU": ["10", "20", "30", "40"],
+        "Gross Earnings": [100, 200, 300, 400],
+    })
+    conformed, renames = conform(df)
+    assert renames == {"Agent Code": "Partner Id", "Role": "Paid As Position", "PSU": "Personal Sales Unit(PSU)"}
+    assert conformed["Partner Id"].tolist() == ["P1", "P2", "P3", "P4"]
+    assert isinstance(conformed["Paid As Position"].dtype, pd.CategoricalDtype)
+    assert conformed["Personal Sales Unit(PSU)"].dtype == "int32"
+    assert conformed["Gross Earnings"].dtype == "int32"
+    # The uploaded frame is left as it was
+    assert list(df.columns) == ["Agent Code", "Role", "PSU", "Gross Earnings"]
+
+
+def test_text_numbers_are_kept_when_conversion_would_lose_values():
+    conformed, _ = conform(pd.DataFrame({"PSU": ["10", "n/a", "30"]}))
+    assert conformed["Personal Sales Unit(PSU)"].tolist() == ["10", "n/a", "30"]
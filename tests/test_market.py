@@ -0,0 +1,58 @@
+from fanalysis.market import (
+    BASIC_CHECKLIST,
+    DETAILED_CHECKLIST,
+    ChecklistMatcher,
+    compile_checklist,
+    evaluate_market_checklist,
+    phrase_words,
+    score_market_reports,
+)
+
+REPORT = """
+Typical food-prep methods vary by region. The median age is 38.
+Top 5 Thermomix competitors hold most of the market share; Market Share Capture is the goal.
+Affordability is helped by EMIs. Service centres are in every large city.
+"""
+
+
+def test_phrase_words_ignore_case_plurals_and_punctuation():
+    assert phrase_words("Food-prep Methods") == phrase_words("food prep method") == ("food", "prep", "method")
+
+
+def test_matches_find_overlapping_phrases_with_their_spans():
+    matcher = ChecklistMatcher(DETAILED_CHECKLIST)
+    found = {(REPORT[start:end], kind) for start, end, _, kind, _ in matcher.matches(REPORT)}
+    assert ("Typical food-prep methods", "focus") in found
+    assert ("median age", "synonym") in found
+    assert ("market share", "subpoint") in found
+    assert ("Market Share Capture", "subpoint") in found
+    assert ("EMIs", "subpoint") in found
+
+
+def test_evaluate_passes_on_focus_or_synonym():
+    results = {area: (status, reason) for area, _, status, reason in evaluate_market_checklist(REPORT)}
+    assert results["🥣 Eating Habits"][0] == "Pass"
+    assert results["👥 Demographics"] == ("Pass", "Includes: median age (0 of 4 sub-points)")
+    assert results["🏷️ Competition"][0] == "Pass"
+    assert results["🔧 After-sales"][0] == "Pass"
+    assert results["🌿 Sustainability"] == ("Fail", "Missing: Eco-awareness (0 of 4 sub-points)")
+
+
+def test_checklists_differ_in_competition():
+    text = "Our top 3 local competitors are listed below."
+    basic = {area: status for area, _, status, _ in evaluate_market_checklist(text, BASIC_CHECKLIST)}
+    detailed = {area: status for area, _, status, _ in evaluate_market_checklist(text, DETAILED_CHECKLIST)}
+    assert basic["🏷️ Competition"] == "Pass" and detailed["🏷️ Competition"] == "Fail"
+
+
+def test_score_many_agrees_with_evaluate():
+    reports = {"Japan": REPORT, "India": "Nothing relevant.", "USA": None}
+    scores = score_market_reports(reports)
+    assert scores.index.tolist() == ["Japan", "India", "USA"]
+    passed = sum(status == "Pass" for _, _, status, _ in evaluate_market_checklist(REPORT))
+    assert scores.loc["Japan", "Passed"] == passed
+    assert scores.loc["India", "Passed"] == 0 and scores.loc["USA", "Sub-points"] == 0.0
+
+
+def test_compiled_matchers_are_cached():
+    assert compile_checklist(DETAILED_CHECKLIST) is compile_checklist(dict(DETAILED_CHECKLIST))
@@ -0,0 +1,93 @@
+import io
+import threading
+
+from fanalysis.pipeline import FilePipeline, run_stages
+
+
+class Upload(io.BytesIO):
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+
+
+def _pipeline():
+    calls = []
+    lock = threading.Lock()
+
+    def stage(name, func):
+        def run(file, outputs):
+            with lock:
+                calls.append((file.name, name))
+            return func(file, outputs)
+        return name, run
+
+    stages = [
+        stage("parse", lambda file, outputs: file.getvalue().decode()),
+        stage("summary", lambda file, outputs: outputs["parse"].upper()),
+    ]
+    return FilePipeline(stages, max_workers=2), calls
+
+
+def _results(events):
+    return {(index, name): (value, error) for index, name, value, error in events}
+
+
+def test_unchanged_files_are_not_processed_again():
+    pipeline, calls = _pipeline()
+    files = [Upload("jan.csv", b"jan"), Upload("feb.csv", b"feb")]
+    first = _results(pipeline.run(files))
+    assert first[(1, "summary")] == ("FEB", None)
+    assert len(calls) == 4
+
+    calls.clear()
+    files = [Upload("jan.csv", b"jan"), Upload("feb.csv", b"feb v2"), Upload("mar.csv", b"mar")]
+    second = _results(pipeline.run(files))
+    assert sorted(calls) == [("feb.csv", "parse"), ("feb.csv", "summary"),
+                             ("mar.csv", "parse"), ("mar.csv", "summary")]
+    assert second[(0, "summary")] == ("JAN", None)
+    assert second[(1, "summary")] == ("FEB V2", None)
+    assert second[(2, "parse")] == ("mar", None)
+
+
+def test_remembered_files_are_reported_first():
+    pipeline, _ = _pipeline()
+    list(pipeline.run([Upload("jan.csv", b"jan")]))
+    events = list(pipeline.run([Upload("feb.csv", b"feb"), Upload("jan.csv", b"jan")]))
+    assert [(index, name) for index, name, _, _ in events[:2]] == [(1, "parse"), (1, "summary")]
+
+
+def test_the_same_bytes_twice_are_processed_once():
+    pipeline, calls = _pipeline()
+    results = _results(pipeline.run([Upload("a.csv", b"same"), Upload("b.csv", b"same")]))
+    assert len(calls) == 2
+    assert results[(0, "summary")] == results[(1, "summary")] == ("SAME", None)
+
+
+def test_failed_files_are_retried_on_the_next_run():
+    attempts = []
+
+    def parse(file, outputs):
+        attempts.append(file.name)
+        if len(attempts) == 1:
+            raise ValueError("bad upload")
+        return "ok"
+
+    pipeline = FilePipeline([("parse", parse), ("summary", lambda file, outputs: outputs["parse"])])
+    events = list(pipeline.run([Upload("jan.csv", b"jan")]))
+    assert len(events) == 1 and isinstance(events[0][3], ValueError)  # no summary after a failure
+    assert _results(pipeline.run([Upload("jan.csv", b"jan")]))[(0, "summary")] == ("ok", None)
+    assert attempts == ["jan.csv", "jan.csv"]
+
+
+def test_files_that_are_gone_are_forgotten():
+    pipeline, calls = _pipeline()
+    list(pipeline.run([Upload("jan.csv", b"jan")]))
+    list(pipeline.run([Upload("feb.csv", b"feb")]))
+    calls.clear()
+    list(pipeline.run([Upload("jan.csv", b"jan")]))
+    assert calls == [("jan.csv", "parse"), ("jan.csv", "summary")]
+
+
+def test_run_stages_without_items_or_stages_yields_nothing():
+    assert list(run_stages([], [("parse", lambda item, outputs: item)])) == []
+    assert list(run_stages([1], [])) == []
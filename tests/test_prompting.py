@@ -0,0 +1,56 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fanalysis import prompting
+from fanalysis.prompting import build_data_context, estimate_tokens, render_prompt
+
+# cl100k_base pre-tokenization: every piece is at least one token, so this is a lower bound
+_CL100K_PIECES = re.compile(
+    r"'(?:[sdmt]|ll|ve|re)|[^\r\n\w]?[^\W\d_]+|\d{1,3}| ?(?:[^\s\w]|_)+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+",
+    re.IGNORECASE,
+)
+
+
+def min_tokens(text):
+    return len(_CL100K_PIECES.findall(text))
+
+
+@pytest.fixture(autouse=True)
+def without_tiktoken(monkeypatch):
+    # Exercise the fallback estimate even where tiktoken is installed
+    monkeypatch.setattr(prompting, "_encoding", False)
+
+
+@pytest.fixture
+def numeric_frame():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(rng.normal(50000, 20000, (2000, 8)).round(2), columns=[f"Metric {i}" for i in range(8)])
+
+
+@pytest.mark.parametrize("text", [
+    "1234567",
+    "12345.67,0.5,-3.25\n",
+    "Partner Id,Gross Earnings,Personal Sales Unit(PSU)\n1001,2500.75,12\n",
+    "Below are summaries covering every row of the uploaded file.",
+])
+def test_estimate_is_not_below_the_pre_token_count(text):
+    assert estimate_tokens(text) >= min_tokens(text)
+
+
+def test_digit_groups_are_one_token_each():
+    assert estimate_tokens("1234567") == 3
+
+
+@pytest.mark.parametrize("rows", [40, 2000])
+def test_numeric_csv_context_stays_within_budget(numeric_frame, rows):
+    context = build_data_context(numeric_frame.head(rows), max_tokens=1000)
+    assert min_tokens(context) <= 1000
+
+
+def test_rendered_prompt_stays_within_budget(numeric_frame):
+    template = "You are a data analyst.\nData:\n{data}\nQuestion: {question}"
+    prompt = render_prompt(template, numeric_frame, "What is the average Metric 3?", max_tokens=6000)
+    assert min_tokens(prompt) <= 6000
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from fanalysis.ranking import commission_totals, group_top_n, leaderboards, select_positions, top_n
+from fanalysis.schema import TOTAL_COMMISSIONS
+
+
+def test_select_positions_matches_a_stable_sort():
+    keys = np.random.default_rng(1).integers(0, 20, 500).astype(float)
+    keys[::7] = np.nan
+    for n in (0, 1, 10, 100, 1000):
+        valid = np.flatnonzero(~np.isnan(keys))
+        expected = valid[np.argsort(keys[valid], kind="stable")][:n]
+        assert select_positions(keys, n).tolist() == expected.tolist()
+
+
+def test_top_n_is_nlargest_and_skips_non_numeric(bonus_frame):
+    df = bonus_frame.assign(**{"Gross Earnings": bonus_frame["Gross Earnings"].astype(object)})
+    df.loc[[3, 4], "Gross Earnings"] = ["n/a", None]
+    expected = pd.to_numeric(df["Gross Earnings"], errors="coerce").nlargest(10, keep="first")
+    assert top_n(df, "Gross Earnings").index.tolist() == expected.index.tolist()
+    assert top_n(df, "Gross Earnings", n=3, largest=False).index.tolist() == (
+        pd.to_numeric(df["Gross Earnings"], errors="coerce").nsmallest(3, keep="first").index.tolist()
+    )
+
+
+def test_ties_keep_row_order():
+    df = pd.DataFrame({"Gross Earnings": [5, 9, 9, 1, 9]})
+    assert top_n(df, "Gross Earnings", n=2).index.tolist() == [1, 2]
+
+
+def test_group_top_n_ranks_within_each_group(bonus_frame):
+    table = group_top_n(bonus_frame, "Gross Earnings", "Manager Name", n=3)
+    assert list(table.columns[:2]) == ["Manager Name", "Rank"]
+    assert table["Manager Name"].tolist() == sorted(table["Manager Name"])
+    for manager, group in table.groupby("Manager Name"):
+        expected = bonus_frame[bonus_frame["Manager Name"] == manager]["Gross Earnings"].nlargest(3, keep="first")
+        assert group.index.tolist() == expected.index.tolist()
+        assert group["Rank"].tolist() == [1, 2, 3]
+
+
+def test_leaderboards_skip_missing_metrics(bonus_frame):
+    boards = leaderboards(bonus_frame, ["Gross Earnings", "Team Units(TU)"], n=5)
+    assert list(boards) == ["Gross Earnings"] and len(boards["Gross Earnings"]) == 5
+
+
+def test_commission_totals_are_added_once():
+    df = pd.DataFrame({"Basic commission Bonus(BCB)": [1.0, 2.0], "Performance Bonus (PCB)": ["3", None]})
+    assert commission_totals(df).tolist() == [4.0, 2.0]
+    df["Basic commission Bonus(BCB)"] = 0.0
+    assert commission_totals(df).tolist() == [4.0, 2.0]
+    assert TOTAL_COMMISSIONS in df.columns
@@ -0,0 +1,54 @@
+import pandas as pd
+
+from fanalysis.reconcile import (
+    can_reconcile,
+    describe_reconciliation,
+    is_reconciled,
+    mismatched_rows,
+    reconcile,
+    reconciliation_summary,
+)
+
+
+def bonus_rows():
+    return pd.DataFrame({
+        "Partner Id": ["P1", "P2", "P3"],
+        "Basic commission Bonus(BCB)": [100.0, 50.0, 10.0],
+        "Super Commission Bonus(SCB)": [20.0, None, 0.0],
+        "Recruitment Commission Bonus (RCB)": [0.0, 5.0, 0.0],
+        "Performance Bonus (PCB)": [5.0, 0.0, 0.0],
+        "Adhoc Payment(ADP)": [10.0, 0.0, "n/a"],
+        "Gross Earnings": [135.0, 60.0, 10.004],
+    })
+
+
+def test_reconcile_adds_totals_and_flags_mismatches():
+    df = reconcile(bonus_rows())
+    assert is_reconciled(df)
+    assert df["Total Commissions"].tolist() == [125.0, 55.0, 10.0]
+    assert df["Component Total"].tolist() == [135.0, 55.0, 10.0]
+    assert df["Earnings Difference"].tolist() == [0.0, 5.0, 0.0]
+    assert df["Earnings Mismatch"].tolist() == [False, True, False]
+
+
+def test_summary_and_description():
+    summary = reconciliation_summary(reconcile(bonus_rows()))
+    assert summary["rows"] == 3 and summary["mismatched"] == 1
+    assert summary["max_difference"] == 5.0 and summary["net_difference"] == 5.0
+    assert describe_reconciliation(summary).startswith("1 of 3 rows differ")
+    clean = reconciliation_summary(reconcile(bonus_rows().iloc[[0]]))
+    assert describe_reconciliation(clean).startswith("All 1 rows reconcile")
+
+
+def test_mismatched_rows_largest_difference_first():
+    df = bonus_rows()
+    df.loc[0, "Gross Earnings"] = 100.0
+    rows = mismatched_rows(reconcile(df))
+    assert rows["Partner Id"].tolist() == ["P1", "P2"]
+    assert rows.columns[-1] == "Earnings Difference"
+
+
+def test_can_reconcile_needs_earnings_and_a_commission():
+    assert can_reconcile(bonus_rows())
+    assert not can_reconcile(bonus_rows().drop(columns="Gross Earnings"))
+    assert not can_reconcile(pd.DataFrame({"Gross Earnings": [1.0]}))
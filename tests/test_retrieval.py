@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from fanalysis.retrieval import FrameIndex, VectorIndex, build_retrieval_context
+
+
+def test_rows_sharing_rarer_terms_rank_first():
+    index = VectorIndex([
+        "north agent",
+        "north agent smith",
+        "south agent smith",
+        "south agent jones",
+        "east agent",
+    ])
+    ranked = [position for position, _ in index.search("smith north", 5)]
+    # Both terms first, then one term in the shorter row; rows with neither are left out
+    assert ranked == [1, 0, 2]
+    scores = [score for _, score in index.search("smith north", 5)]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_queries_sharing_no_term_return_nothing():
+    index = VectorIndex(["north agent", "south agent"])
+    assert index.search("gross earnings", 5) == []
+    assert index.search("", 5) == []
+    assert VectorIndex([]).search("north", 5) == []
+
+
+def test_dense_embeddings_rank_by_cosine_similarity():
+    vectors = {"a": [1, 0], "b": [1, 1], "c": [0, 1], "query": [2, 1]}
+    index = VectorIndex(["a", "b", "c"], embed=lambda texts: np.array([vectors[t] for t in texts], float))
+    assert [position for position, _ in index.search("query", 3)] == [1, 0, 2]
+
+
+def _agents(rows=200):
+    return pd.DataFrame({
+        "Partner Id": [f"P{i:04d}" for i in range(rows)],
+        "Last Name": [f"Name{i}" for i in range(rows)],
+        "Region": [("North", "South", "East", "West")[i % 4] for i in range(rows)],
+        "Gross Earnings": [float(i) for i in range(rows)],
+    })
+
+
+def test_a_named_agent_is_retrieved_and_its_column_profiled():
+    index = FrameIndex(_agents())
+    rows = index.relevant_rows("How much did Name137 earn?", k=3)
+    assert rows["Last Name"].iloc[0] == "Name137"
+    assert index.relevant_profiles("Gross Earnings by Region", k=2)[0][0] in ("Gross Earnings", "Region")
+
+
+def test_prompt_context_carries_the_relevant_rows():
+    context = build_retrieval_context(_agents(), "How much did Name137 earn?")
+    assert "Rows most relevant to the question" in context
+    assert "P0137,Name137" in context
+    assert "Name42," not in context
+    fallback = build_retrieval_context(_agents(), "zzz")
+    assert "Sample of 20 of 200 rows:" in fallback
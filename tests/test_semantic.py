@@ -0,0 +1,86 @@
+import pytest
+
+from fanalysis.semantic import SemanticCache, embed_question, question_keys
+
+SCOPE = "bonus.csv:structured"
+
+DIFFERENT = [
+    (
+        "Which partners recruited by manager Smith have the highest gross earnings and team units this month?",
+        "Which partners recruited by manager Jones have the highest gross earnings and team units this month?",
+    ),
+    (
+        "List all active partners recruited by Maria along with their position, team units and performance bonus",
+        "List all active partners recruited by Pedro along with their position, team units and performance bonus",
+    ),
+    (
+        "Which team leaders in the advisor position have gross earnings above average and a performance bonus?",
+        "Which team leaders in the advisor position have gross earnings below average and a performance bonus?",
+    ),
+    (
+        "Show team leaders with more than 5 recruits and their gross earnings, position and performance bonus",
+        "Show team leaders with more than 50 recruits and their gross earnings, position and performance bonus",
+    ),
+    (
+        "Show the top 10 team leaders by gross earnings with their position, manager and performance bonus",
+        "Show the bottom 10 team leaders by gross earnings with their position, manager and performance bonus",
+    ),
+    (
+        "Show gross earnings, team units, position, manager and performance bonus of partner P1001",
+        "Show gross earnings, team units, position, manager and performance bonus of partner P1002",
+    ),
+]
+SAME = [
+    ("Who are the top earners?", "who earned the most?"),
+    ("Top earners recruited by manager Smith", "Who are the top earners recruited by manager Smith?"),
+    ("Which partners earned above average?", "which partners earned above the average"),
+]
+
+
+@pytest.fixture(params=[None, 0.85], ids=["default", "lenient"])
+def cache(request, tmp_path):
+    kwargs = {} if request.param is None else {"threshold": request.param}
+    return SemanticCache(str(tmp_path / "questions.sqlite"), **kwargs)
+
+
+@pytest.mark.parametrize("stored, asked", DIFFERENT)
+def test_similar_wording_about_something_else_is_a_miss(cache, stored, asked):
+    # These pairs score 0.85 or more on the bag of words alone
+    cache.add(SCOPE, stored, "stored answer")
+    assert cache.lookup(SCOPE, asked) is None
+
+
+@pytest.mark.parametrize("stored, asked", SAME)
+def test_rewording_the_same_question_is_a_hit(cache, stored, asked):
+    cache.add(SCOPE, stored, "stored answer")
+    hit = cache.lookup(SCOPE, asked)
+    assert hit is not None and hit[:2] == (stored, "stored answer")
+
+
+def test_the_closest_question_with_matching_keys_is_returned(tmp_path):
+    cache = SemanticCache(str(tmp_path / "questions.sqlite"), threshold=0.85)
+    jones, smith = DIFFERENT[0][1], DIFFERENT[0][0]
+    cache.add(SCOPE, jones, "Jones")
+    cache.add(SCOPE, smith, "Smith")
+    assert cache.lookup(SCOPE, smith.lower().replace("smith", "Smith"))[1] == "Smith"
+
+
+def test_lookups_never_cross_scopes(cache):
+    cache.add(SCOPE, "Who are the top earners?", "stored answer")
+    assert cache.lookup("other.csv:structured", "Who are the top earners?") is None
+
+
+def test_question_keys():
+    assert question_keys("Who are the top earners recruited by manager Smith?") == {"top", "smith"}
+    assert question_keys("Which partners earned more than 5000 in Q1?") == {"above", "5000", "q1"}
+    assert question_keys("who earned the most") == question_keys("Show the highest earners") == {"top"}
+
+
+def test_negation_is_not_a_hit(cache):
+    cache.add(SCOPE, "Which partners received a bonus?", "stored answer")
+    assert cache.lookup(SCOPE, "Which partners did not receive a bonus?") is None
+
+
+@pytest.mark.parametrize("stored, asked", DIFFERENT)
+def test_the_pairs_are_close_on_the_vector_alone(stored, asked):
+    assert float(embed_question(stored) @ embed_question(asked)) >= 0.85
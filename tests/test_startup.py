@@ -0,0 +1,39 @@
+import glob
+import os
+
+import pytest
+
+from fanalysis.startup import eager_modules, measure, parse_importtime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = sorted(
+    os.path.basename(path) for path in glob.glob(os.path.join(ROOT, "*.py"))
+    if "import streamlit" in open(path, encoding="utf-8").read()
+)
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |     aiohttp.client
+import time:       200 |        300 |   aiohttp
+import time:       300 |        600 | fanalysis.gateway
+import time:       400 |        400 |     pyarrow.lib
+import time:       100 |        500 |   pyarrow
+import time:       500 |       1000 | pandas
+"""
+
+
+def test_eager_modules_blames_only_our_imports():
+    rows = parse_importtime(IMPORTTIME)
+    assert [row[0] for row in rows] == ["aiohttp.client", "aiohttp", "fanalysis.gateway", "pyarrow.lib", "pyarrow", "pandas"]
+    # aiohttp was imported by fanalysis, pyarrow only by pandas
+    assert eager_modules(rows) == ["aiohttp"]
+
+
+def test_pages_are_found():
+    assert "nnn145.py" in PAGES and "demooo33.py" in PAGES
+
+
+@pytest.mark.parametrize("page", PAGES)
+def test_page_defers_optional_subsystems(page):
+    eager = eager_modules(measure(os.path.join(ROOT, page), repeat=1))
+    assert not eager, f"{page} imports {', '.join(eager)} at startup"
@@ -0,0 +1,50 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from fanalysis.store import ConsolidatedStore, _as_periods, infer_period, period_label
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("CDMAR25ESTM.xlsx", "2025-03"),
+    ("bonus_2025-03.csv", "2025-03"),
+    ("bonus 202504.xlsx", "2025-04"),
+    ("Payout March 2024.csv", "2024-03"),
+    ("bonus.csv", None),
+])
+def test_infer_period_from_file_names(name, expected):
+    period = infer_period(name)
+    assert (str(period) if period is not None else None) == expected
+
+
+@pytest.mark.parametrize("values, expected", [
+    (["Mar-24", "Mar-25"], ["2024-03", "2025-03"]),
+    ([202503, 202504], ["2025-03", "2025-04"]),
+    (["2025-03", "2025-04-15 00:00:00"], ["2025-03", "2025-04"]),
+    (["March 2025", "Apr 25"], ["2025-03", "2025-04"]),
+    ([pd.Timestamp("2025-03-01"), datetime.date(2025, 4, 30)], ["2025-03", "2025-04"]),
+])
+def test_distinct_months_stay_distinct(values, expected):
+    assert _as_periods(pd.Series(values)).tolist() == expected
+
+
+def test_values_naming_no_month_are_kept_as_they_are():
+    assert _as_periods(pd.Series(["March", "April", "March"])).tolist() == ["March", "April", "March"]
+    assert period_label("March") is None and period_label("2025") is None
+    assert period_label("Summary 2025") is None
+
+
+def test_store_keeps_undated_labels_apart(bonus_frame):
+    df = bonus_frame.head(6).assign(Month=["Mar-24", "Mar-24", "Mar-25", "Mar-25", "March", "April"])
+    store = ConsolidatedStore()
+    assert store.add(df, "bonus.csv") == ["2024-03", "2025-03", "March", "April"]
+    assert store.periods == ["2024-03", "2025-03", "March", "April"]
+    assert store.undated == ["March", "April"]
+
+
+def test_store_takes_the_period_from_the_file_name(bonus_frame):
+    store = ConsolidatedStore()
+    store.add(bonus_frame.head(3), "CDAPR25ESTM.xlsx", key="b")
+    store.add(bonus_frame.head(3), "CDMAR25ESTM.xlsx", key="a")
+    assert store.periods == ["2025-03", "2025-04"] and store.undated == []
@@ -0,0 +1,77 @@
+import time
+
+import pandas as pd
+
+from fanalysis.summarize import CUT_WINDOW, _rows_per_chunk, split_frame, summarize_frame
+
+QUESTION = "Who are the top earners?"
+
+
+def map_prompts(prompts):
+    return [prompt for prompt in prompts if "is one part" in prompt]
+
+
+def test_cached_resummary_sends_nothing_and_does_not_wait(fake_llm, bonus_frame):
+    summarize_frame(QUESTION, bonus_frame, max_tokens=600)
+    sent = len(fake_llm.prompts)
+    assert len(map_prompts(fake_llm.prompts)) > 1
+
+    start = time.monotonic()
+    summarize_frame(QUESTION, bonus_frame, max_tokens=600)
+    assert len(fake_llm.prompts) == sent
+    assert time.monotonic() - start < 5
+
+
+def test_editing_one_row_only_resends_its_chunk(fake_llm, bonus_frame):
+    summarize_frame(QUESTION, bonus_frame, max_tokens=600)
+    sent = len(fake_llm.prompts)
+
+    edited = bonus_frame.copy()
+    edited.loc[300, "Gross Earnings"] = 99999.0
+    summarize_frame(QUESTION, edited, max_tokens=600)
+    assert len(map_prompts(fake_llm.prompts[sent:])) == 1
+
+
+def test_row_chunks_are_filled_close_to_the_budget(bonus_frame):
+    max_rows = _rows_per_chunk(bonus_frame, QUESTION, 600)
+    chunks = [chunk for _, chunk in split_frame(bonus_frame, QUESTION, max_tokens=600)]
+    assert sum(len(chunk) for chunk in chunks) == len(bonus_frame)
+    assert all(len(chunk) <= max_rows for chunk in chunks)
+    assert all(len(chunk) > max_rows * (1 - CUT_WINDOW) for chunk in chunks[:-1])
+
+
+def test_inserting_a_row_changes_one_chunk(bonus_frame):
+    def chunk_texts(df):
+        return {chunk.to_csv(index=False) for _, chunk in split_frame(df, QUESTION, max_tokens=600)}
+
+    inserted = pd.concat([bonus_frame.iloc[:250], bonus_frame.iloc[[5]], bonus_frame.iloc[250:]], ignore_index=True)
+    assert len(chunk_texts(inserted) - chunk_texts(bonus_frame)) == 1
+
+
+def test_groups_are_packed_whole_and_split_only_when_too_large(bonus_frame):
+    df = bonus_frame.copy()
+    df.loc[:399, "Manager Name"] = "Smith"
+    max_rows = _rows_per_chunk(df, QUESTION, 600)
+    chunks = split_frame(df, QUESTION, group_by="Manager Name", max_tokens=600)
+    assert sum(len(chunk) for _, chunk in chunks) == len(df)
+    for label, chunk in chunks:
+        assert len(chunk) <= max_rows
+        if chunk["Manager Name"].nunique() > 1 or "rows" not in label:
+            # Packed groups are never split
+            for manager in chunk["Manager Name"].unique():
+                assert (chunk["Manager Name"] == manager).sum() == (df["Manager Name"] == manager).sum()
+    assert [label for label, _ in chunks if label.startswith("Manager Name: Smith,")]
+
+
+def test_a_small_frame_is_one_chunk(bonus_frame):
+    assert [label for label, _ in split_frame(bonus_frame.head(5), QUESTION)] == ["5 rows"]
+
+
+def test_a_frame_that_fits_one_chunk_is_sent_whole(fake_llm, bonus_frame):
+    df = bonus_frame.head(120)
+    assert len(split_frame(df, QUESTION, max_tokens=6000)) == 1
+    summarize_frame(QUESTION, df, max_tokens=6000)
+    assert "".join(summarize_frame(QUESTION, df.head(80), stream=True, max_tokens=6000))
+    whole, streamed = fake_llm.prompts
+    assert all(f"{row['Partner Id']},{row['Last Name']}," in whole for _, row in df.iterrows())
+    assert "80 rows in total" in streamed and "Name79," in streamed